@@ -0,0 +1,4 @@
+"""
+   Benchmarks for PromptWizard. Run them from `03_prompt-optimization` directory e.g.
+   python -m benchmarks.bench_client_pool
+"""
@@ -0,0 +1,122 @@
+"""
+Solve-prompt calls spent by solve_and_evaluate() on a mini-batch of `questions_batch_size` questions, when
+questions are asked one per call and when they are asked together in one batched call. LLM is simulated: it
+answers every question in a batched call, but leaves out the numbered tags of an answer with probability
+`--drop-rate`, so that alignment fails for it and it has to be asked again on its own.
+
+    python -m benchmarks.bench_batched_solve --batch-size 5 --drop-rate 0.05
+"""
+import argparse
+import logging
+import random
+import re
+import tempfile
+from os.path import dirname, join
+
+from promptwizard.glue.common.base_classes import SetupConfig
+from promptwizard.glue.common.utils.file import yaml_to_class
+from promptwizard.glue.promptopt.techniques.common_logic import DatasetSpecificProcessing
+from promptwizard.glue.promptopt.techniques.critique_n_refine.base_classes import (
+    CritiqueNRefineParams,
+    CritiqueNRefinePromptPool,
+)
+from promptwizard.glue.promptopt.techniques.critique_n_refine.core_logic import CritiqueNRefine
+
+ROOT_DIR = dirname(dirname(__file__))
+QUESTION_PATTERN = r"\[Question (\d+)\]: "
+
+
+class SimulatedDataProcessor(DatasetSpecificProcessing):
+    def dataset_to_jsonl(self, dataset_jsonl: str, **kwargs) -> None:
+        pass
+
+    def extract_final_answer(self, answer: str) -> str:
+        match = re.search(self.ANSWER_DELIMITER_PATTERN, answer)
+        return match.group(0) if match else answer
+
+
+class SimulatedCritiqueNRefine(CritiqueNRefine):
+    """
+    CritiqueNRefine whose LLM always answers correctly, but drops numbered tags of an answer with `drop_rate`.
+    """
+
+    def __init__(self, drop_rate: float, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.drop_rate = drop_rate
+        self.rng = random.Random(0)
+        self.solve_calls = 0
+
+    def chat_completion(self, user_prompt: str, system_prompt: str = None):
+        self.solve_calls += 1
+        indices = re.findall(QUESTION_PATTERN, user_prompt)
+        if not indices:
+            return "<ANS_START>correct<ANS_END>"
+        return "\n".join(
+            f"Answer {index}: correct"
+            if self.rng.random() < self.drop_rate
+            else f"<ANS_START_{index}>correct<ANS_END_{index}>"
+            for index in indices
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--drop-rate", type=float, default=0.05)
+    parser.add_argument("--mini-batches", type=int, default=1000)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    params = yaml_to_class(
+        join(ROOT_DIR, "configs", "mobile_promptopt_config.yaml"), CritiqueNRefineParams
+    )
+    prompt_pool = yaml_to_class(
+        None,
+        CritiqueNRefinePromptPool,
+        join(
+            ROOT_DIR, "promptwizard", "glue", "promptopt", "techniques",
+            "critique_n_refine", "prompt_pool.yaml",
+        ),
+    )
+    setup_config = yaml_to_class(join(ROOT_DIR, "configs", "setup_config.yaml"), SetupConfig)
+    dataset = [
+        {
+            DatasetSpecificProcessing.QUESTION_LITERAL: f"question {i}",
+            DatasetSpecificProcessing.FINAL_ANSWER_LITERAL: "correct",
+        }
+        for i in range(args.batch_size * args.mini_batches)
+    ]
+
+    print(
+        f"questions_batch_size={args.batch_size}, drop_rate={args.drop_rate}, "
+        f"{args.mini_batches} mini-batches"
+    )
+    print(f"{'mode':<12}{'calls/batch':>14}{'wrong/batch':>14}{'failure rate':>14}")
+    with tempfile.TemporaryDirectory() as base_path:
+        for mode in ["per-question", "batched"]:
+            prompt_opt = SimulatedCritiqueNRefine(
+                args.drop_rate, dataset, base_path, setup_config, prompt_pool,
+                SimulatedDataProcessor(), logging.getLogger(__name__),
+            )
+            wrong_count = 0
+            for start in range(0, len(dataset), args.batch_size):
+                dataset_subset = dataset[start : start + args.batch_size]
+                if mode == "batched":
+                    wrong_count += len(
+                        prompt_opt.solve_and_evaluate(f"[{mode}]", dataset_subset, params)
+                    )
+                else:
+                    for example in dataset_subset:
+                        wrong_count += len(
+                            prompt_opt.solve_and_evaluate(f"[{mode}]", [example], params)
+                        )
+            metrics = prompt_opt.get_batch_solve_metrics()
+            print(
+                f"{mode:<12}{prompt_opt.solve_calls / args.mini_batches:>14.2f}"
+                f"{wrong_count / args.mini_batches:>14.2f}"
+                f"{metrics[CritiqueNRefine.BatchSolveLiterals.FAILURE_RATE]:>14.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Solve-prompt calls spent by get_prompt_score() and quality of the selected top-n prompts, for each candidate
+selection strategy. LLM is simulated: every candidate prompt has a hidden accuracy, and a question is answered
+correctly with that probability. Questions are taken from the bundled dataset/*.jsonl files.
+
+`uniform` is the reference point, where every candidate is evaluated on all `max_eval_batches` mini-batches.
+
+    python -m benchmarks.bench_candidate_selection --candidates 16 --trials 200
+"""
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import logging
+import random
+import tempfile
+from os.path import dirname, join
+
+from promptwizard.glue.common.base_classes import SetupConfig
+from promptwizard.glue.common.utils.concurrency import gather_with_concurrency, run_coroutine_sync
+from promptwizard.glue.common.utils.file import read_jsonl, yaml_to_class
+from promptwizard.glue.promptopt.techniques.common_logic import DatasetSpecificProcessing
+from promptwizard.glue.promptopt.techniques.critique_n_refine.base_classes import (
+    CritiqueNRefineParams,
+    CritiqueNRefinePromptPool,
+)
+from promptwizard.glue.promptopt.techniques.critique_n_refine.candidate_selection import (
+    CandidateArm,
+    SelectionStrategies,
+)
+from promptwizard.glue.promptopt.techniques.critique_n_refine.core_logic import CritiqueNRefine
+
+ROOT_DIR = dirname(dirname(__file__))
+CORRECT, WRONG = "<ANS_START>correct<ANS_END>", "<ANS_START>wrong<ANS_END>"
+UNIFORM = "uniform"
+
+
+class SimulatedDataProcessor(DatasetSpecificProcessing):
+    def dataset_to_jsonl(self, dataset_jsonl: str, **kwargs) -> None:
+        pass
+
+    def access_answer(self, llm_output: str, gt_answer: str):
+        return llm_output == CORRECT, llm_output
+
+
+class SimulatedCritiqueNRefine(CritiqueNRefine):
+    """
+    CritiqueNRefine whose LLM answers a question correctly with the hidden accuracy of the instruction used.
+    """
+
+    def __init__(self, accuracies, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accuracies = accuracies
+        self.solve_calls = 0
+
+    def chat_completion(self, user_prompt: str, system_prompt: str = None):
+        self.solve_calls += 1
+        instruction = next(i for i in self.accuracies if i in user_prompt)
+        digest = hashlib.sha256(f"{self.trial}:{user_prompt}".encode()).digest()
+        draw = int.from_bytes(digest[:8], "big") / 2**64
+        return CORRECT if draw < self.accuracies[instruction] else WRONG
+
+    async def achat_completion(self, user_prompt: str, system_prompt: str = None):
+        return self.chat_completion(user_prompt, system_prompt)
+
+
+def load_questions():
+    questions = []
+    for file_path in sorted(glob.glob(join(ROOT_DIR, "dataset", "*.jsonl"))):
+        for row in read_jsonl(file_path):
+            if DatasetSpecificProcessing.QUESTION_LITERAL in row:
+                questions.append(
+                    {
+                        DatasetSpecificProcessing.QUESTION_LITERAL: row[
+                            DatasetSpecificProcessing.QUESTION_LITERAL
+                        ],
+                        DatasetSpecificProcessing.FINAL_ANSWER_LITERAL: "correct",
+                    }
+                )
+    return questions
+
+
+def get_uniform_prompt_score(prompt_opt: CritiqueNRefine, instructions, params):
+    """
+    Evaluate every candidate on `params.max_eval_batches` mini-batches.
+    """
+    arms = [
+        CandidateArm(instruction, rng)
+        for instruction, rng in zip(instructions, prompt_opt.get_candidate_rngs(len(instructions)))
+    ]
+
+    pulls = [
+        prompt_opt.aevaluate_mini_batch(arm, params)
+        for arm in arms
+        for _ in range(params.max_eval_batches)
+    ]
+    run_coroutine_sync(gather_with_concurrency(params.max_concurrency, pulls))
+    return [arm.get_prompt_score() for arm in arms]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidates", type=int, default=16)
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--top-n", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    params = yaml_to_class(
+        join(ROOT_DIR, "configs", "baseline_promptopt_config.yaml"), CritiqueNRefineParams
+    )
+    params.top_n = args.top_n
+    params.max_concurrency = 1
+    prompt_pool = yaml_to_class(
+        None,
+        CritiqueNRefinePromptPool,
+        join(
+            ROOT_DIR, "promptwizard", "glue", "promptopt", "techniques",
+            "critique_n_refine", "prompt_pool.yaml",
+        ),
+    )
+    setup_config = yaml_to_class(join(ROOT_DIR, "configs", "setup_config.yaml"), SetupConfig)
+    questions = load_questions()
+    instructions = [f"[candidate-{i:03d}]" for i in range(args.candidates)]
+
+    print(
+        f"{args.candidates} candidates, {len(questions)} questions, top_n={args.top_n}, "
+        f"max_eval_batches={params.max_eval_batches}, {args.trials} trials"
+    )
+    print(f"{'strategy':<20}{'calls/iter':>12}{'top-n acc':>12}{'oracle acc':>12}{'best found':>12}")
+    with tempfile.TemporaryDirectory() as base_path:
+        for strategy in [UNIFORM] + SelectionStrategies.all_values():
+            params.selection_strategy = strategy
+            calls, selected_acc, oracle_acc, best_found = 0, 0.0, 0.0, 0
+            for trial in range(args.trials):
+                trial_rng = random.Random(trial)
+                accuracies = {i: trial_rng.betavariate(2, 2) for i in instructions}
+                prompt_opt = SimulatedCritiqueNRefine(
+                    accuracies, questions, base_path, setup_config, prompt_pool,
+                    SimulatedDataProcessor(), logging.getLogger(__name__),
+                )
+                prompt_opt.trial = trial
+                random.seed(trial)
+                # evaluate() prints every mini-batch
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if strategy == UNIFORM:
+                        prompt_score_list = get_uniform_prompt_score(prompt_opt, instructions, params)
+                    else:
+                        prompt_score_list = prompt_opt.get_prompt_score(instructions, params)
+                top_prompts = prompt_opt.select_top_prompts(
+                    prompt_score_list,
+                    params.top_n,
+                    strategy != SelectionStrategies.FIXED,
+                )
+                selected = [accuracies[p[0]] for p in top_prompts]
+                oracle = sorted(accuracies.values(), reverse=True)[: params.top_n]
+                calls += prompt_opt.solve_calls
+                selected_acc += sum(selected) / len(selected)
+                oracle_acc += sum(oracle) / len(oracle)
+                best_found += max(accuracies.values()) in selected
+            print(
+                f"{strategy:<20}{calls / args.trials:>12.1f}{selected_acc / args.trials:>12.3f}"
+                f"{oracle_acc / args.trials:>12.3f}{best_found / args.trials:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Per-call overhead of `call_api`, before and after pooling of LLM clients, measured against a local stub
+OpenAI compatible server (so that only client side overhead is measured).
+
+    python -m benchmarks.bench_client_pool --calls 200
+"""
+import argparse
+import os
+import time
+
+from benchmarks.stub_openai_server import StubOpenAIServer
+
+MESSAGES = [
+    {"role": "system", "content": "You are a helpful assistant."},
+    {"role": "user", "content": "What is 6 * 7 ?"},
+]
+
+
+def call_api_without_pool(messages):
+    """
+    Replica of `call_api` before LLMClientPool was introduced: a new client (and connection) for every call.
+    """
+    from openai import AzureOpenAI
+
+    client = AzureOpenAI(
+        api_version=os.environ["OPENAI_API_VERSION"],
+        azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
+        api_key=os.environ["AZURE_OPENAI_API_KEY"],
+    )
+    response = client.chat.completions.create(
+        model=os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"],
+        messages=messages,
+        temperature=0.0,
+    )
+    return response.choices[0].message.content
+
+
+def time_calls(method, calls: int) -> float:
+    # Warm up, so that import time is not measured
+    method(MESSAGES)
+    start_time = time.perf_counter()
+    for _ in range(calls):
+        method(MESSAGES)
+    return (time.perf_counter() - start_time) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    from promptwizard.glue.common.llm.llm_mgr import call_api
+
+    with StubOpenAIServer() as server:
+        os.environ.update(
+            {
+                "USE_OPENAI_API_KEY": "False",
+                "AZURE_OPENAI_ENDPOINT": server.base_url,
+                "AZURE_OPENAI_API_KEY": "stub-key",
+                "OPENAI_API_VERSION": "2025-03-01-preview",
+                "AZURE_OPENAI_DEPLOYMENT_NAME": "stub-deployment",
+            }
+        )
+        connections_before = server.connection_count
+        unpooled_sec = time_calls(call_api_without_pool, args.calls)
+        unpooled_connections = server.connection_count - connections_before
+
+        connections_before = server.connection_count
+        pooled_sec = time_calls(call_api, args.calls)
+        pooled_connections = server.connection_count - connections_before
+
+    print(f"{'mode':<12}{'ms/call':>10}{'connections':>14}")
+    print(f"{'unpooled':<12}{unpooled_sec * 1000:>10.2f}{unpooled_connections:>14}")
+    print(f"{'pooled':<12}{pooled_sec * 1000:>10.2f}{pooled_connections:>14}")
+    print(f"speedup: {unpooled_sec / pooled_sec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Time and peak Python memory taken to load a training dataset and sample rows from it: reading every row into a
+list (what GluePromptOpt used to do), reading only the first `seen_set_size` rows, and indexing the file with
+JsonlDataset, which decodes only the rows that are sampled. Each is measured with json module and with orjson
+(when installed).
+
+    python -m benchmarks.bench_dataset_loading --rows 200000 --seen-set-size 25
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from os.path import getsize, join
+
+from promptwizard.glue.common.utils.file import read_jsonl
+from promptwizard.glue.common.utils.jsonl_dataset import JsonlDataset
+
+
+def write_dataset(file_path: str, rows: int) -> None:
+    rng = random.Random(0)
+    with open(file_path, "w") as fileobj:
+        for i in range(rows):
+            question = " ".join(str(rng.randint(0, 10**6)) for _ in range(60))
+            row = {
+                "question": f"Question {i}: what is the sum of {question}?",
+                "answer": f"The numbers add up to {rng.randint(0, 10**8)}.",
+                "final_answer": str(rng.randint(0, 10**8)),
+            }
+            fileobj.write(json.dumps(row) + "\n")
+
+
+def measure(load, sample_size: int):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    dataset = load()
+    random.Random(0).sample(dataset, min(sample_size, len(dataset)))
+    elapsed = time.perf_counter() - start_time
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if isinstance(dataset, JsonlDataset):
+        dataset.close()
+    return elapsed, peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--seen-set-size", type=int, default=25)
+    parser.add_argument("--sample-size", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = join(tmp_dir, "train.jsonl")
+        write_dataset(file_path, args.rows)
+        print(f"Dataset: {args.rows} rows, {getsize(file_path) / 2**20:.1f} MB")
+
+        loaders = {
+            "read_jsonl, all rows": lambda fast_json: read_jsonl(file_path, fast_json=fast_json),
+            "read_jsonl, seen_set_size rows": lambda fast_json: read_jsonl(
+                file_path, args.seen_set_size, fast_json
+            ),
+            "JsonlDataset, all rows": lambda fast_json: JsonlDataset(file_path, fast_json=fast_json),
+            "JsonlDataset, seen_set_size rows": lambda fast_json: JsonlDataset(
+                file_path, args.seen_set_size, fast_json
+            ),
+        }
+        print(f"{'loader':<36}{'decoder':>10}{'time (s)':>12}{'peak memory (MB)':>20}")
+        for name, load in loaders.items():
+            for fast_json in (False, True):
+                elapsed, peak_bytes = measure(lambda: load(fast_json), args.sample_size)
+                decoder = "orjson" if fast_json else "json"
+                print(f"{name:<36}{decoder:>10}{elapsed:>12.3f}{peak_bytes / 2**20:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
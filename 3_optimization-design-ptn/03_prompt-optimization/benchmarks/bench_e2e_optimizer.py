@@ -0,0 +1,270 @@
+"""
+End to end cost of GluePromptOpt.get_best_prompt() & evaluate() on the bundled configs & datasets, with LLM calls
+answered offline by SimulatedLLM (MODEL_TYPE=Simulated). Reports number of LLM calls, wall time & peak RSS of each
+stage. Each scenario runs in a fresh process, so that its peak RSS isn't that of an earlier scenario.
+
+Simulated responses & random choices of the optimizer are deterministic for a given `--seed`, hence number of
+calls is the same on every run, and any change in it comes from a change in the optimizer. Use `--save-baseline`
+to record a run, and `--baseline` to compare a later run against it: exits with status 1 if any stage makes more
+calls than baseline, or takes more wall time or peak RSS than `--tolerance` above baseline.
+
+Calls failed by `--error-rate` go through rate limiter's retries & backoff, as failed calls to the real endpoint
+do. `--error-backoff` sets the pause after a failure, which is doubled on every retry of the same call.
+
+    python -m benchmarks.bench_e2e_optimizer --latency 0.05 --save-baseline /tmp/e2e_baseline.json
+    python -m benchmarks.bench_e2e_optimizer --latency 0.05 --baseline /tmp/e2e_baseline.json
+
+Calls can be routed to tiers of models by phase, with a different mean latency for each model, to see what
+routing saves. Prices of models are read from `--llm-config`.
+
+    python -m benchmarks.bench_e2e_optimizer --latency 0.2 --phase-models scoring=gpt-4o-mini eval=gpt-4o-mini \
+        --model-latency gpt-4o-mini=0.05 --llm-config configs/llm_config.yaml
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from os.path import dirname, join
+
+import yaml
+
+ROOT_DIR = dirname(dirname(__file__))
+
+# name: (prompt optimization config, training dataset, test dataset, arguments of get_best_prompt())
+SCENARIOS = {
+    "baseline": (
+        "configs/baseline_promptopt_config.yaml",
+        None,
+        None,
+        dict(use_examples=False, run_without_train_examples=True, generate_synthetic_examples=False),
+    ),
+    "mobile": (
+        "configs/mobile_promptopt_config.yaml",
+        "dataset/mobile_transformed.jsonl",
+        "dataset/mobile_transformed.jsonl",
+        dict(use_examples=True, run_without_train_examples=False, generate_synthetic_examples=False),
+    ),
+    "summarization": (
+        "configs/summarization_promptopt_config.yaml",
+        "dataset/news_summarization_train.jsonl",
+        "dataset/news_summarization_test.jsonl",
+        dict(use_examples=True, run_without_train_examples=False, generate_synthetic_examples=False),
+    ),
+}
+
+
+def read_answer_key(*dataset_paths) -> dict:
+    from promptwizard.glue.common.llm.simulated_llm import SimulatedLLM
+
+    answer_key = {}
+    for dataset_path in dataset_paths:
+        if dataset_path:
+            answer_key.update(SimulatedLLM.read_answer_key(join(ROOT_DIR, dataset_path)))
+    return answer_key
+
+
+def get_peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def parse_pairs(pairs: list, value_type=str) -> dict:
+    """
+    :param pairs: List of strings in `key=value` format
+    """
+    return {key: value_type(value) for key, value in (pair.split("=", 1) for pair in pairs or [])}
+
+
+def run_scenario(
+    name: str,
+    sim_kwargs: dict,
+    base_dir: str,
+    phase_models: dict = None,
+    llm_config_path: str = None,
+    error_backoff_sec: float = None,
+) -> dict:
+    """
+    Run get_best_prompt() & evaluate() of scenario `name`, in a process of its own.
+
+    :param phase_models: Phase mapped to model its calls are routed to, in place of `phase_models` in config
+    :param llm_config_path: Path to llm_config.yaml, which has prices of models
+    :param error_backoff_sec: Pause of rate limiters after a failed call. None keeps the default.
+    :return: Dict key=stage, value=Dict of calls, failed (and retried) calls, wall time, peak RSS, accuracy &
+             usage per model of the stage
+    """
+    os.environ["MODEL_TYPE"] = "Simulated"
+    # Optimizer draws examples & candidates from `random`, which has to be seeded for calls to be the same every run
+    random.seed(sim_kwargs["seed"])
+    from promptwizard.glue.common.llm.llm_mgr import LLMMgr
+    from promptwizard.glue.common.llm.model_router import ModelRouter
+    from promptwizard.glue.common.llm.rate_limiter import LLMRateLimiter, RateLimiterRegistry
+    from promptwizard.glue.common.llm.simulated_llm import SimulatedLLMMetrics, SimulatedLLMRegistry
+    from promptwizard.glue.common.utils.profiler import PhaseProfiler
+    from promptwizard.glue.promptopt.instantiate import GluePromptOpt
+    from promptwizard.glue.promptopt.techniques.common_logic import DatasetSpecificProcessing
+    from promptwizard.glue.promptopt.techniques.critique_n_refine.core_logic import extract_between
+
+    class BenchDataset(DatasetSpecificProcessing):
+        def dataset_to_jsonl(self, dataset_jsonl: str, **kwargs) -> None:
+            pass
+
+        def extract_final_answer(self, llm_output):
+            if DatasetSpecificProcessing.ANSWER_START in llm_output:
+                return extract_between(
+                    DatasetSpecificProcessing.ANSWER_START, DatasetSpecificProcessing.ANSWER_END, llm_output
+                )
+            return llm_output
+
+    promptopt_config, train_jsonl, test_jsonl, best_prompt_kwargs = SCENARIOS[name]
+    SimulatedLLMRegistry.configure(answer_key=read_answer_key(train_jsonl, test_jsonl), **sim_kwargs)
+
+    with open(join(ROOT_DIR, "configs", "setup_config.yaml")) as fileobj:
+        setup_config = yaml.safe_load(fileobj)
+    setup_config["dir_info"]["base_dir"] = base_dir
+    setup_config["experiment_name"] = name
+    setup_config_path = join(base_dir, f"{name}_setup_config.yaml")
+    with open(setup_config_path, "w") as fileobj:
+        yaml.dump(setup_config, fileobj)
+
+    results = {}
+
+    def record(stage: str, start_time: float, errors_before: int, accuracy=None):
+        results[stage] = {
+            "calls": PhaseProfiler.get_summary()[PhaseProfiler.TOTAL][PhaseProfiler.CALLS],
+            "failed_calls": LLMMgr.get_simulated_llm_metrics()[SimulatedLLMMetrics.ERRORS] - errors_before,
+            "wall_sec": time.perf_counter() - start_time,
+            "peak_rss_mb": get_peak_rss_mb(),
+            "accuracy": accuracy,
+            "models": {
+                model: {key: usage[key] for key in (PhaseProfiler.CALLS, PhaseProfiler.LLM_SEC, PhaseProfiler.COST)}
+                for model, usage in LLMMgr.get_model_usage().items()
+                if model != PhaseProfiler.TOTAL
+            },
+        }
+
+    start_time = time.perf_counter()
+    gp = GluePromptOpt(
+        join(ROOT_DIR, promptopt_config),
+        setup_config_path,
+        dataset_jsonl=join(ROOT_DIR, train_jsonl) if train_jsonl else None,
+        data_processor=BenchDataset() if train_jsonl else None,
+        llm_config_path=llm_config_path,
+    )
+    if phase_models:
+        LLMMgr.set_phase_models(gp.prompt_opt_param.unique_model_id, phase_models)
+    if error_backoff_sec:
+        # Simulated calls are rate limited per deployment they are routed to, or per model when not routed
+        for model_id in {gp.prompt_opt_param.unique_model_id, *(phase_models or {}).values()}:
+            for deployment in {model_id, ModelRouter.get_deployment(model_id)}:
+                RateLimiterRegistry.register(deployment, LLMRateLimiter(error_backoff_in_seconds=error_backoff_sec))
+    gp.get_best_prompt(**best_prompt_kwargs)
+    record("get_best_prompt", start_time, 0)
+
+    if test_jsonl:
+        errors_before = LLMMgr.get_simulated_llm_metrics()[SimulatedLLMMetrics.ERRORS]
+        start_time = time.perf_counter()
+        accuracy = gp.evaluate(join(ROOT_DIR, test_jsonl))
+        record("evaluate", start_time, errors_before, accuracy)
+    return results
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    :return: Messages describing every stage that regressed from baseline
+    """
+    regressions = []
+    for name, stages in results.items():
+        for stage, metrics in stages.items():
+            base_metrics = baseline.get(name, {}).get(stage)
+            if not base_metrics:
+                continue
+            if metrics["calls"] > base_metrics["calls"]:
+                regressions.append(f"{name}/{stage}: {metrics['calls']} calls, baseline {base_metrics['calls']}")
+            for key in ("wall_sec", "peak_rss_mb"):
+                if metrics[key] > base_metrics[key] * (1 + tolerance):
+                    regressions.append(
+                        f"{name}/{stage}: {key} {metrics[key]:.2f}, baseline {base_metrics[key]:.2f} "
+                        f"+ {tolerance:.0%}"
+                    )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean latency of an LLM call, in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-backoff", type=float, default=0.05, help="Pause after a failed call, in seconds")
+    parser.add_argument("--accuracy", type=float, default=0.6)
+    parser.add_argument("--baseline", help="json file written by --save-baseline, to compare this run against")
+    parser.add_argument("--save-baseline", help="Write results of this run to this json file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--phase-models", nargs="*", help="phase=unique_model_id pairs, to route calls by phase")
+    parser.add_argument("--model-latency", nargs="*", help="unique_model_id=seconds pairs, mean latency per model")
+    parser.add_argument("--llm-config", help="llm_config.yaml that has models & their prices")
+    args = parser.parse_args()
+
+    sim_kwargs = dict(
+        seed=args.seed,
+        latency_mean_sec=args.latency,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        accuracy=args.accuracy,
+        model_latency_sec=parse_pairs(args.model_latency, float),
+    )
+    llm_config_path = os.path.abspath(args.llm_config) if args.llm_config else None
+    # Order of iterating over sets of prompts has to be the same in every run too. Spawned processes inherit it.
+    os.environ.setdefault("PYTHONHASHSEED", str(args.seed))
+    results = {}
+    with tempfile.TemporaryDirectory() as base_dir:
+        for name in args.scenarios:
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                results[name] = executor.submit(
+                    run_scenario,
+                    name,
+                    sim_kwargs,
+                    base_dir,
+                    parse_pairs(args.phase_models),
+                    llm_config_path,
+                    args.error_backoff,
+                ).result()
+
+    print(
+        f"\n{'scenario':<16}{'stage':<18}{'calls':>8}{'failed':>8}{'wall (s)':>10}{'peak RSS (MB)':>15}"
+        f"{'accuracy':>10}"
+    )
+    for name, stages in results.items():
+        for stage, metrics in stages.items():
+            accuracy = "" if metrics["accuracy"] is None else f"{metrics['accuracy']:.2f}"
+            print(
+                f"{name:<16}{stage:<18}{metrics['calls']:>8}{metrics['failed_calls']:>8}"
+                f"{metrics['wall_sec']:>10.2f}{metrics['peak_rss_mb']:>15.1f}{accuracy:>10}"
+            )
+            for model, usage in metrics["models"].items():
+                print(
+                    f"{'':<16}  {model:<16}{usage['calls']:>8}{'':>8}{usage['llm_sec']:>10.2f}  (LLM sec)"
+                    f"  cost {usage['cost']:.4f}"
+                )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fileobj:
+            json.dump(results, fileobj, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fileobj:
+            regressions = find_regressions(results, json.load(fileobj), args.tolerance)
+        if regressions:
+            print("Regressions from baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"No regression from baseline {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Time taken to import a module in a fresh interpreter, which is what every CLI run & every spawned sweep worker
+pays before doing any work, along with the modules that take most of it (from `python -X importtime`).
+Also times how long a worker spawned by multiprocessing takes to be ready with the module imported.
+
+    python -m benchmarks.bench_import_time --module promptwizard.glue.promptopt.instantiate --repeat 5
+"""
+import argparse
+import importlib
+import multiprocessing
+import statistics
+import subprocess
+import sys
+import time
+
+
+def time_import(module: str) -> float:
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - start_time
+
+
+def get_slowest_imports(module: str, top_n: int):
+    """
+    :return: List of (cumulative microseconds, module name) of `top_n` modules that took longest to import,
+             excluding `module` & its parent packages
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], check=True, capture_output=True, text=True
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if not module.startswith(name):
+            timings.append((int(cumulative_us), name))
+    return sorted(timings, reverse=True)[:top_n]
+
+
+def import_module(module: str) -> None:
+    importlib.import_module(module)
+
+
+def time_spawned_worker(module: str) -> float:
+    mp_context = multiprocessing.get_context("spawn")
+    start_time = time.perf_counter()
+    process = mp_context.Process(target=import_module, args=(module,))
+    process.start()
+    process.join()
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="promptwizard.glue.promptopt.instantiate")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # First run warms up OS file cache & writes .pyc files
+    time_import(args.module)
+    import_sec = [time_import(args.module) for _ in range(args.repeat)]
+    baseline_sec = [time_import("os") for _ in range(args.repeat)]
+    spawn_sec = [time_spawned_worker(args.module) for _ in range(args.repeat)]
+
+    print(f"{'':<36}{'median (s)':>12}{'min (s)':>12}")
+    for name, timings in (
+        ("python -c 'import os'", baseline_sec),
+        (f"import {args.module.rsplit('.', 1)[-1]}", import_sec),
+        ("spawned worker ready", spawn_sec),
+    ):
+        print(f"{name:<36}{statistics.median(timings):>12.3f}{min(timings):>12.3f}")
+
+    print(f"\nSlowest imports under {args.module}:")
+    for cumulative_us, name in get_slowest_imports(args.module, args.top):
+        print(f"{cumulative_us / 1000:>10.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
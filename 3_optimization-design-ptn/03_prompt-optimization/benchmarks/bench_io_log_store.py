@@ -0,0 +1,72 @@
+"""
+Time taken to write io logs with the jsonl and sqlite backends of ParamLogger, and to run run_over_logs() over
+records of one method, when that method wrote 1 in `--methods` records: jsonl backend has to decode every line,
+while sqlite backend fetches matching records using an index.
+
+    python -m benchmarks.bench_io_log_store --records 200000 --methods 10
+"""
+import argparse
+import tempfile
+import time
+from datetime import datetime
+from os.path import getsize, join
+
+from promptwizard.glue.paramlogger import ParamLogger
+from promptwizard.glue.paramlogger.constants import LogLiterals
+
+
+def make_record(i: int, methods: int) -> dict:
+    return {
+        LogLiterals.ID: f"sample-{i}",
+        LogLiterals.INPUTS: {"instruction": f"Let's think step by step, variant {i}.", "question": "x" * 200},
+        LogLiterals.OUTPUTS: [f"<ANS_START>{i}<ANS_END>", i % 2 == 0],
+        LogLiterals.META: {
+            LogLiterals.EXEC_SEC: 0.01,
+            LogLiterals.TIMESTAMP: datetime.now(),
+            LogLiterals.METHOD_NAME: f"method_{i % methods}",
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--methods", type=int, default=10)
+    args = parser.parse_args()
+
+    records = [make_record(i, args.methods) for i in range(args.records)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'backend':<10}{'write (s)':>12}{'run_over_logs (s)':>20}{'size (MB)':>12}")
+        for backend in (LogLiterals.JSONL_BACKEND, LogLiterals.SQLITE_BACKEND):
+            iolog = ParamLogger(join(tmp_dir, backend))
+            iolog.set_backend(backend)
+            jsonl_path = join(iolog.BASE_PATH, "io_logs.jsonl")
+
+            start_time = time.perf_counter()
+            with iolog.buffered_writes(flush_every=1000):
+                for record in records:
+                    iolog.append_as_jsonl(jsonl_path, record)
+            write_sec = time.perf_counter() - start_time
+
+            matched = []
+
+            @iolog.run_over_logs
+            def collect(self, dummy_id, dummy_input, dummy_output, dummy_meta):
+                if dummy_meta[LogLiterals.METHOD_NAME] == "method_0":
+                    matched.append(dummy_id)
+                return True
+
+            start_time = time.perf_counter()
+            if backend == LogLiterals.SQLITE_BACKEND:
+                log_path = iolog.get_store().db_path
+                collect(log_path, None, None, None, None, store_filters={"method_name": "method_0"})
+            else:
+                log_path = jsonl_path
+                collect(log_path, None, None, None, None)
+            run_sec = time.perf_counter() - start_time
+            assert len(matched) == args.records // args.methods + (args.records % args.methods > 0)
+            print(f"{backend:<10}{write_sec:>12.2f}{run_sec:>20.2f}{getsize(log_path) / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
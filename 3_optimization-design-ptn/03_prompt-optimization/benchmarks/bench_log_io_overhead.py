@@ -0,0 +1,124 @@
+"""
+Overhead that ParamLogger.log_io_params adds to each call of a decorated method, apart from writing the record:
+building the record with getfullargspec() on every call & str() of every hashable argument (as ParamLogger used
+to), versus with the LoggingPlan built when method is decorated. Overhead is measured with records dropped as
+they are built, and with records also serialized to json, which writers do in the calling thread.
+
+Calls pass a list of `--dataset-size` examples, like evaluate() & critique_and_refine() do, which ArgSerializer
+logs in full up to its `max_items` and as a summary beyond. Exits with status 1 if overhead of building records
+with LoggingPlan exceeds `--budget-us`.
+
+    python -m benchmarks.bench_log_io_overhead --calls 100000 --budget-us 15
+"""
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from inspect import getfullargspec
+from typing import Hashable
+
+from promptwizard.glue.paramlogger import ParamLogger
+from promptwizard.glue.paramlogger.constants import LogLiterals
+
+
+class DropWriter:
+    def __init__(self, serialize: bool):
+        """
+        :param serialize: Serialize records to json, like every writer does in the calling thread, before dropping
+        """
+        self.serialize = serialize
+
+    def write(self, file_path, json_obj):
+        if self.serialize:
+            json.dumps(json_obj, default=str)
+
+    def flush(self):
+        pass
+
+
+def introspect_per_call(method_obj, del_self_arg, *argv, **kwargs):
+    # How records were built before LoggingPlan, without the bug that logged defaults under a wrong name
+    start_time = time.time()
+    output = method_obj(*argv, **kwargs)
+    execution_time = time.time() - start_time
+
+    args_to_log = defaultdict(dict)
+    arg_spec = getfullargspec(method_obj)
+    arg_names = arg_spec.args
+    for arg_name, arg_val in zip(arg_names[: len(argv)], argv):
+        if isinstance(arg_val, Hashable) and not (del_self_arg and arg_name == "self"):
+            args_to_log[LogLiterals.INPUTS][arg_name] = str(arg_val)
+    args_to_log[LogLiterals.INPUTS].update(kwargs)
+    if arg_spec.defaults:
+        defaults_count = min(len(arg_names) - (len(argv) + len(kwargs)), len(arg_spec.defaults))
+        if defaults_count > 0:
+            for arg_name, arg_val in zip(arg_names[-defaults_count:], arg_spec.defaults[-defaults_count:]):
+                if isinstance(arg_val, Hashable):
+                    args_to_log[LogLiterals.INPUTS][arg_name] = str(arg_val)
+    args_to_log[LogLiterals.OUTPUTS] = output
+    args_to_log[LogLiterals.META][LogLiterals.EXEC_SEC] = execution_time
+    args_to_log[LogLiterals.META][LogLiterals.TIMESTAMP] = datetime.now()
+    return args_to_log
+
+
+class Scorer:
+    def score(self, instruction: str, dataset_subset: list, top_n: int = 5, further_enhance: bool = False):
+        return instruction
+
+
+def time_calls(method, calls: int, *argv) -> float:
+    start_time = time.perf_counter()
+    for _ in range(calls):
+        method(*argv)
+    return (time.perf_counter() - start_time) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--dataset-size", type=int, default=25)
+    parser.add_argument("--budget-us", type=float, default=15.0)
+    args = parser.parse_args()
+
+    iolog = ParamLogger()
+    scorer = Scorer()
+    instruction = "Let's think step by step. " * 20
+    dataset = [{"question": f"question {i}", "answer": str(i)} for i in range(args.dataset_size)]
+
+    def log_args(args_to_log):
+        args_to_log[LogLiterals.ID] = "sample"
+        args_to_log[LogLiterals.META][LogLiterals.METHOD_NAME] = "score"
+        iolog.WRITER.write("io_logs.jsonl", args_to_log)
+        return args_to_log[LogLiterals.OUTPUTS]
+
+    def introspected_score(*argv, **kwargs):
+        return log_args(introspect_per_call(Scorer.score, True, *argv, **kwargs))
+
+    methods = {
+        "undecorated": Scorer.score,
+        "getfullargspec per call": introspected_score,
+        "LoggingPlan": iolog.log_io_params(Scorer.score),
+    }
+    print(f"{'method':<28}{'overhead (us/call)':>22}{'with json (us/call)':>22}")
+    base_sec = None
+    for name, method in methods.items():
+        overheads_sec = []
+        for serialize in (False, True):
+            iolog.WRITER = DropWriter(serialize)
+            time_calls(method, args.calls // 10, scorer, instruction, dataset)
+            overheads_sec.append(time_calls(method, args.calls, scorer, instruction, dataset))
+        base_sec = base_sec or overheads_sec[0]
+        overheads_sec = [per_call_sec - base_sec for per_call_sec in overheads_sec]
+        print(f"{name:<28}{overheads_sec[0] * 1e6:>22.2f}{overheads_sec[1] * 1e6:>22.2f}")
+
+    overhead_us = overheads_sec[0] * 1e6
+    if overhead_us > args.budget_us:
+        print(f"Overhead of LoggingPlan ({overhead_us:.2f} us/call) exceeds budget of {args.budget_us} us/call")
+        sys.exit(1)
+    print(f"Overhead of LoggingPlan is within budget of {args.budget_us} us/call")
+
+
+if __name__ == "__main__":
+    main()
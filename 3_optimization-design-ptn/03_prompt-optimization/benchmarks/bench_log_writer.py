@@ -0,0 +1,84 @@
+"""
+Per call overhead of a method decorated with ParamLogger.log_io_params, when io logs are appended to file on every
+call (as ParamLogger used to), buffered in memory & written by the caller in batches (BufferedJsonlWriter), or
+written by a background thread (BackgroundJsonlWriter) with different fsync policies. Calls are made from
+`--threads` threads at once, like concurrent scoring does. Total time includes the final flush.
+
+    python -m benchmarks.bench_log_writer --calls 20000 --threads 8
+"""
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+
+from promptwizard.glue.paramlogger import ParamLogger
+from promptwizard.glue.paramlogger import file_utils as futil
+
+
+class AppendPerCallWriter:
+    """
+    Opens, appends to & closes the file on every call.
+    """
+
+    def write(self, file_path, json_obj):
+        futil.append_as_jsonl(file_path, json_obj)
+
+    def flush(self):
+        pass
+
+
+def run(writer, base_path: str, calls: int, threads: int):
+    iolog = ParamLogger(base_path)
+    iolog.WRITER = writer
+
+    @iolog.log_io_params
+    def score(instruction: str, question: str):
+        return [instruction, question, True]
+
+    def make_calls(thread_index: int):
+        latencies = []
+        for i in range(calls // threads):
+            start_time = time.perf_counter()
+            score(f"Let's think step by step, variant {thread_index}.", f"question {i} " + "x" * 200)
+            latencies.append(time.perf_counter() - start_time)
+        return latencies
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = [latency for result in executor.map(make_calls, range(threads)) for latency in result]
+    writer.flush()
+    total_sec = time.perf_counter() - start_time
+
+    with open(join(base_path, "io_logs.jsonl")) as fileobj:
+        lines = fileobj.readlines()
+    assert len(lines) == len(latencies), (len(lines), len(latencies))
+    latencies.sort()
+    return sum(latencies) / len(latencies), latencies[int(len(latencies) * 0.99)], total_sec
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    writers = {
+        "append per call": AppendPerCallWriter,
+        "buffered (caller writes)": lambda: futil.BufferedJsonlWriter(flush_every=100),
+        "background, fsync never": lambda: futil.BackgroundJsonlWriter(fsync_policy=futil.FsyncPolicies.NEVER),
+        "background, fsync close": lambda: futil.BackgroundJsonlWriter(fsync_policy=futil.FsyncPolicies.CLOSE),
+        "background, fsync flush": lambda: futil.BackgroundJsonlWriter(fsync_policy=futil.FsyncPolicies.FLUSH),
+    }
+    print(f"{'writer':<28}{'mean (us/call)':>16}{'p99 (us/call)':>16}{'total (s)':>12}")
+    for name, make_writer in writers.items():
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            writer = make_writer()
+            mean_sec, p99_sec, total_sec = run(writer, tmp_dir, args.calls, args.threads)
+            if isinstance(writer, futil.BackgroundJsonlWriter):
+                writer.close()
+            print(f"{name:<28}{mean_sec * 1e6:>16.1f}{p99_sec * 1e6:>16.1f}{total_sec:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
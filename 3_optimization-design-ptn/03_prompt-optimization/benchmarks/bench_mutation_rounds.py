@@ -0,0 +1,123 @@
+"""
+Wall clock time of gen_different_styles(), with mutation rounds run one after another and concurrently, and
+number of duplicate candidate prompts removed. LLM is simulated: every call sleeps for `--latency` seconds and
+returns `style_variation` prompts drawn from a small pool of phrasings, with random changes in case, spacing and
+punctuation, so that rounds produce exact and near duplicates like a real LLM at low temperature does.
+
+    python -m benchmarks.bench_mutation_rounds --latency 0.5 --mutation-rounds 5
+"""
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from os.path import dirname, join
+
+from promptwizard.glue.common.base_classes import SetupConfig
+from promptwizard.glue.common.utils.file import yaml_to_class
+from promptwizard.glue.promptopt.techniques.critique_n_refine.base_classes import (
+    CritiqueNRefineParams,
+    CritiqueNRefinePromptPool,
+)
+from promptwizard.glue.promptopt.techniques.critique_n_refine.core_logic import CritiqueNRefine
+
+ROOT_DIR = dirname(dirname(__file__))
+PHRASINGS = [
+    "Let's think step by step and solve the problem carefully.",
+    "Break the problem into smaller parts and solve each part one at a time.",
+    "Work backwards from what the question asks for, to the given facts.",
+    "List the known quantities, then write the equations that relate them.",
+    "Solve the problem, then verify the answer by substituting it back.",
+    "Think about a simpler version of the problem first and generalize.",
+    "Draw a diagram of the problem before solving it.",
+    "Explain the reasoning behind each step of the solution in plain words.",
+]
+
+
+class SimulatedCritiqueNRefine(CritiqueNRefine):
+    """
+    CritiqueNRefine whose LLM takes `latency` seconds to return mutated prompts.
+    """
+
+    def __init__(self, latency: float, style_variation: int, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latency = latency
+        self.style_variation = style_variation
+        self.rng = random.Random(0)
+
+    def get_mutations(self) -> str:
+        mutations = []
+        for phrasing in self.rng.sample(PHRASINGS, self.style_variation):
+            if self.rng.random() < 0.5:
+                phrasing = phrasing.lower().rstrip(".")
+            if self.rng.random() < 0.3:
+                phrasing = phrasing.replace(" ", "  ", 1) + " Be precise."
+            mutations.append(f"<START>{phrasing}<END>")
+        return "\n".join(mutations)
+
+    def chat_completion(self, user_prompt: str, system_prompt: str = None):
+        time.sleep(self.latency)
+        return self.get_mutations()
+
+    async def achat_completion(self, user_prompt: str, system_prompt: str = None):
+        await asyncio.sleep(self.latency)
+        return self.get_mutations()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--mutation-rounds", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    params = yaml_to_class(
+        join(ROOT_DIR, "configs", "baseline_promptopt_config.yaml"), CritiqueNRefineParams
+    )
+    prompt_pool = yaml_to_class(
+        None,
+        CritiqueNRefinePromptPool,
+        join(
+            ROOT_DIR, "promptwizard", "glue", "promptopt", "techniques",
+            "critique_n_refine", "prompt_pool.yaml",
+        ),
+    )
+    setup_config = yaml_to_class(join(ROOT_DIR, "configs", "setup_config.yaml"), SetupConfig)
+
+    print(
+        f"mutation_rounds={args.mutation_rounds}, style_variation={params.style_variation}, "
+        f"latency={args.latency}s, {args.repeats} repeats"
+    )
+    print(f"{'max_concurrency':<18}{'threshold':>10}{'sec/call':>10}{'candidates':>12}{'removed':>10}")
+    with tempfile.TemporaryDirectory() as base_path:
+        for max_concurrency, threshold in [
+            (1, 1.0), (args.mutation_rounds, 1.0), (args.mutation_rounds, params.dedupe_similarity_threshold),
+        ]:
+            elapsed, candidates_count, removed_count = 0.0, 0, 0
+            for _ in range(args.repeats):
+                prompt_opt = SimulatedCritiqueNRefine(
+                    args.latency, params.style_variation, [], base_path, setup_config,
+                    prompt_pool, None, logging.getLogger(__name__),
+                )
+                start_time = time.perf_counter()
+                candidates = prompt_opt.gen_different_styles(
+                    params.base_instruction,
+                    params.task_description,
+                    args.mutation_rounds,
+                    params.style_variation,
+                    max_concurrency,
+                    threshold,
+                )
+                elapsed += time.perf_counter() - start_time
+                candidates_count += len(candidates)
+                removed_count += prompt_opt.removed_candidates_count
+            print(
+                f"{max_concurrency:<18}{threshold:>10.2f}{elapsed / args.repeats:>10.2f}"
+                f"{candidates_count / args.repeats:>12.1f}{removed_count / args.repeats:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOpenAIServer:
+    """
+    Minimal OpenAI compatible HTTP server, that answers every chat completion request with a canned response.
+    Both OpenAI (`/v1/chat/completions`) and Azure OpenAI (`/openai/deployments/<name>/chat/completions`) routes
+    are served. Connections are kept alive (HTTP/1.1), just like the real service.
+    """
+
+    def __init__(
+        self,
+        response_text: str = "<ANS_START>42<ANS_END>",
+        latency_sec: float = 0.0,
+        throttled_requests: int = 0,
+    ):
+        """
+        :param response_text: Text returned as content of assistant message.
+        :param latency_sec: Time to sleep before answering each request.
+        :param throttled_requests: Number of initial requests that are answered with HTTP 429.
+        """
+        self.response_text = response_text
+        self.latency_sec = latency_sec
+        self.throttled_requests = throttled_requests
+        self.request_count = 0
+        self.connection_count = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately. Without TCP_NODELAY, Nagle's algorithm adds ~40ms to every
+            # response on a kept-alive connection.
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                stub.connection_count += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                request = json.loads(body or b"{}")
+                stub.request_count += 1
+                if stub.latency_sec:
+                    time.sleep(stub.latency_sec)
+                if stub.request_count <= stub.throttled_requests:
+                    error = {"error": {"code": "429", "message": "Rate limit exceeded"}}
+                    self._send_json(429, error, {"Retry-After": "1"})
+                    return
+
+                payload = {
+                    "id": f"chatcmpl-{stub.request_count}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "stub"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": stub.response_text},
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+                }
+                self._send_json(200, payload)
+
+            def _send_json(self, status: int, payload: dict, headers: dict = None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
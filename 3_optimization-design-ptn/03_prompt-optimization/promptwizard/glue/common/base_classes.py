@@ -50,6 +50,9 @@ class LLMQueueSchedulerLimits(UniversalBaseClass):
 class AzureAOIModels(LLMModel, UniversalBaseClass):
     model_name_in_azure: str
     deployment_name_in_azure: str
+    # Prices used to account cost of calls made to this model (see ModelRouter)
+    cost_per_1k_prompt_tokens: float = 0.0
+    cost_per_1k_completion_tokens: float = 0.0
 
 
 @dataclass
@@ -83,6 +86,10 @@ class LLMConfig(UniversalBaseClass):
 
     def __post_init__(self):
         self.azure_open_ai = AzureAOILM(**self.azure_open_ai)
+        if isinstance(self.user_limits, dict):
+            self.user_limits = UserLimits(**self.user_limits)
+        if isinstance(self.scheduler_limits, dict):
+            self.scheduler_limits = LLMQueueSchedulerLimits(**self.scheduler_limits)
         custom_model_obj = []
         if self.custom_models:
             for custom_model in self.custom_models:
@@ -116,6 +123,10 @@ class SetupConfig(UniversalBaseClass):
     experiment_name: str
     mode: OperationMode
     description: str
+    # `jsonl` or `sqlite`. Storage backend of io logs (see ParamLogger.set_backend())
+    io_log_backend: str = "jsonl"
+    # Name of method decorated by ParamLogger mapped to its capture policy (see ParamLogger.set_capture_policies())
+    io_log_policies: Optional[dict] = None
 
     def __post_init__(self):
         if self.dir_info:
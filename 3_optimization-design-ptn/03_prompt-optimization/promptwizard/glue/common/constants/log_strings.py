@@ -1,3 +1,3 @@
 class CommonLogsStr:
-    INSTALL_MISSING_LIB = "{lib_name} is not installed. Installing {lib_name}."
+    MISSING_LIBS = "Modules {modules} are not installed. Install them using: pip install {requirements}"
     LOG_SEPERATOR = "\n"+"="*150+"\n"
@@ -17,6 +17,40 @@ class OAILiterals:
     OPENAI_API_TYPE = "OPENAI_API_TYPE"
     OPENAI_API_VERSION = "OPENAI_API_VERSION"
     AZ_OPEN_AI_OBJECT = "AZ_OPEN_AI_OBJECT"
+    OPENAI_MODEL_NAME = "OPENAI_MODEL_NAME"
+    USE_OPENAI_API_KEY = "USE_OPENAI_API_KEY"
+    AZURE_OPENAI_API_KEY = "AZURE_OPENAI_API_KEY"
+    AZURE_OPENAI_ENDPOINT = "AZURE_OPENAI_ENDPOINT"
+    AZURE_OPENAI_DEPLOYMENT_NAME = "AZURE_OPENAI_DEPLOYMENT_NAME"
+    AZURE_AD_TOKEN_SCOPE = "https://cognitiveservices.azure.com/.default"
+
+
+@dataclass
+class ResponseCacheLiterals:
+    # Environment variables that enable & configure the on-disk cache of LLM responses
+    CACHE_PATH = "GLUE_LLM_CACHE_PATH"
+    CACHE_MODE = "GLUE_LLM_CACHE_MODE"
+    CACHE_MAX_SIZE_MB = "GLUE_LLM_CACHE_MAX_SIZE_MB"
+    # Values of CACHE_MODE
+    READ_WRITE = "readwrite"
+    READ_ONLY = "readonly"
+    OFF = "off"
+
+
+@dataclass
+class SimulatedLLMLiterals:
+    # Value of MODEL_TYPE environment variable that answers chat completions by SimulatedLLM, offline
+    MODEL_TYPE = "Simulated"
+    # Environment variables that configure SimulatedLLM
+    SEED = "GLUE_SIM_SEED"
+    LATENCY_MEAN_SEC = "GLUE_SIM_LATENCY_MEAN_SEC"
+    LATENCY_SIGMA = "GLUE_SIM_LATENCY_SIGMA"
+    ERROR_RATE = "GLUE_SIM_ERROR_RATE"
+    ACCURACY = "GLUE_SIM_ACCURACY"
+    ANSWER_KEY_PATH = "GLUE_SIM_ANSWER_KEY_PATH"
+    # Keys of rows in answer key jsonl file
+    QUESTION = "question"
+    FINAL_ANSWER = "final_answer"
 
 
 @dataclass
@@ -34,6 +68,10 @@ class InstallLibs:
     LLAMA_MM_LLM_AZ_OAI = "llama-index-multi-modal-llms-azure-openai==0.1.4"
     AZURE_CORE = "azure-core==1.30.1"
     TIKTOKEN = "tiktoken"
+    OPENAI = "openai>=1.70.0"
+    HTTPX = "httpx"
+    AZURE_IDENTITY = "azure-identity"
+    LLAMA_INDEX_CORE = "llama-index-core==0.12.28"
 
 
 @dataclass
@@ -43,3 +81,18 @@ class LLMLiterals:
     COMPLETION_LLM_TOKEN_COUNT = "completion_llm_token_count"
     TOTAL_LLM_TOKEN_COUNT = "total_llm_token_count"
 
+
+
+@dataclass
+class ProfilerPhases:
+    # Phases of a prompt optimization run, to which LLM calls are attributed by PhaseProfiler
+    MUTATION = "mutation"
+    SCORING = "scoring"
+    CRITIQUE = "critique"
+    REFINE = "refine"
+    MINE_EXAMPLES = "mine_examples"
+    REASONING = "reasoning"
+    EXPERT_IDENTITY = "expert_identity"
+    EVAL = "eval"
+    # LLM calls made outside of all the phases above
+    OTHER = "other"
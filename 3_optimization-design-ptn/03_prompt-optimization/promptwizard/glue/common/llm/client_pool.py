@@ -0,0 +1,222 @@
+import asyncio
+import os
+import threading
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from ..constants.str_literals import OAILiterals
+from ..utils.logging import get_glue_logger
+
+logger = get_glue_logger(__name__)
+
+
+@dataclass(frozen=True)
+class LLMEndpoint:
+    """
+    Identifies a single chat completion target i.e. provider, endpoint and deployment. Calls that resolve to equal
+    LLMEndpoint objects share one client, and hence one pool of keep-alive HTTP connections.
+    """
+
+    OPENAI = "openai"
+    AZURE = "azure"
+
+    provider: str
+    deployment: str
+    endpoint: Optional[str] = None
+    api_version: Optional[str] = None
+    # Kept out of repr, so that endpoints can be logged without leaking secrets
+    api_key: Optional[str] = field(default=None, repr=False)
+
+    @staticmethod
+    def from_env(deployment: str = None) -> "LLMEndpoint":
+        """
+        Build endpoint from the environment variables that `call_api` has always read.
+
+        :param deployment: Name of model/deployment to be used. When None, it is read from environment.
+        :return: Object of LLMEndpoint
+        """
+        if os.environ.get(OAILiterals.USE_OPENAI_API_KEY) == "True":
+            return LLMEndpoint(
+                provider=LLMEndpoint.OPENAI,
+                deployment=deployment or os.environ[OAILiterals.OPENAI_MODEL_NAME],
+                api_key=os.environ[OAILiterals.OPENAI_API_KEY],
+            )
+        return LLMEndpoint(
+            provider=LLMEndpoint.AZURE,
+            deployment=deployment
+            or os.environ[OAILiterals.AZURE_OPENAI_DEPLOYMENT_NAME],
+            endpoint=os.environ[OAILiterals.AZURE_OPENAI_ENDPOINT],
+            api_version=os.environ[OAILiterals.OPENAI_API_VERSION],
+            # When api key is not set, Azure AD token is used for authentication
+            api_key=os.environ.get(OAILiterals.AZURE_OPENAI_API_KEY) or None,
+        )
+
+
+class LLMClientPool:
+    """
+    Process-wide registry of OpenAI/AzureOpenAI clients, one client per LLMEndpoint. Clients are created lazily on
+    first use and then reused for every call, so that HTTP connections (and TLS sessions) are kept alive across
+    calls instead of being re-established for each chat completion.
+
+    Azure AD credentials & token providers are cached per scope. Token provider returned by azure.identity caches
+    the bearer token and refreshes it only when it is about to expire.
+    """
+
+    # Connections idle for longer than this are closed. Default in httpx is 5 sec, which is shorter than the
+    # typical gap between two LLM calls of an optimization run.
+    KEEPALIVE_EXPIRY_SEC = 120
+    MAX_CONNECTIONS = 100
+    MAX_KEEPALIVE_CONNECTIONS = 20
+    # Retries are done by call_api(), in co-ordination with rate limiter. Hence client itself shouldn't retry.
+    MAX_RETRIES = 0
+
+    _lock = threading.Lock()
+    _clients: Dict[LLMEndpoint, Any] = {}
+    # Async clients can't be shared across event loops. Hence they are cached per loop.
+    _async_clients = weakref.WeakKeyDictionary()
+    _token_providers: Dict[str, Callable[[], str]] = {}
+
+    @classmethod
+    def get_client(cls, endpoint: LLMEndpoint):
+        """
+        Return the synchronous client for `endpoint`. Create it if it doesn't exist.
+
+        :param endpoint: Object of LLMEndpoint
+        :return: Object of openai.OpenAI or openai.AzureOpenAI
+        """
+        client = cls._clients.get(endpoint)
+        if client is None:
+            with cls._lock:
+                client = cls._clients.get(endpoint)
+                if client is None:
+                    client = cls._create_client(endpoint)
+                    cls._clients[endpoint] = client
+        return client
+
+    @classmethod
+    def get_async_client(cls, endpoint: LLMEndpoint):
+        """
+        Return the asynchronous client for `endpoint`, bound to the running event loop. Create it if it doesn't exist.
+
+        :param endpoint: Object of LLMEndpoint
+        :return: Object of openai.AsyncOpenAI or openai.AsyncAzureOpenAI
+        """
+        loop = asyncio.get_running_loop()
+        with cls._lock:
+            loop_clients = cls._async_clients.setdefault(loop, {})
+            client = loop_clients.get(endpoint)
+            if client is None:
+                client = cls._create_client(endpoint, use_async=True)
+                loop_clients[endpoint] = client
+        return client
+
+    @classmethod
+    def get_token_provider(
+        cls, scope: str = OAILiterals.AZURE_AD_TOKEN_SCOPE
+    ) -> Callable[[], str]:
+        """
+        Return a cached Azure AD bearer token provider for the given scope.
+
+        :param scope: Scope for which token is requested.
+        :return: Callable that returns a valid bearer token.
+        """
+        token_provider = cls._token_providers.get(scope)
+        if token_provider is None:
+            from azure.identity import get_bearer_token_provider, AzureCliCredential
+
+            with cls._lock:
+                token_provider = cls._token_providers.get(scope)
+                if token_provider is None:
+                    token_provider = get_bearer_token_provider(
+                        AzureCliCredential(), scope
+                    )
+                    cls._token_providers[scope] = token_provider
+        return token_provider
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Close all cached clients and forget cached credentials.
+        """
+        with cls._lock:
+            clients, cls._clients = cls._clients, {}
+            async_clients, cls._async_clients = dict(cls._async_clients), weakref.WeakKeyDictionary()
+            cls._token_providers = {}
+        for client in clients.values():
+            client.close()
+        for loop, loop_clients in async_clients.items():
+            for client in loop_clients.values():
+                cls._close_async_client(client, loop)
+
+    @staticmethod
+    def _close_async_client(client, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Close async client on the loop it's bound to, as its connection pool can only be closed there.
+        """
+        if loop.is_closed():
+            # Connections were dropped along with the loop
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is loop:
+            # Called from a coroutine on the same loop, which can't be blocked on
+            loop.create_task(client.close())
+        elif loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result()
+        else:
+            loop.run_until_complete(client.close())
+
+    @classmethod
+    def _http_limits(cls):
+        import httpx
+
+        return httpx.Limits(
+            max_connections=cls.MAX_CONNECTIONS,
+            max_keepalive_connections=cls.MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=cls.KEEPALIVE_EXPIRY_SEC,
+        )
+
+    @classmethod
+    def _create_client(cls, endpoint: LLMEndpoint, use_async: bool = False):
+        from openai import (
+            AsyncAzureOpenAI,
+            AsyncOpenAI,
+            AzureOpenAI,
+            DefaultAsyncHttpxClient,
+            DefaultHttpxClient,
+            OpenAI,
+        )
+
+        if use_async:
+            openai_cls, azure_openai_cls = AsyncOpenAI, AsyncAzureOpenAI
+            http_client = DefaultAsyncHttpxClient(limits=cls._http_limits())
+        else:
+            openai_cls, azure_openai_cls = OpenAI, AzureOpenAI
+            http_client = DefaultHttpxClient(limits=cls._http_limits())
+        logger.info(f"Creating {openai_cls.__name__} client for {endpoint}")
+
+        if endpoint.provider == LLMEndpoint.OPENAI:
+            return openai_cls(
+                api_key=endpoint.api_key,
+                max_retries=cls.MAX_RETRIES,
+                http_client=http_client,
+            )
+
+        if endpoint.api_key:
+            return azure_openai_cls(
+                api_version=endpoint.api_version,
+                azure_endpoint=endpoint.endpoint,
+                api_key=endpoint.api_key,
+                max_retries=cls.MAX_RETRIES,
+                http_client=http_client,
+            )
+        return azure_openai_cls(
+            api_version=endpoint.api_version,
+            azure_endpoint=endpoint.endpoint,
+            azure_ad_token_provider=cls.get_token_provider(),
+            max_retries=cls.MAX_RETRIES,
+            http_client=http_client,
+        )
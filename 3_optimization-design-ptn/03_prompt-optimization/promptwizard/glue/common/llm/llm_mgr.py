@@ -1,8 +1,4 @@
-from typing import Dict
-from llama_index.core.callbacks import CallbackManager, TokenCountingHandler
-from llama_index.core.llms import ChatMessage
-from llama_index.core.llms import LLM
-from tenacity import retry, stop_after_attempt, wait_fixed, wait_random
+from typing import TYPE_CHECKING, Dict, Tuple
 from ..base_classes import LLMConfig
 from ..constants.str_literals import (
     InstallLibs,
@@ -10,69 +6,345 @@ from ..constants.str_literals import (
     OAILiterals,
     LLMLiterals,
     LLMOutputTypes,
+    ResponseCacheLiterals,
+    SimulatedLLMLiterals,
 )
+from .client_pool import LLMClientPool, LLMEndpoint
 from .llm_helper import get_token_counter
+from .model_router import ModelRouter
+from .rate_limiter import LLMRateLimiter, RateLimiterRegistry, get_retry_after_sec
+from .response_cache import LLMResponseCache, ResponseCacheRegistry
+from .simulated_llm import SimulatedLLMError, SimulatedLLMRegistry
 from ..exceptions import GlueLLMException
-from ..utils.runtime_tasks import install_lib_if_missing
 from ..utils.logging import get_glue_logger
-from ..utils.runtime_tasks import str_to_class
+from ..utils.profiler import PhaseProfiler
+from ..utils.runtime_tasks import check_dependencies, str_to_class
 import os
 
+if TYPE_CHECKING:
+    # llama_index takes more than a second to import, and is needed only for LLMs created by get_llm_pool()
+    from llama_index.core.llms import LLM
+
 logger = get_glue_logger(__name__)
 
+# Every chat completion is made deterministic, which is what makes its response cacheable
+TEMPERATURE = 0.0
+
+
+def get_retryable_errors() -> Tuple:
+    """
+    :return: Exception classes of openai client (and of simulated LLM), for which the request should be retried
+    """
+    from openai import APIConnectionError, InternalServerError, RateLimitError
+
+    return RateLimitError, APIConnectionError, InternalServerError, SimulatedLLMError
 
-def call_api(messages):
 
-    from openai import OpenAI
-    from azure.identity import get_bearer_token_provider, AzureCliCredential
-    from openai import AzureOpenAI
+def estimate_tokens(rate_limiter: LLMRateLimiter, messages, model: str) -> int:
+    """
+    Estimate tokens of the request, only if rate limiter needs it.
+    """
+    if not rate_limiter.tokens_per_min:
+        return 0
+    return RateLimiterRegistry.estimate_tokens(messages, model)
 
-    if os.environ["USE_OPENAI_API_KEY"] == "True":
-        client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
 
-        response = client.chat.completions.create(
-            model=os.environ["OPENAI_MODEL_NAME"],
-            messages=messages,
-            temperature=0.0,
+def handle_retryable_error(
+    rate_limiter: LLMRateLimiter, estimated_tokens: int, attempt: int, excep_obj
+) -> None:
+    """
+    Release the tokens reserved for failed request & pause the deployment before the request is retried. When
+    retries are exhausted, raise exception instead of returning a made up response, so that it doesn't get scored
+    as a wrong answer.
+    """
+    from openai import RateLimitError
+
+    rate_limiter.reconcile(estimated_tokens, 0)
+    if attempt >= rate_limiter.MAX_RETRIES:
+        raise GlueLLMException(
+            f"LLM request failed after {attempt + 1} attempts", excep_obj
         )
-    else:
-        print("=== Using Azure OpenAI ===")
-        token_provider = get_bearer_token_provider(
-            AzureCliCredential(), "https://cognitiveservices.azure.com/.default"
+    rate_limiter.backoff(
+        attempt,
+        get_retry_after_sec(excep_obj),
+        is_throttled=isinstance(excep_obj, RateLimitError),
+    )
+
+
+def call_api(messages, deployment: str = None):
+    """
+    Make a chat completion request to OpenAI/Azure OpenAI endpoint configured in environment. Client is taken from
+    LLMClientPool, so that connections & credentials are reused across calls. Request waits for its turn in the
+    rate limiter of the deployment, and is retried with backoff when throttled. When LLM response cache is
+    enabled, identical requests are answered from the cache.
+
+    :param messages: List of messages in OpenAI chat format.
+    :param deployment: Name of model/deployment to be used. When None, it is read from environment.
+    :return: Text generated by LLM
+    """
+    endpoint = LLMEndpoint.from_env(deployment)
+    cache = ResponseCacheRegistry.get()
+    if cache:
+        cache_key = LLMResponseCache.make_key(
+            messages,
+            endpoint.provider,
+            endpoint.endpoint,
+            endpoint.deployment,
+            temperature=TEMPERATURE,
         )
-        client = AzureOpenAI(
-            api_version=os.environ["OPENAI_API_VERSION"],
-            azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
-            api_key=os.environ["AZURE_OPENAI_API_KEY"],
-            # azure_ad_token_provider=token_provider,
+        prediction = cache.get(cache_key)
+        if prediction is not None:
+            PhaseProfiler.record_usage(is_cached=True)
+            return prediction
+
+    client = LLMClientPool.get_client(endpoint)
+    rate_limiter = RateLimiterRegistry.get(endpoint.deployment)
+    estimated_tokens = estimate_tokens(rate_limiter, messages, endpoint.deployment)
+    retryable_errors = get_retryable_errors()
+
+    for attempt in range(rate_limiter.MAX_RETRIES + 1):
+        PhaseProfiler.record_usage(queue_sec=rate_limiter.acquire(estimated_tokens))
+        try:
+            response = client.chat.completions.create(
+                model=endpoint.deployment,
+                messages=messages,
+                temperature=TEMPERATURE,
+            )
+            break
+        except retryable_errors as e:
+            handle_retryable_error(rate_limiter, estimated_tokens, attempt, e)
+
+    if response.usage:
+        rate_limiter.reconcile(estimated_tokens, response.usage.total_tokens)
+        PhaseProfiler.record_usage(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
         )
-        response = client.chat.completions.create(
-            model=os.environ["AZURE_OPENAI_DEPLOYMENT_NAME"],
-            messages=messages,
-            temperature=0.0,
+    prediction = response.choices[0].message.content
+    if cache:
+        cache.put(cache_key, prediction)
+    return prediction
+
+
+async def acall_api(messages, deployment: str = None):
+    """
+    Asynchronous version of call_api(). Client is taken from LLMClientPool and is bound to the running event loop.
+
+    :param messages: List of messages in OpenAI chat format.
+    :param deployment: Name of model/deployment to be used. When None, it is read from environment.
+    :return: Text generated by LLM
+    """
+    endpoint = LLMEndpoint.from_env(deployment)
+    cache = ResponseCacheRegistry.get()
+    if cache:
+        cache_key = LLMResponseCache.make_key(
+            messages,
+            endpoint.provider,
+            endpoint.endpoint,
+            endpoint.deployment,
+            temperature=TEMPERATURE,
         )
+        prediction = cache.get(cache_key)
+        if prediction is not None:
+            PhaseProfiler.record_usage(is_cached=True)
+            return prediction
+
+    client = LLMClientPool.get_async_client(endpoint)
+    rate_limiter = RateLimiterRegistry.get(endpoint.deployment)
+    estimated_tokens = estimate_tokens(rate_limiter, messages, endpoint.deployment)
+    retryable_errors = get_retryable_errors()
 
+    for attempt in range(rate_limiter.MAX_RETRIES + 1):
+        PhaseProfiler.record_usage(queue_sec=await rate_limiter.aacquire(estimated_tokens))
+        try:
+            response = await client.chat.completions.create(
+                model=endpoint.deployment,
+                messages=messages,
+                temperature=TEMPERATURE,
+            )
+            break
+        except retryable_errors as e:
+            handle_retryable_error(rate_limiter, estimated_tokens, attempt, e)
+
+    if response.usage:
+        rate_limiter.reconcile(estimated_tokens, response.usage.total_tokens)
+        PhaseProfiler.record_usage(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+        )
     prediction = response.choices[0].message.content
+    if cache:
+        cache.put(cache_key, prediction)
     return prediction
 
 
+def get_simulated_rate_limiter(model_id: str, deployment: str) -> LLMRateLimiter:
+    """
+    :return: Rate limiter of the deployment a simulated call stands in for
+    """
+    return RateLimiterRegistry.get(deployment or model_id or SimulatedLLMLiterals.MODEL_TYPE)
+
+
+def call_simulated_llm(messages, model_id: str = None, deployment: str = None):
+    """
+    Answer a chat completion using SimulatedLLM. Call waits for its turn in rate limiter and failures are retried
+    with backoff, the same as in call_api(), so that simulated runs exercise retries & backoff too.
+
+    :param messages: List of messages in OpenAI chat format.
+    :param model_id: unique_model_id of model to which the call is routed
+    :param deployment: Name of deployment to which the call is routed, if any
+    :return: Text generated by simulated LLM
+    """
+    llm = SimulatedLLMRegistry.get()
+    rate_limiter = get_simulated_rate_limiter(model_id, deployment)
+    for attempt in range(rate_limiter.MAX_RETRIES + 1):
+        PhaseProfiler.record_usage(queue_sec=rate_limiter.acquire(0))
+        try:
+            return llm.chat_completion(messages, model_id, attempt)
+        except SimulatedLLMError as e:
+            handle_retryable_error(rate_limiter, 0, attempt, e)
+
+
+async def acall_simulated_llm(messages, model_id: str = None, deployment: str = None):
+    """
+    Asynchronous version of call_simulated_llm().
+    """
+    llm = SimulatedLLMRegistry.get()
+    rate_limiter = get_simulated_rate_limiter(model_id, deployment)
+    for attempt in range(rate_limiter.MAX_RETRIES + 1):
+        PhaseProfiler.record_usage(queue_sec=await rate_limiter.aacquire(0))
+        try:
+            return await llm.achat_completion(messages, model_id, attempt)
+        except SimulatedLLMError as e:
+            handle_retryable_error(rate_limiter, 0, attempt, e)
+
+
 class LLMMgr:
     @staticmethod
     def chat_completion(messages: Dict):
         llm_handle = os.environ.get("MODEL_TYPE", "AzureOpenAI")
+        model_id, deployment = ModelRouter.get_route()
         try:
             if llm_handle == "AzureOpenAI":
                 # Code to for calling LLMs
-                return call_api(messages)
+                with PhaseProfiler.llm_call(model_id):
+                    return call_api(messages, deployment)
             elif llm_handle == "LLamaAML":
                 # Code to for calling SLMs
                 return 0
+            elif llm_handle == SimulatedLLMLiterals.MODEL_TYPE:
+                with PhaseProfiler.llm_call(model_id):
+                    return call_simulated_llm(messages, model_id, deployment)
+        except GlueLLMException:
+            # Throttling that outlived all retries. Must not be mistaken for an answer.
+            raise
         except Exception as e:
-            print(e)
+            logger.error(f"LLM call failed: {e}")
             return "Sorry, I am not able to understand your query. Please try again."
             # raise GlueLLMException(f"Exception when calling {llm_handle.__class__.__name__} "
             #                        f"LLM in chat mode, with message {messages} ", e)
 
+    @staticmethod
+    async def achat_completion(messages: Dict):
+        """
+        Asynchronous version of chat_completion(). Many calls can be awaited concurrently, e.g. using
+        asyncio.gather(), without blocking on each other.
+
+        :param messages: List of messages in OpenAI chat format.
+        :return: Text generated by LLM
+        """
+        llm_handle = os.environ.get("MODEL_TYPE", "AzureOpenAI")
+        model_id, deployment = ModelRouter.get_route()
+        try:
+            if llm_handle == "AzureOpenAI":
+                with PhaseProfiler.llm_call(model_id):
+                    return await acall_api(messages, deployment)
+            elif llm_handle == "LLamaAML":
+                return 0
+            elif llm_handle == SimulatedLLMLiterals.MODEL_TYPE:
+                with PhaseProfiler.llm_call(model_id):
+                    return await acall_simulated_llm(messages, model_id, deployment)
+        except GlueLLMException:
+            raise
+        except Exception as e:
+            logger.error(f"LLM call failed: {e}")
+            return "Sorry, I am not able to understand your query. Please try again."
+
+    @staticmethod
+    def set_rate_limits(llm_config: LLMConfig, shared_states: Dict = None) -> None:
+        """
+        Throttle requests to each model as per `req_per_min` & `tokens_per_min` set for it in `llm_config`.
+
+        :param llm_config: Object having all settings & preferences for all LLMs to be used in out system
+        :param shared_states: Dict returned by RateLimiterRegistry.create_shared_states(), when limits are to be
+                              shared by many processes
+        """
+        RateLimiterRegistry.configure(llm_config, shared_states)
+
+    @staticmethod
+    def get_rate_limiter_metrics() -> Dict[str, Dict[str, float]]:
+        """
+        :return: Dict key=deployment name, value=Dict of queue depth, wait times, throttled request count etc.
+        """
+        return RateLimiterRegistry.get_metrics()
+
+    @staticmethod
+    def set_response_cache(
+        path: str,
+        max_size_mb: float = None,
+        mode: str = ResponseCacheLiterals.READ_WRITE,
+    ) -> None:
+        """
+        Cache responses of chat completions on disk, so that re-running an experiment doesn't call the LLM again.
+
+        :param path: Path to SQLite file. None disables the cache.
+        :param max_size_mb: Max total size of cached responses in MB, beyond which least recently used responses
+                            are evicted. None means no limit.
+        :param mode: `readwrite`, `readonly` (replay recorded responses, fail on anything not recorded) or `off`
+        """
+        ResponseCacheRegistry.configure(path, max_size_mb, mode)
+
+    @staticmethod
+    def get_response_cache_metrics() -> Dict[str, float]:
+        """
+        :return: Dict of hits, misses, evictions, number of entries etc. None if caching is disabled.
+        """
+        return ResponseCacheRegistry.get_metrics()
+
+    @staticmethod
+    def set_models(llm_config: LLMConfig) -> None:
+        """
+        Make models in `llm_config` available for routing calls to, along with their prices.
+
+        :param llm_config: Object having all settings & preferences for all LLMs to be used in out system
+        """
+        ModelRouter.configure_models(llm_config)
+
+    @staticmethod
+    def set_phase_models(default_model_id: str = None, phase_models: Dict[str, str] = None) -> None:
+        """
+        Route calls made in each phase of prompt optimization to the model assigned to it. See ModelRouter.
+
+        :param default_model_id: `unique_model_id` to which calls in phases without a model are accounted
+        :param phase_models: Dict key=phase (one of ProfilerPhases), value=`unique_model_id` of model
+        """
+        ModelRouter.configure_routes(default_model_id, phase_models)
+
+    @staticmethod
+    def get_model_usage() -> Dict[str, Dict[str, float]]:
+        """
+        :return: Dict key=unique_model_id, value=Dict of calls, LLM time, tokens & cost of calls made to that model
+                 since last PhaseProfiler.reset(). Key `total` has the same over all models.
+        """
+        return PhaseProfiler.get_model_summary(ModelRouter.get_prices())
+
+    @staticmethod
+    def get_simulated_llm_metrics() -> Dict[str, float]:
+        """
+        :return: Dict of calls, failed calls, total latency etc. of simulated LLM. None if it's not in use.
+        """
+        return SimulatedLLMRegistry.get_metrics()
+
     @staticmethod
     def get_all_model_ids_of_type(llm_config: LLMConfig, llm_output_type: str):
         res = []
@@ -86,7 +358,49 @@ class LLMMgr:
         return res
 
     @staticmethod
-    def get_llm_pool(llm_config: LLMConfig) -> Dict[str, LLM]:
+    def get_dependencies(llm_config: LLMConfig = None) -> Dict[str, str]:
+        """
+        :param llm_config: Object having all settings & preferences for all LLMs, if LLMs are to be created using
+                           get_llm_pool()
+        :return: Dict key=module that would be imported to call the LLMs, value=pip requirement that provides it
+        """
+        dependencies = {}
+        if os.environ.get("MODEL_TYPE", "AzureOpenAI") == "AzureOpenAI":
+            dependencies["openai"] = InstallLibs.OPENAI
+            dependencies["httpx"] = InstallLibs.HTTPX
+            if os.environ.get(OAILiterals.USE_OPENAI_API_KEY) != "True" and not os.environ.get(
+                OAILiterals.AZURE_OPENAI_API_KEY
+            ):
+                # Azure AD token is used for authentication
+                dependencies["azure.identity"] = InstallLibs.AZURE_IDENTITY
+
+        if llm_config and llm_config.azure_open_ai:
+            dependencies["openai"] = InstallLibs.OPENAI
+            dependencies["azure.identity"] = InstallLibs.AZURE_IDENTITY
+            dependencies["tiktoken"] = InstallLibs.TIKTOKEN
+            dependencies["llama_index.core"] = InstallLibs.LLAMA_INDEX_CORE
+            for azure_oai_model in llm_config.azure_open_ai.azure_oai_models:
+                if azure_oai_model.model_type == LLMOutputTypes.EMBEDDINGS:
+                    dependencies["llama_index.embeddings.azure_openai"] = InstallLibs.LLAMA_EMB_AZ_OAI
+                elif azure_oai_model.model_type == LLMOutputTypes.MULTI_MODAL:
+                    dependencies["llama_index.multi_modal_llms.azure_openai"] = InstallLibs.LLAMA_MM_LLM_AZ_OAI
+        if llm_config and llm_config.custom_models:
+            dependencies["llama_index.core"] = InstallLibs.LLAMA_INDEX_CORE
+        return dependencies
+
+    @staticmethod
+    def check_dependencies(llm_config: LLMConfig = None) -> None:
+        """
+        Check that every library needed to call the LLMs is installed, without importing any of them. Raise
+        GlueValidaionException listing all the missing ones, so that a run fails before it does any work, instead
+        of installing them while it runs.
+
+        :param llm_config: Same as that of get_dependencies()
+        """
+        check_dependencies(LLMMgr.get_dependencies(llm_config))
+
+    @staticmethod
+    def get_llm_pool(llm_config: LLMConfig) -> Dict[str, "LLM"]:
         """
         Create a dictionary of LLMs. key would be unique id of LLM, value is object using which
         methods associated with that LLM service can be called.
@@ -95,29 +409,20 @@ class LLMMgr:
         :return: Dict key=unique_model_id of LLM, value=Object of class llama_index.core.llms.LLM
         which can be used as handle to that LLM
         """
+        LLMMgr.check_dependencies(llm_config)
+        from llama_index.core.callbacks import CallbackManager, TokenCountingHandler
+
         llm_pool = {}
         az_llm_config = llm_config.azure_open_ai
 
         if az_llm_config:
-            install_lib_if_missing(InstallLibs.LLAMA_LLM_AZ_OAI)
-            install_lib_if_missing(InstallLibs.LLAMA_EMB_AZ_OAI)
-            install_lib_if_missing(InstallLibs.LLAMA_MM_LLM_AZ_OAI)
-            install_lib_if_missing(InstallLibs.TIKTOKEN)
-
             import tiktoken
 
             # from llama_index.llms.azure_openai import AzureOpenAI
             from openai import AzureOpenAI
-            from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
-            from llama_index.multi_modal_llms.azure_openai import AzureOpenAIMultiModal
 
-            az_token_provider = None
             # if az_llm_config.use_azure_ad:
-            from azure.identity import get_bearer_token_provider, AzureCliCredential
-
-            az_token_provider = get_bearer_token_provider(
-                AzureCliCredential(), "https://cognitiveservices.azure.com/.default"
-            )
+            az_token_provider = LLMClientPool.get_token_provider()
 
             for azure_oai_model in az_llm_config.azure_oai_models:
                 callback_mgr = None
@@ -150,6 +455,8 @@ class LLMMgr:
                     )
                     # ()
                 elif azure_oai_model.model_type == LLMOutputTypes.EMBEDDINGS:
+                    from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
+
                     llm_pool[azure_oai_model.unique_model_id] = AzureOpenAIEmbedding(
                         use_azure_ad=az_llm_config.use_azure_ad,
                         azure_ad_token_provider=az_token_provider,
@@ -161,6 +468,7 @@ class LLMMgr:
                         callback_manager=callback_mgr,
                     )
                 elif azure_oai_model.model_type == LLMOutputTypes.MULTI_MODAL:
+                    from llama_index.multi_modal_llms.azure_openai import AzureOpenAIMultiModal
 
                     llm_pool[azure_oai_model.unique_model_id] = AzureOpenAIMultiModal(
                         use_azure_ad=az_llm_config.use_azure_ad,
@@ -196,7 +504,7 @@ class LLMMgr:
         return llm_pool
 
     @staticmethod
-    def get_tokens_used(llm_handle: LLM) -> Dict[str, int]:
+    def get_tokens_used(llm_handle: "LLM") -> Dict[str, int]:
         """
         For a given LLM, output the number of tokens used.
 
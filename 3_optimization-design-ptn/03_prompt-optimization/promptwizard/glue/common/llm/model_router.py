@@ -0,0 +1,127 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from ..base_classes import LLMConfig
+from ..constants.str_literals import ProfilerPhases
+from ..exceptions import GlueValidaionException
+from ..utils.logging import get_glue_logger
+from ..utils.profiler import PhaseProfiler
+
+logger = get_glue_logger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """
+    Model that LLM calls can be routed to, as defined in llm_config.yaml
+    """
+
+    unique_model_id: str
+    deployment: str
+    cost_per_1k_prompt_tokens: float = 0.0
+    cost_per_1k_completion_tokens: float = 0.0
+
+
+class ModelRouter:
+    """
+    Process-wide routing of LLM calls to models, by phase of prompt optimization in which the call is made (see
+    ProfilerPhases). E.g. bulk of the calls, made while scoring candidate prompts, can go to a smaller & faster
+    deployment while critique & refinement go to the strongest one.
+
+    Routes are set from `phase_models` in prompt optimization config, which maps a phase to `unique_model_id` of a
+    model. Deployment & prices of a model are read from llm_config.yaml. When a model isn't in llm_config.yaml (or
+    it's not given), its `unique_model_id` is taken as name of deployment. Calls made in phases that aren't routed
+    go to deployment set in environment, as they always have, and are accounted to the default `unique_model_id`.
+    """
+
+    _lock = threading.Lock()
+    _models: Dict[str, ModelTier] = {}
+    _default_model_id: Optional[str] = None
+    _phase_models: Dict[str, str] = {}
+
+    @classmethod
+    def configure_models(cls, llm_config: LLMConfig) -> None:
+        """
+        Register every Azure OpenAI model in `llm_config` as a model that calls can be routed to.
+
+        :param llm_config: Object having all settings & preferences for all LLMs to be used in out system
+        """
+        models = {}
+        if llm_config and llm_config.azure_open_ai:
+            for azure_oai_model in llm_config.azure_open_ai.azure_oai_models:
+                models[azure_oai_model.unique_model_id] = ModelTier(
+                    unique_model_id=azure_oai_model.unique_model_id,
+                    deployment=azure_oai_model.deployment_name_in_azure,
+                    cost_per_1k_prompt_tokens=azure_oai_model.cost_per_1k_prompt_tokens or 0.0,
+                    cost_per_1k_completion_tokens=azure_oai_model.cost_per_1k_completion_tokens or 0.0,
+                )
+        with cls._lock:
+            cls._models = models
+
+    @classmethod
+    def configure_routes(cls, default_model_id: str = None, phase_models: Dict[str, str] = None) -> None:
+        """
+        :param default_model_id: `unique_model_id` to which calls in phases without a route are accounted
+        :param phase_models: Dict key=phase (one of ProfilerPhases), value=`unique_model_id` of model to which
+                             calls made in that phase are routed
+        """
+        phase_models = dict(phase_models or {})
+        valid_phases = {
+            value for name, value in vars(ProfilerPhases).items() if not name.startswith("_")
+        }
+        invalid_phases = sorted(set(phase_models) - valid_phases)
+        if invalid_phases:
+            raise GlueValidaionException(
+                f"Invalid phases {invalid_phases} in phase_models. Valid phases are {sorted(valid_phases)}", None
+            )
+        with cls._lock:
+            models = cls._models
+        unknown_models = sorted(set(phase_models.values()) - set(models))
+        if models and unknown_models:
+            raise GlueValidaionException(
+                f"Models {unknown_models} in phase_models are not defined in llm config. Defined models are "
+                f"{sorted(models)}",
+                None,
+            )
+        with cls._lock:
+            cls._default_model_id = default_model_id
+            cls._phase_models = phase_models
+        if phase_models:
+            logger.info(f"LLM calls are routed by phase: {phase_models}")
+
+    @classmethod
+    def get_deployment(cls, model_id: str) -> str:
+        """
+        :return: Name of deployment of model `model_id`
+        """
+        model = cls._models.get(model_id)
+        return model.deployment if model else model_id
+
+    @classmethod
+    def get_route(cls) -> Tuple[Optional[str], Optional[str]]:
+        """
+        :return: (unique_model_id, deployment) for a call made in the current phase. Deployment is None when phase
+                 isn't routed, and the call should go to deployment set in environment.
+        """
+        model_id = cls._phase_models.get(PhaseProfiler.get_phase())
+        if model_id is None:
+            return cls._default_model_id, None
+        return model_id, cls.get_deployment(model_id)
+
+    @classmethod
+    def get_prices(cls) -> Dict[str, Tuple[float, float]]:
+        """
+        :return: Dict key=unique_model_id, value=(cost per 1000 prompt tokens, cost per 1000 completion tokens)
+        """
+        return {
+            model_id: (model.cost_per_1k_prompt_tokens, model.cost_per_1k_completion_tokens)
+            for model_id, model in cls._models.items()
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._models = {}
+            cls._default_model_id = None
+            cls._phase_models = {}
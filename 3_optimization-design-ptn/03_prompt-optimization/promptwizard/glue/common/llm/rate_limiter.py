@@ -0,0 +1,477 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..base_classes import LLMConfig, LLMQueueSchedulerLimits
+from ..exceptions import GlueLLMException
+from ..utils.logging import get_glue_logger
+
+logger = get_glue_logger(__name__)
+
+
+class RateLimiterMetrics:
+    """
+    Literals used as keys in dictionary returned by LLMRateLimiter.get_metrics()
+    """
+
+    REQUESTS = "requests"
+    QUEUE_DEPTH = "queue_depth"
+    MAX_QUEUE_DEPTH = "max_queue_depth"
+    TOTAL_WAIT_SEC = "total_wait_sec"
+    MAX_WAIT_SEC = "max_wait_sec"
+    AVG_WAIT_SEC = "avg_wait_sec"
+    THROTTLED = "throttled"
+    REJECTED = "rejected"
+    EXPIRED = "expired"
+
+
+class LLMRateLimiter:
+    """
+    Client side scheduler for a single model deployment. Every request reserves one unit from a requests bucket
+    and its estimated number of tokens from a tokens bucket. Both buckets refill continuously at the configured
+    per-minute rate. When a bucket is in deficit, request waits (is queued) until the deficit is paid back, so
+    requests are served in the order in which they arrive.
+
+    Buckets hold at most `BURST_WINDOW_SEC` worth of quota, because Azure OpenAI enforces per-minute limits over
+    windows of few seconds. A full minute's quota sent as one burst would get throttled.
+
+    When service throttles us anyway (HTTP 429), all requests to the deployment are paused for
+    `error_backoff_in_seconds`, doubled on every consecutive failure of the same request.
+    """
+
+    BURST_WINDOW_SEC = 10
+    DEFAULT_ERROR_BACKOFF_SEC = 5
+    MAX_BACKOFF_SEC = 120
+    # Number of times a throttled/failed request is retried, before giving up.
+    MAX_RETRIES = 6
+    # Number of completion tokens assumed for a request, till actual usage is known.
+    EXPECTED_COMPLETION_TOKENS = 256
+
+    def __init__(
+        self,
+        req_per_min: int = None,
+        tokens_per_min: int = None,
+        error_backoff_in_seconds: int = None,
+        ttl_in_seconds: int = None,
+        max_queue_size: int = None,
+    ):
+        """
+        :param req_per_min: Max number of requests per minute. None or 0 means no limit.
+        :param tokens_per_min: Max number of tokens (prompt + completion) per minute. None or 0 means no limit.
+        :param error_backoff_in_seconds: Time for which requests are paused, after service throttles us.
+        :param ttl_in_seconds: Max time a request can wait in queue. Request fails if it has to wait longer.
+        :param max_queue_size: Max number of requests that can wait in queue. Further requests fail right away.
+        """
+        self.req_per_min = req_per_min or None
+        self.tokens_per_min = tokens_per_min or None
+        self.error_backoff_in_seconds = (
+            error_backoff_in_seconds or self.DEFAULT_ERROR_BACKOFF_SEC
+        )
+        self.ttl_in_seconds = ttl_in_seconds or None
+        self.max_queue_size = max_queue_size or None
+
+        self._req_capacity = max(1.0, (self.req_per_min or 0) * self.BURST_WINDOW_SEC / 60)
+        self._token_capacity = max(1.0, (self.tokens_per_min or 0) * self.BURST_WINDOW_SEC / 60)
+
+        self._lock = threading.Lock()
+        self._last_refill = time.monotonic()
+        self._req_balance = self._req_capacity
+        self._token_balance = self._token_capacity
+        self._blocked_until = 0.0
+
+        self._queue_depth = 0
+        self._max_queue_depth = 0
+        self._requests = 0
+        self._total_wait_sec = 0.0
+        self._max_wait_sec = 0.0
+        self._throttled = 0
+        self._rejected = 0
+        self._expired = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.req_per_min:
+            self._req_balance = min(
+                self._req_capacity,
+                self._req_balance + elapsed * self.req_per_min / 60,
+            )
+        if self.tokens_per_min:
+            self._token_balance = min(
+                self._token_capacity,
+                self._token_balance + elapsed * self.tokens_per_min / 60,
+            )
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Reserve capacity for one request with `tokens` tokens. Return time (in seconds) request should wait before
+        it's sent.
+        """
+        now = time.monotonic()
+        self._refill(now)
+
+        if self.max_queue_size and self._queue_depth >= self.max_queue_size:
+            self._rejected += 1
+            raise GlueLLMException(
+                f"Rate limiter queue is full ({self._queue_depth} requests waiting).",
+                None,
+            )
+
+        wait_sec = max(0.0, self._blocked_until - now)
+        if self.req_per_min:
+            wait_sec = max(wait_sec, (1 - self._req_balance) * 60 / self.req_per_min)
+        if self.tokens_per_min:
+            # A prompt larger than the bucket can never fit. Let it go once bucket is full.
+            tokens = min(tokens, self._token_capacity)
+            wait_sec = max(
+                wait_sec, (tokens - self._token_balance) * 60 / self.tokens_per_min
+            )
+
+        if self.ttl_in_seconds and wait_sec > self.ttl_in_seconds:
+            self._expired += 1
+            raise GlueLLMException(
+                f"Request would wait {wait_sec:.1f} sec in rate limiter queue, which is more than "
+                f"ttl_in_seconds={self.ttl_in_seconds}.",
+                None,
+            )
+
+        if self.req_per_min:
+            self._req_balance -= 1
+        if self.tokens_per_min:
+            self._token_balance -= tokens
+        self._requests += 1
+        if wait_sec > 0:
+            self._queue_depth += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queue_depth)
+        return wait_sec
+
+    def _pause_remaining(self) -> float:
+        with self._lock:
+            return self._blocked_until - time.monotonic()
+
+    def _release(self, queued: bool, wait_sec: float, tokens: int, is_sent: bool) -> None:
+        """
+        Take a request, reserved by _reserve(), off the queue once it's done waiting. A request that's cancelled
+        (or fails) while waiting is never sent, so the capacity it reserved is given back.
+
+        :param queued: True if request had to wait in queue
+        :param wait_sec: Time for which request waited
+        :param tokens: Number of tokens passed to _reserve()
+        :param is_sent: False if request stopped waiting without being sent
+        """
+        with self._lock:
+            if queued:
+                self._queue_depth -= 1
+            if not is_sent:
+                self._requests -= 1
+                if self.req_per_min:
+                    self._req_balance = min(self._req_capacity, self._req_balance + 1)
+                if self.tokens_per_min:
+                    self._token_balance = min(
+                        self._token_capacity,
+                        self._token_balance + min(tokens, self._token_capacity),
+                    )
+                return
+            self._total_wait_sec += wait_sec
+            self._max_wait_sec = max(self._max_wait_sec, wait_sec)
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block till a request with `tokens` estimated tokens can be sent.
+
+        :param tokens: Estimated number of tokens in request + response
+        :return: Time in seconds for which request waited
+        """
+        start_time = time.monotonic()
+        with self._lock:
+            wait_sec = self._reserve(tokens)
+        is_sent = False
+        try:
+            if wait_sec > 0:
+                time.sleep(wait_sec)
+            # A throttling error might have paused the deployment while we were waiting
+            pause_sec = self._pause_remaining()
+            while pause_sec > 0:
+                time.sleep(pause_sec)
+                pause_sec = self._pause_remaining()
+            is_sent = True
+        finally:
+            waited_sec = time.monotonic() - start_time
+            self._release(wait_sec > 0, waited_sec, tokens, is_sent)
+        return waited_sec
+
+    async def aacquire(self, tokens: int) -> float:
+        """
+        Asynchronous version of acquire().
+
+        :param tokens: Estimated number of tokens in request + response
+        :return: Time in seconds for which request waited
+        """
+        start_time = time.monotonic()
+        with self._lock:
+            wait_sec = self._reserve(tokens)
+        is_sent = False
+        try:
+            if wait_sec > 0:
+                await asyncio.sleep(wait_sec)
+            pause_sec = self._pause_remaining()
+            while pause_sec > 0:
+                await asyncio.sleep(pause_sec)
+                pause_sec = self._pause_remaining()
+            is_sent = True
+        finally:
+            # Waiter cancelled mid-sleep (e.g. by map_with_concurrency().aclose()) frees its queue slot & quota
+            waited_sec = time.monotonic() - start_time
+            self._release(wait_sec > 0, waited_sec, tokens, is_sent)
+        return waited_sec
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Correct the tokens bucket once actual token usage of a request is known.
+
+        :param estimated_tokens: Number of tokens reserved by acquire()
+        :param actual_tokens: Number of tokens actually used. 0 if request failed.
+        """
+        if not self.tokens_per_min:
+            return
+        with self._lock:
+            self._token_balance -= actual_tokens - min(
+                estimated_tokens, self._token_capacity
+            )
+
+    def backoff(
+        self, attempt: int, retry_after_sec: float = None, is_throttled: bool = True
+    ) -> None:
+        """
+        Pause all requests to this deployment, after service has throttled (or failed) a request.
+
+        :param attempt: Number of times this request has already been retried.
+        :param retry_after_sec: Wait time suggested by service, if any.
+        :param is_throttled: True if request failed because of throttling (HTTP 429)
+        """
+        backoff_sec = min(
+            self.error_backoff_in_seconds * (2**attempt), self.MAX_BACKOFF_SEC
+        )
+        if retry_after_sec:
+            backoff_sec = max(backoff_sec, retry_after_sec)
+        with self._lock:
+            if is_throttled:
+                self._throttled += 1
+            self._blocked_until = max(
+                self._blocked_until, time.monotonic() + backoff_sec
+            )
+        logger.info(f"LLM request failed. Pausing requests for {backoff_sec} sec.")
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        :return: Dictionary with queue depth, wait times and count of throttled/rejected/expired requests.
+        """
+        with self._lock:
+            return {
+                RateLimiterMetrics.REQUESTS: self._requests,
+                RateLimiterMetrics.QUEUE_DEPTH: self._queue_depth,
+                RateLimiterMetrics.MAX_QUEUE_DEPTH: self._max_queue_depth,
+                RateLimiterMetrics.TOTAL_WAIT_SEC: self._total_wait_sec,
+                RateLimiterMetrics.MAX_WAIT_SEC: self._max_wait_sec,
+                RateLimiterMetrics.AVG_WAIT_SEC: self._total_wait_sec
+                / max(self._requests, 1),
+                RateLimiterMetrics.THROTTLED: self._throttled,
+                RateLimiterMetrics.REJECTED: self._rejected,
+                RateLimiterMetrics.EXPIRED: self._expired,
+            }
+
+
+def _shared_field(index: int) -> property:
+    return property(
+        lambda self: self._shared_state[index],
+        lambda self, value: self._shared_state.__setitem__(index, value),
+    )
+
+
+class SharedLLMRateLimiter(LLMRateLimiter):
+    """
+    LLMRateLimiter whose buckets live in shared memory, so that all processes of a sweep draw from one budget per
+    deployment, and throttling seen by one process pauses all of them. Queue depth and wait time metrics are still
+    kept per process.
+
+    time.monotonic() is a system-wide clock, hence bucket timestamps are comparable across processes.
+    """
+
+    # Positions of bucket state in shared array
+    _LAST_REFILL, _REQ_BALANCE, _TOKEN_BALANCE, _BLOCKED_UNTIL = range(4)
+
+    _last_refill = _shared_field(_LAST_REFILL)
+    _req_balance = _shared_field(_REQ_BALANCE)
+    _token_balance = _shared_field(_TOKEN_BALANCE)
+    _blocked_until = _shared_field(_BLOCKED_UNTIL)
+
+    def __init__(self, shared_state, **kwargs):
+        """
+        :param shared_state: Array returned by create_shared_state(), passed to this process when it was started
+        :param kwargs: Arguments of LLMRateLimiter. Should be the same in all processes sharing `shared_state`.
+        """
+        self._shared_state = shared_state
+        with shared_state.get_lock():
+            # Only the first process to create its limiter fills the buckets
+            saved_state = shared_state[:]
+            super().__init__(**kwargs)
+            if saved_state[self._LAST_REFILL] > 0:
+                shared_state[:] = saved_state
+        self._lock = shared_state.get_lock()
+
+    @staticmethod
+    def create_shared_state(mp_context=None):
+        """
+        :param mp_context: Multiprocessing context in which processes sharing the limiter are started
+        :return: Shared array holding bucket state. Has to be passed to processes as argument when they are started.
+        """
+        return (mp_context or multiprocessing).Array("d", 4)
+
+
+class RateLimiterRegistry:
+    """
+    Process-wide registry of LLMRateLimiter objects, one per model deployment. Deployments for which no limits are
+    configured get a limiter without rate limits, which still backs off when the service throttles us.
+    """
+
+    _lock = threading.Lock()
+    _limiters: Dict[str, LLMRateLimiter] = {}
+    _encoders = {}
+
+    @classmethod
+    def get(cls, deployment: str) -> LLMRateLimiter:
+        """
+        :param deployment: Name of model deployment
+        :return: Rate limiter for that deployment
+        """
+        limiter = cls._limiters.get(deployment)
+        if limiter is None:
+            with cls._lock:
+                limiter = cls._limiters.setdefault(deployment, LLMRateLimiter())
+        return limiter
+
+    @classmethod
+    def register(cls, deployment: str, limiter: LLMRateLimiter) -> None:
+        with cls._lock:
+            cls._limiters[deployment] = limiter
+
+    @classmethod
+    def configure(cls, llm_config: LLMConfig, shared_states: Dict = None) -> None:
+        """
+        Create rate limiters for all Azure OpenAI models in `llm_config`, using `req_per_min`, `tokens_per_min` &
+        `error_backoff_in_seconds` of each model and the queue limits in `scheduler_limits`.
+
+        :param llm_config: Object having all settings & preferences for all LLMs to be used in out system
+        :param shared_states: Dict returned by create_shared_states(). When given, limits are shared with all other
+                              processes that got the same dict.
+        """
+        scheduler_limits = llm_config.scheduler_limits or LLMQueueSchedulerLimits(
+            ttl_in_seconds=None, max_queue_size=None
+        )
+        if llm_config.azure_open_ai:
+            for azure_oai_model in llm_config.azure_open_ai.azure_oai_models:
+                deployment = azure_oai_model.deployment_name_in_azure
+                limits = dict(
+                    req_per_min=azure_oai_model.req_per_min,
+                    tokens_per_min=azure_oai_model.tokens_per_min,
+                    error_backoff_in_seconds=azure_oai_model.error_backoff_in_seconds,
+                    ttl_in_seconds=scheduler_limits.ttl_in_seconds,
+                    max_queue_size=scheduler_limits.max_queue_size,
+                )
+                if shared_states and deployment in shared_states:
+                    limiter = SharedLLMRateLimiter(shared_states[deployment], **limits)
+                else:
+                    limiter = LLMRateLimiter(**limits)
+                cls.register(deployment, limiter)
+
+    @staticmethod
+    def create_shared_states(llm_config: LLMConfig, mp_context=None) -> Dict:
+        """
+        :param llm_config: Object having all settings & preferences for all LLMs to be used in out system
+        :param mp_context: Multiprocessing context in which processes sharing the limits are started
+        :return: Dict key=deployment name, value=shared bucket state. To be passed to configure() in every process.
+        """
+        if not llm_config.azure_open_ai:
+            return {}
+        return {
+            azure_oai_model.deployment_name_in_azure: SharedLLMRateLimiter.create_shared_state(mp_context)
+            for azure_oai_model in llm_config.azure_open_ai.azure_oai_models
+        }
+
+    @classmethod
+    def get_metrics(cls) -> Dict[str, Dict[str, float]]:
+        """
+        :return: Dictionary with key=deployment name, value=metrics of its rate limiter
+        """
+        return {
+            deployment: limiter.get_metrics()
+            for deployment, limiter in cls._limiters.items()
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._limiters = {}
+
+    @classmethod
+    def estimate_tokens(cls, messages: List[Dict], model: str) -> int:
+        """
+        Estimate number of tokens a chat completion request is going to use, using tiktoken.
+
+        :param messages: List of messages in OpenAI chat format.
+        :param model: Name of model, used to pick the tokenizer.
+        :return: Number of tokens in prompt + expected number of tokens in completion
+        """
+        # Every message carries ~4 tokens of formatting, every reply is primed with 3 tokens
+        prompt_tokens = 3 + sum(
+            4 + cls.count_tokens(str(message.get("content") or ""), model)
+            for message in messages
+        )
+        return prompt_tokens + LLMRateLimiter.EXPECTED_COMPLETION_TOKENS
+
+    @classmethod
+    def count_tokens(cls, text: str, model: str) -> int:
+        """
+        :param text: Text to be tokenized
+        :param model: Name of model, used to pick the tokenizer.
+        :return: Number of tokens in `text`. Approximated when tokenizer isn't available.
+        """
+        encoder = cls._get_encoder(model)
+        if encoder:
+            return len(encoder.encode(text))
+        # Roughly 4 characters per token, for English text
+        return len(text) // 4 + 1
+
+    @classmethod
+    def _get_encoder(cls, model: str):
+        if model not in cls._encoders:
+            try:
+                import tiktoken
+
+                try:
+                    encoder = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    # Deployment names need not be model names
+                    encoder = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # tiktoken downloads encodings on first use, which fails on machines without internet access
+                logger.info(f"Tokenizer for {model} couldn't be loaded. Token counts would be approximate. {e}")
+                encoder = None
+            cls._encoders[model] = encoder
+        return cls._encoders[model]
+
+
+def get_retry_after_sec(excep_obj: Exception) -> Optional[float]:
+    """
+    :param excep_obj: Exception raised by openai client
+    :return: Value of `retry-after` header of the response, if any
+    """
+    response = getattr(excep_obj, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,350 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from os.path import dirname
+from typing import Dict, List, Optional
+
+from ..constants.str_literals import ResponseCacheLiterals
+from ..exceptions import GlueLLMException, GlueValidaionException
+from ..utils.logging import get_glue_logger
+
+logger = get_glue_logger(__name__)
+
+
+class ResponseCacheMetrics:
+    """
+    Literals used as keys in dictionary returned by LLMResponseCache.get_metrics()
+    """
+
+    HITS = "hits"
+    MISSES = "misses"
+    HIT_RATE = "hit_rate"
+    WRITES = "writes"
+    EVICTIONS = "evictions"
+    ENTRIES = "entries"
+    SIZE_BYTES = "size_bytes"
+
+
+class LLMResponseCache:
+    """
+    On-disk, content addressed cache of chat completion responses, stored in SQLite. Key of an entry is sha256 hash
+    of everything that determines the response of a deterministic (temperature=0) call i.e. provider, endpoint &
+    deployment serving the model, messages and temperature.
+
+    Entries are evicted in least recently used order once total size of cached responses exceeds `max_size_mb`.
+    A hit doesn't write to SQLite. Access times of hit entries are buffered and written along with the next put(),
+    before eviction, every `TOUCH_FLUSH_EVERY` hits, and on close().
+    In read only mode, cache is never written to and a miss raises GlueLLMException, so that a run can be replayed
+    offline from recorded responses.
+
+    SQLite database is opened in WAL mode, hence it can be shared by many threads and processes.
+    """
+
+    # Eviction brings size down to this fraction of max size, so that it doesn't run on every write
+    EVICTION_TARGET_RATIO = 0.9
+    BUSY_TIMEOUT_SEC = 30
+    # Max number of hit entries whose access time is buffered, before it's written to SQLite
+    TOUCH_FLUSH_EVERY = 100
+
+    def __init__(self, path: str, max_size_mb: float = None, readonly: bool = False):
+        """
+        :param path: Path to SQLite file. Created if it doesn't exist.
+        :param max_size_mb: Max total size of cached responses in MB. None means no limit.
+        :param readonly: When True, cache is only read from and a miss is an error.
+        """
+        self.path = path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.readonly = readonly
+
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._size_bytes = None
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        # key=key of entry hit since last flush, value=time of its last hit
+        self._touched: Dict[str, float] = {}
+        # Access times still buffered when the process exits are written
+        atexit.register(self.close)
+
+    @staticmethod
+    def make_key(
+        messages: List[Dict],
+        provider: str,
+        endpoint: Optional[str],
+        deployment: str,
+        temperature: float = 0.0,
+    ) -> str:
+        """
+        :param messages: List of messages in OpenAI chat format.
+        :param provider: Provider serving the model i.e. LLMEndpoint.OPENAI or LLMEndpoint.AZURE
+        :param endpoint: URL of Azure OpenAI resource. None for OpenAI.
+        :param deployment: Name of model deployment (name of model, for OpenAI). Same deployment name on two
+                           providers or endpoints can serve different models, hence all three are in the key.
+        :param temperature: Sampling temperature of the request.
+        :return: Hex digest that identifies the request
+        """
+        payload = json.dumps(
+            {
+                "provider": provider,
+                "endpoint": endpoint,
+                "deployment": deployment,
+                "messages": messages,
+                "temperature": temperature,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections can't be carried across fork(). Child process opens its own.
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        if self.readonly:
+            if not os.path.exists(self.path):
+                raise GlueValidaionException(
+                    f"LLM response cache {self.path} doesn't exist. It can't be opened in read only mode.",
+                    None,
+                )
+            conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+        else:
+            if dirname(self.path):
+                os.makedirs(dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, timeout=self.BUSY_TIMEOUT_SEC, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+            )
+            conn.commit()
+        self._conn = conn
+        self._pid = os.getpid()
+        self._size_bytes = None
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        :param key: Key returned by make_key()
+        :return: Cached response. None if there is no entry for `key`, except in read only mode, where
+                 GlueLLMException is raised.
+        """
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._misses += 1
+                if self.readonly:
+                    raise GlueLLMException(
+                        f"No response for request {key} in read only LLM response cache {self.path}",
+                        None,
+                    )
+                return None
+            self._hits += 1
+            if not self.readonly:
+                self._touched[key] = time.time()
+                if len(self._touched) >= self.TOUCH_FLUSH_EVERY:
+                    self._flush_touched(conn)
+                    conn.commit()
+            return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Store `response` against `key`. No-op in read only mode.
+
+        :param key: Key returned by make_key()
+        :param response: Text generated by LLM
+        """
+        if self.readonly or not isinstance(response, str):
+            return
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._touched.pop(key, None)
+            self._flush_touched(conn)
+            conn.commit()
+            self._writes += 1
+            if self.max_size_bytes:
+                if self._size_bytes is None:
+                    self._size_bytes = self._total_size(conn)
+                else:
+                    self._size_bytes += size
+                if self._size_bytes > self.max_size_bytes:
+                    self._evict(conn)
+
+    def _total_size(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _flush_touched(self, conn: sqlite3.Connection) -> None:
+        # Caller commits. Entries evicted meanwhile by another process are not updated, as their key is missing.
+        if self._touched:
+            conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched = {}
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        # Least recently used order should account for hits not yet written
+        self._flush_touched(conn)
+        # Other processes might have written to the same file. Hence start from the actual size.
+        size_bytes = self._total_size(conn)
+        target_bytes = self.max_size_bytes * self.EVICTION_TARGET_RATIO
+        evicted_keys = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ):
+            if size_bytes <= target_bytes:
+                break
+            evicted_keys.append((key,))
+            size_bytes -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", evicted_keys)
+        conn.commit()
+        self._size_bytes = size_bytes
+        self._evictions += len(evicted_keys)
+        logger.info(f"Evicted {len(evicted_keys)} entries from LLM response cache {self.path}")
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        :return: Dictionary with hit/miss counts of this process, and number & size of entries in cache
+        """
+        with self._lock:
+            conn = self._connect()
+            entries, size_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return {
+                ResponseCacheMetrics.HITS: self._hits,
+                ResponseCacheMetrics.MISSES: self._misses,
+                ResponseCacheMetrics.HIT_RATE: self._hits
+                / max(self._hits + self._misses, 1),
+                ResponseCacheMetrics.WRITES: self._writes,
+                ResponseCacheMetrics.EVICTIONS: self._evictions,
+                ResponseCacheMetrics.ENTRIES: entries,
+                ResponseCacheMetrics.SIZE_BYTES: size_bytes,
+            }
+
+    def close(self) -> None:
+        """
+        Write buffered access times and close the connection.
+        """
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._flush_touched(self._conn)
+                self._conn.commit()
+                self._conn.close()
+            self._conn = None
+            self._touched = {}
+        atexit.unregister(self.close)
+
+
+class ResponseCacheRegistry:
+    """
+    Holds the process-wide LLMResponseCache. Cache is configured either programmatically, using configure(), or
+    from environment variables:
+
+        GLUE_LLM_CACHE_PATH: Path to SQLite file. Cache is disabled when not set.
+        GLUE_LLM_CACHE_MODE: readwrite (default), readonly or off
+        GLUE_LLM_CACHE_MAX_SIZE_MB: Max total size of cached responses
+    """
+
+    _lock = threading.Lock()
+    _cache: Optional[LLMResponseCache] = None
+    _configured = False
+
+    @classmethod
+    def configure(
+        cls,
+        path: str = None,
+        max_size_mb: float = None,
+        mode: str = ResponseCacheLiterals.READ_WRITE,
+    ) -> Optional[LLMResponseCache]:
+        """
+        Replace the process-wide cache.
+
+        :param path: Path to SQLite file. None disables the cache.
+        :param max_size_mb: Max total size of cached responses in MB. None means no limit.
+        :param mode: One of readwrite, readonly or off
+        :return: Cache that is now in use. None if caching is disabled.
+        """
+        valid_modes = (
+            ResponseCacheLiterals.READ_WRITE,
+            ResponseCacheLiterals.READ_ONLY,
+            ResponseCacheLiterals.OFF,
+        )
+        if mode not in valid_modes:
+            raise GlueValidaionException(
+                f"Invalid LLM response cache mode `{mode}`. Valid values are {valid_modes}",
+                None,
+            )
+        cache = None
+        if path and mode != ResponseCacheLiterals.OFF:
+            cache = LLMResponseCache(
+                path,
+                max_size_mb=max_size_mb,
+                readonly=mode == ResponseCacheLiterals.READ_ONLY,
+            )
+            logger.info(f"LLM responses are cached in {path}, mode={mode}")
+        with cls._lock:
+            if cls._cache is not None:
+                cls._cache.close()
+            cls._cache = cache
+            cls._configured = True
+        return cache
+
+    @classmethod
+    def get(cls) -> Optional[LLMResponseCache]:
+        """
+        :return: Process-wide cache. None if caching is disabled.
+        """
+        if not cls._configured:
+            max_size_mb = os.environ.get(ResponseCacheLiterals.CACHE_MAX_SIZE_MB)
+            cls.configure(
+                path=os.environ.get(ResponseCacheLiterals.CACHE_PATH),
+                max_size_mb=float(max_size_mb) if max_size_mb else None,
+                mode=os.environ.get(
+                    ResponseCacheLiterals.CACHE_MODE, ResponseCacheLiterals.READ_WRITE
+                ),
+            )
+        return cls._cache
+
+    @classmethod
+    def get_metrics(cls) -> Optional[Dict[str, float]]:
+        cache = cls._cache
+        return cache.get_metrics() if cache else None
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Close the cache. It would be configured again from environment variables on next use.
+        """
+        with cls._lock:
+            if cls._cache is not None:
+                cls._cache.close()
+            cls._cache = None
+            cls._configured = False
@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..constants.str_literals import SimulatedLLMLiterals
+from ..exceptions import GlueValidaionException
+from ..utils.logging import get_glue_logger
+from ..utils.profiler import PhaseProfiler
+
+logger = get_glue_logger(__name__)
+
+
+class SimulatedLLMError(Exception):
+    """
+    Failure injected by SimulatedLLM, in place of an error returned by LLM endpoint. It's retried with backoff, like
+    a server error of the real endpoint.
+    """
+
+
+class SimulatedLLMMetrics:
+    """
+    Literals used as keys in dictionary returned by SimulatedLLM.get_metrics()
+    """
+
+    CALLS = "calls"
+    ERRORS = "errors"
+    LATENCY_SEC = "latency_sec"
+    PROMPT_CHARS = "prompt_chars"
+    COMPLETION_CHARS = "completion_chars"
+
+
+class SimulatedLLM:
+    """
+    Offline stand-in for chat completion endpoint, to measure how prompt optimization performs without calling an
+    LLM. Responses are made from templates, following the protocols that CritiqueNRefine parses:
+
+    - Requests for prompts, critiques or examples get as many items as asked for, each wrapped with <START> & <END>.
+      Examples have [Question] & [Answer] parts, with final answer wrapped with <ANS_START> & <ANS_END>.
+    - A mini-batch of [Question n] gets the answer to each question between <ANS_START_n> & <ANS_END_n>.
+    - A single question gets its answer between <ANS_START> & <ANS_END>.
+    - Anything else (expert profile, intent keywords, reasoning) gets a line of text.
+
+    Response, latency & whether the call fails are all drawn from a random generator seeded by `seed` & the
+    messages. Hence same messages get same response irrespective of the order in which calls are made, and a
+    concurrent run makes the same calls as a sequential one.
+
+    Answer to a question is its final answer in `answer_key` with probability `accuracy`, and a made up (wrong)
+    answer otherwise. Questions not in `answer_key` always get a made up answer.
+    """
+
+    VARIATIONS_COUNT_PATTERN = re.compile(r"(?:generate|write|new set of) (\d+)\b")
+    NUMBERED_QUESTION_PATTERN = re.compile(r"\[Question (\d+)\]: ")
+    QUESTION_PATTERN = re.compile(r"\[Question\]:? ")
+    # Tokens of prompt & response are estimated from their length, for cost of calls to be accounted
+    CHARS_PER_TOKEN = 4
+    # Length of question's prefix used to look up its answer, as question in prompt may be followed by other text
+    QUESTION_KEY_CHARS = 80
+
+    PROMPT_STYLES = (
+        "Let's think step by step.",
+        "Break the problem into smaller parts and solve each of them.",
+        "Verify every fact against the given context before answering.",
+        "List the key facts first, then derive the answer from them.",
+        "Answer concisely, covering only the most important points.",
+    )
+
+    def __init__(
+        self,
+        seed: int = 0,
+        latency_mean_sec: float = 0.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        accuracy: float = 0.5,
+        answer_key: Dict[str, str] = None,
+        model_latency_sec: Dict[str, float] = None,
+    ):
+        """
+        :param seed: Seed of random generators. Different seeds give different responses to the same messages.
+        :param latency_mean_sec: Mean time taken by a call. 0 answers calls right away.
+        :param latency_sigma: Sigma of log-normal distribution of latency. 0 makes every call take
+                              `latency_mean_sec`. Larger values give longer tail of slow calls.
+        :param error_rate: Fraction of calls that fail with SimulatedLLMError, after taking their latency. Failed
+                           calls are retried by LLMMgr, through rate limiter, as failed calls to the real endpoint are.
+        :param accuracy: Probability that a question in `answer_key` is answered correctly
+        :param answer_key: Dict key=question, value=its final answer
+        :param model_latency_sec: Dict key=unique_model_id, value=mean latency of calls routed to that model, in
+                                  place of `latency_mean_sec`. To simulate tiers of models.
+        """
+        for name, value in (("error_rate", error_rate), ("accuracy", accuracy)):
+            if not 0 <= value <= 1:
+                raise GlueValidaionException(f"{name} of simulated LLM should be between 0 and 1, got {value}", None)
+        model_latency_sec = dict(model_latency_sec or {})
+        if min([latency_mean_sec, latency_sigma, *model_latency_sec.values()]) < 0:
+            raise GlueValidaionException(
+                f"Latency of simulated LLM can't be negative, got mean={latency_mean_sec} sigma={latency_sigma}",
+                None,
+            )
+        self.seed = seed
+        self.latency_mean_sec = latency_mean_sec
+        self.model_latency_sec = model_latency_sec
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.accuracy = accuracy
+        self.answer_key = {
+            self.get_question_key(question): answer for question, answer in (answer_key or {}).items()
+        }
+        self.answer_key_items = sorted(answer_key.items()) if answer_key else []
+        # Questions shorter than QUESTION_KEY_CHARS are followed by other text in prompt. Longest match wins.
+        self.question_key_lengths = sorted({len(key) for key in self.answer_key}, reverse=True)
+
+        self._lock = threading.Lock()
+        self._metrics = dict.fromkeys(
+            (
+                SimulatedLLMMetrics.CALLS,
+                SimulatedLLMMetrics.ERRORS,
+                SimulatedLLMMetrics.LATENCY_SEC,
+                SimulatedLLMMetrics.PROMPT_CHARS,
+                SimulatedLLMMetrics.COMPLETION_CHARS,
+            ),
+            0,
+        )
+
+    @classmethod
+    def get_question_key(cls, text: str) -> str:
+        return text.strip()[: cls.QUESTION_KEY_CHARS]
+
+    @staticmethod
+    def read_answer_key(file_path: str) -> Dict[str, str]:
+        """
+        :param file_path: Path to jsonl file, each row of which has `question` & `final_answer`
+        :return: Dict key=question, value=its final answer
+        """
+        answer_key = {}
+        with open(file_path, encoding="utf-8") as fileobj:
+            for line in fileobj:
+                if line.strip():
+                    row = json.loads(line)
+                    answer_key[row[SimulatedLLMLiterals.QUESTION]] = row[SimulatedLLMLiterals.FINAL_ANSWER]
+        return answer_key
+
+    def get_rng(self, messages: List[Dict], attempt: int = 0) -> random.Random:
+        digest = hashlib.sha256(str(self.seed).encode("utf-8"))
+        for message in messages:
+            digest.update(f"\0{message.get('role')}\0{message.get('content')}".encode("utf-8"))
+        if attempt:
+            digest.update(f"\0attempt\0{attempt}".encode("utf-8"))
+        return random.Random(int.from_bytes(digest.digest()[:8], "big"))
+
+    def draw_latency(self, rng: random.Random, model: str = None) -> float:
+        latency_mean_sec = self.model_latency_sec.get(model, self.latency_mean_sec)
+        if latency_mean_sec <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return latency_mean_sec
+        # Log-normal with mean of `latency_mean_sec`
+        mu = math.log(latency_mean_sec) - self.latency_sigma**2 / 2
+        return rng.lognormvariate(mu, self.latency_sigma)
+
+    def find_answer(self, text: str) -> Optional[str]:
+        """
+        :param text: Text of prompt that starts with a question
+        :return: Final answer of the question in answer key. None if question isn't in answer key.
+        """
+        text = text.lstrip()
+        for key_length in self.question_key_lengths:
+            answer = self.answer_key.get(text[:key_length])
+            if answer is not None:
+                return answer
+        return None
+
+    def answer_question(self, question: str, rng: random.Random) -> str:
+        answer = self.find_answer(question)
+        if answer is not None and rng.random() < self.accuracy:
+            return answer
+        return f"Simulated answer {rng.randrange(10**6)}"
+
+    def make_prompt(self, rng: random.Random) -> str:
+        return f"{rng.choice(self.PROMPT_STYLES)} {rng.choice(self.PROMPT_STYLES)} (variant {rng.randrange(10**4)})"
+
+    def make_example(self, rng: random.Random) -> str:
+        if self.answer_key_items:
+            question = rng.choice(self.answer_key_items)[0]
+        else:
+            question = f"Simulated question {rng.randrange(10**4)}"
+        answer = self.answer_question(question, rng)
+        return f"[Question] {question}\n[Answer] {rng.choice(self.PROMPT_STYLES)} <ANS_START>{answer}<ANS_END>"
+
+    def generate(self, prompt: str, rng: random.Random) -> str:
+        """
+        :param prompt: Content of last message of the request
+        :param rng: Random generator of the request
+        :return: Templated response to `prompt`
+        """
+        numbered_questions = list(self.NUMBERED_QUESTION_PATTERN.finditer(prompt))
+        if numbered_questions and "<ANS_START_" in prompt:
+            answers = []
+            for match in numbered_questions:
+                index = match.group(1)
+                answer = self.answer_question(prompt[match.end():], rng)
+                answers.append(
+                    f"[Question {index}] {rng.choice(self.PROMPT_STYLES)} <ANS_START_{index}>{answer}<ANS_END_{index}>"
+                )
+            return "\n".join(answers)
+
+        if "<START>" in prompt:
+            count_match = self.VARIATIONS_COUNT_PATTERN.search(prompt)
+            count = int(count_match.group(1)) if count_match else rng.randint(1, 3)
+            if "[Question]" in prompt and "<ANS_START>" in prompt:
+                make_item = self.make_example
+            else:
+                make_item = self.make_prompt
+            return "\n".join(f"<START>{make_item(rng)}<END>" for _ in range(count))
+
+        questions = list(self.QUESTION_PATTERN.finditer(prompt))
+        if questions:
+            # Question being asked follows the few shot examples, if any
+            answer = self.answer_question(prompt[questions[-1].end():], rng)
+            return f"{rng.choice(self.PROMPT_STYLES)} <ANS_START>{answer}<ANS_END>"
+
+        return f"Simulated response {rng.randrange(10**6)}. {rng.choice(self.PROMPT_STYLES)}"
+
+    def _prepare(self, messages: List[Dict], model: str, attempt: int):
+        """
+        :param attempt: Number of times the call has been retried. A retry gets the same response, but draws its
+                        own latency & failure.
+        :return: (response, latency in seconds, True if call should fail)
+        """
+        rng = self.get_rng(messages)
+        latency_sec = self.draw_latency(rng, model)
+        is_error = rng.random() < self.error_rate
+        response = self.generate(messages[-1]["content"], rng)
+        if attempt:
+            retry_rng = self.get_rng(messages, attempt)
+            latency_sec = self.draw_latency(retry_rng, model)
+            is_error = retry_rng.random() < self.error_rate
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        completion_chars = 0 if is_error else len(response)
+        PhaseProfiler.record_usage(
+            prompt_tokens=prompt_chars // self.CHARS_PER_TOKEN,
+            completion_tokens=completion_chars // self.CHARS_PER_TOKEN,
+        )
+        with self._lock:
+            self._metrics[SimulatedLLMMetrics.CALLS] += 1
+            self._metrics[SimulatedLLMMetrics.ERRORS] += is_error
+            self._metrics[SimulatedLLMMetrics.LATENCY_SEC] += latency_sec
+            self._metrics[SimulatedLLMMetrics.PROMPT_CHARS] += prompt_chars
+            self._metrics[SimulatedLLMMetrics.COMPLETION_CHARS] += completion_chars
+        return response, latency_sec, is_error
+
+    def chat_completion(self, messages: List[Dict], model: str = None, attempt: int = 0) -> str:
+        """
+        :param messages: List of messages in OpenAI chat format.
+        :param model: unique_model_id of model to which the call is routed
+        :param attempt: Number of times the call has been retried
+        :return: Simulated response, after sleeping for latency of the call
+        """
+        response, latency_sec, is_error = self._prepare(messages, model, attempt)
+        if latency_sec:
+            time.sleep(latency_sec)
+        if is_error:
+            raise SimulatedLLMError("Simulated LLM call failed")
+        return response
+
+    async def achat_completion(self, messages: List[Dict], model: str = None, attempt: int = 0) -> str:
+        """
+        Asynchronous version of chat_completion(). Latency is awaited, hence concurrent calls overlap.
+        """
+        response, latency_sec, is_error = self._prepare(messages, model, attempt)
+        if latency_sec:
+            await asyncio.sleep(latency_sec)
+        if is_error:
+            raise SimulatedLLMError("Simulated LLM call failed")
+        return response
+
+    def get_metrics(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._metrics)
+
+
+class SimulatedLLMRegistry:
+    """
+    Holds the process-wide SimulatedLLM, which answers chat completions when MODEL_TYPE environment variable is set
+    to `Simulated`. It's configured either programmatically, using configure(), or from environment variables:
+
+        GLUE_SIM_SEED: Seed of random generators (default 0)
+        GLUE_SIM_LATENCY_MEAN_SEC: Mean latency of a call (default 0)
+        GLUE_SIM_LATENCY_SIGMA: Sigma of log-normal distribution of latency (default 0.5)
+        GLUE_SIM_ERROR_RATE: Fraction of calls that fail (default 0)
+        GLUE_SIM_ACCURACY: Probability of answering a question in answer key correctly (default 0.5)
+        GLUE_SIM_ANSWER_KEY_PATH: jsonl file that has `question` & `final_answer` in each row
+    """
+
+    _lock = threading.Lock()
+    _llm: Optional[SimulatedLLM] = None
+
+    @classmethod
+    def configure(cls, **kwargs) -> SimulatedLLM:
+        """
+        Replace the process-wide simulated LLM.
+
+        :param kwargs: Arguments of SimulatedLLM
+        :return: Simulated LLM that is now in use
+        """
+        llm = SimulatedLLM(**kwargs)
+        with cls._lock:
+            cls._llm = llm
+        return llm
+
+    @classmethod
+    def get(cls) -> SimulatedLLM:
+        if cls._llm is None:
+            answer_key_path = os.environ.get(SimulatedLLMLiterals.ANSWER_KEY_PATH)
+            llm = SimulatedLLM(
+                seed=int(os.environ.get(SimulatedLLMLiterals.SEED, 0)),
+                latency_mean_sec=float(os.environ.get(SimulatedLLMLiterals.LATENCY_MEAN_SEC, 0)),
+                latency_sigma=float(os.environ.get(SimulatedLLMLiterals.LATENCY_SIGMA, 0.5)),
+                error_rate=float(os.environ.get(SimulatedLLMLiterals.ERROR_RATE, 0)),
+                accuracy=float(os.environ.get(SimulatedLLMLiterals.ACCURACY, 0.5)),
+                answer_key=SimulatedLLM.read_answer_key(answer_key_path) if answer_key_path else None,
+            )
+            with cls._lock:
+                if cls._llm is None:
+                    cls._llm = llm
+                    logger.info("LLM calls are answered by simulated LLM")
+        return cls._llm
+
+    @classmethod
+    def get_metrics(cls) -> Optional[Dict[str, float]]:
+        llm = cls._llm
+        return llm.get_metrics() if llm else None
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Drop the simulated LLM. It would be configured again from environment variables on next use.
+        """
+        with cls._lock:
+            cls._llm = None
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+
+def _reset_background_loop() -> None:
+    # Thread running the loop doesn't survive fork(). Child process should start its own loop.
+    global _background_loop
+    _background_loop = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_background_loop)
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the event loop on which Glue runs all its coroutines. Loop runs forever in a daemon thread, so that
+    async clients (and their keep-alive connections) stay bound to a single loop for the life of the process.
+
+    :return: Event loop running in background thread
+    """
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None or _background_loop.is_closed():
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_background_loop.run_forever,
+                name="glue-event-loop",
+                daemon=True,
+            ).start()
+    return _background_loop
+
+
+def run_coroutine_sync(coro: Awaitable) -> Any:
+    """
+    Run coroutine `coro` to completion from synchronous code and return its result. Works even when caller is
+    itself running inside an event loop (e.g. Jupyter notebook), as coroutine is executed on the background loop.
+    Context variables of the caller are visible inside the coroutine.
+
+    :param coro: Coroutine object
+    :return: Value returned by coroutine
+    """
+    loop = get_background_loop()
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if running_loop is loop:
+        raise RuntimeError(
+            "run_coroutine_sync() was called from a coroutine running on the background loop. "
+            "Await the coroutine instead."
+        )
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+async def gather_with_concurrency(limit: int, coros: Iterable[Awaitable]) -> List:
+    """
+    Await all coroutines in `coros`, running at most `limit` of them at a time.
+
+    :param limit: Max number of coroutines that are awaited concurrently.
+    :param coros: Coroutine objects
+    :return: List of results, in the same order as `coros`
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run_with_semaphore(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run_with_semaphore(coro) for coro in coros))
+
+
+async def map_with_concurrency(
+    limit: int, coro_func: Callable[[Any], Awaitable], items: Iterable
+) -> AsyncIterator:
+    """
+    Yield `await coro_func(item)` for every item in `items`, in the order of `items`, while running at most `limit`
+    of them at a time. Items are consumed lazily, so `items` can be a generator over a large file. If a coroutine
+    raises, coroutines still in flight are cancelled and the exception is propagated.
+
+    :param limit: Max number of coroutines that are awaited concurrently.
+    :param coro_func: Coroutine function to be called for each item
+    :param items: Inputs to `coro_func`
+    :return: Async iterator over results, in the same order as `items`
+    """
+    limit = max(1, limit)
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run_with_semaphore(item):
+        async with semaphore:
+            return await coro_func(item)
+
+    # Look ahead window. Results that complete out of order wait here, until results before them are yielded.
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(run_with_semaphore(item)))
+            if len(pending) >= 2 * limit:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,6 +1,8 @@
+import itertools
 import json
-from os.path import join
-from typing import Dict, List
+import os
+from os.path import dirname, join
+from typing import Callable, Dict, List
 import yaml
 
 from ..exceptions import GlueValidaionException
@@ -21,6 +23,17 @@ def yaml_to_dict(file_path: str) -> Dict:
     return parsed_dict
 
 
+def dict_to_yaml(file_path: str, dict_obj: Dict) -> None:
+    """
+    :param file_path: Path of yaml file to be written. Parent directories are created if missing.
+    :param dict_obj: Dictionary to be saved
+    """
+    if dirname(file_path):
+        os.makedirs(dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as yaml_file:
+        yaml.safe_dump(dict_obj, yaml_file, sort_keys=False)
+
+
 def yaml_to_class(yaml_file_path: str, cls: type, default_yaml_file_path: str = None):
     """
     Read yaml file present at path `yaml_file_path`, convert it to dictionary using pyyaml's standard methods.
@@ -55,31 +68,44 @@ def yaml_to_class(yaml_file_path: str, cls: type, default_yaml_file_path: str =
     return yaml_as_class
 
 
-def read_jsonl(file_path: str) -> List:
+def get_json_decoder(fast_json: bool = False) -> Callable:
+    """
+    :param fast_json: Use orjson when it's installed, which decodes several times faster than json module.
+    :return: Function that decodes a json document given as str or bytes
     """
-    This function should be used when size of jsonl file is not too big.
+    if fast_json:
+        try:
+            import orjson
+
+            return orjson.loads
+        except ImportError:
+            pass
+    return json.loads
+
+
+def read_jsonl(file_path: str, max_rows: int = None, fast_json: bool = False) -> List:
+    """
+    This function should be used when size of jsonl file is not too big, or when only first `max_rows` rows are
+    needed. Rest of the file is not read.
 
     :param file_path:
+    :param max_rows: Number of rows to be read from start of the file. None reads all rows.
+    :param fast_json: Decode rows using orjson, when it's installed
     :return: All json strings in .jsonl file as a list
     """
-    jsonl_list = []
-    with open(file_path, "r") as fileobj:
-        while True:
-            single_row = fileobj.readline()
-            if not single_row:
-                break
-
-            json_object = json.loads(single_row.strip())
-            jsonl_list.append(json_object)
-    return jsonl_list
+    loads = get_json_decoder(fast_json)
+    with open(file_path, "rb") as fileobj:
+        return [loads(single_row.strip()) for single_row in itertools.islice(fileobj, max_rows)]
 
 
-def read_jsonl_row(file_path: str):
+def read_jsonl_row(file_path: str, fast_json: bool = False):
     """
 
     :param file_path:
+    :param fast_json: Decode rows using orjson, when it's installed
     :return: Single line from the file. One at a time.
     """
+    loads = get_json_decoder(fast_json)
     with open(file_path, "r") as fileobj:
         while True:
             try:
@@ -87,7 +113,7 @@ def read_jsonl_row(file_path: str):
                 if not single_row:
                     break
 
-                json_object = json.loads(single_row.strip())
+                json_object = loads(single_row.strip())
                 yield json_object
             except json.JSONDecodeError as e:
                 print(f"Error while reading jsonl file at {file_path}. Error: {e}")
@@ -119,6 +145,35 @@ def save_jsonlist(file_path: str, json_list: List, mode: str = "a"):
             file_obj.write(json_str + "\n")
 
 
+def save_json_atomic(file_path: str, json_obj: Dict) -> None:
+    """
+    Write `json_obj` to `file_path`, such that the file either has its old content or the complete new content,
+    even if the process dies midway.
+
+    :param file_path: Path of json file
+    :param json_obj: Object to be saved
+    """
+    if dirname(file_path):
+        os.makedirs(dirname(file_path), exist_ok=True)
+    tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_file_path, "w") as file_obj:
+        json.dump(json_obj, file_obj, default=str, ensure_ascii=False)
+        file_obj.flush()
+        os.fsync(file_obj.fileno())
+    os.replace(tmp_file_path, file_path)
+
+
+def read_json(file_path: str) -> Dict:
+    """
+    :param file_path: Path of json file
+    :return: Content of json file. None if file doesn't exist.
+    """
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, "r") as file_obj:
+        return json.load(file_obj)
+
+
 def str_list_to_dir_path(str_list: List[str]) -> str:
     """
     Return a string which is directory path formed out of concatenating given strings in list `str_list`
@@ -0,0 +1,80 @@
+import copy
+import hashlib
+import mmap
+from array import array
+from collections.abc import Sequence
+
+from .file import get_json_decoder
+
+
+class JsonlDataset(Sequence):
+    """
+    Read only list of rows of a jsonl file, which keeps only byte offsets of rows in memory. File is memory mapped
+    and a row is decoded every time it's accessed, so that random.sample() over a dataset of many GBs decodes only
+    the rows it picks, and pages of the file that are not read stay on disk.
+
+    Blank lines are skipped. Slicing returns another JsonlDataset over the same memory map.
+    """
+
+    def __init__(self, file_path: str, max_rows: int = None, fast_json: bool = False):
+        """
+        :param file_path: Path to jsonl file
+        :param max_rows: Number of rows to be indexed from start of the file. None indexes all rows.
+        :param fast_json: Decode rows using orjson, when it's installed
+        """
+        self.file_path = file_path
+        self._loads = get_json_decoder(fast_json)
+        self._fileobj = open(file_path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file can't be memory mapped
+            self._mmap = b""
+        self._starts = array("q")
+        self._ends = array("q")
+        self._build_index(max_rows)
+
+    def _build_index(self, max_rows: int = None) -> None:
+        size = len(self._mmap)
+        start = 0
+        while start < size and (max_rows is None or len(self._starts) < max_rows):
+            end = self._mmap.find(b"\n", start)
+            if end == -1:
+                end = size
+            if self._mmap[start:end].strip():
+                self._starts.append(start)
+                self._ends.append(end)
+            start = end + 1
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            view = copy.copy(self)
+            view._starts = self._starts[index]
+            view._ends = self._ends[index]
+            return view
+        return self._loads(self._mmap[self._starts[index] : self._ends[index]])
+
+    def get_digest(self) -> str:
+        """
+        :return: Hex digest of contents of rows, which changes when any of the rows changes
+        """
+        digest = hashlib.sha256()
+        for start, end in zip(self._starts, self._ends):
+            digest.update(self._mmap[start:end].strip())
+            digest.update(b"\n")
+        return digest.hexdigest()
+
+    def __str__(self) -> str:
+        # Used when dataset is fingerprinted for checkpoints, hence depends only on contents of rows
+        return f"JsonlDataset(rows={len(self)}, sha256={self.get_digest()})"
+
+    def close(self) -> None:
+        """
+        Close the memory map. Slices of this dataset can't be read after this.
+        """
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._fileobj.close()
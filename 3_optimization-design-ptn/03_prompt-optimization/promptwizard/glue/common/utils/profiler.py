@@ -0,0 +1,349 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from inspect import iscoroutinefunction
+from os.path import join
+from typing import Dict, List, Optional, Tuple
+
+from ..constants.str_literals import ProfilerPhases
+
+# Phase of the code that is running. Context variables are copied into asyncio tasks and into coroutines run by
+# run_coroutine_sync(), so LLM calls made concurrently are still attributed to the phase that made them.
+_current_phase = contextvars.ContextVar("glue_profiler_phase", default=ProfilerPhases.OTHER)
+_current_call = contextvars.ContextVar("glue_profiler_call", default=None)
+
+
+class LLMCallRecord:
+    """
+    Timing and token usage of a single LLM call
+    """
+
+    __slots__ = (
+        "phase", "model", "start", "end", "queue_sec", "prompt_tokens", "completion_tokens", "is_cached",
+    )
+
+    def __init__(self, phase: str, start: float, model: str = None):
+        self.phase = phase
+        self.model = model
+        self.start = start
+        self.end = start
+        self.queue_sec = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.is_cached = False
+
+
+class PhaseProfiler:
+    """
+    Attributes every LLM call to the phase of prompt optimization (mutation, scoring, critique ...) in which it was
+    made, and aggregates wall time, time spent waiting in rate limiter queue, prompt/completion tokens and number of
+    calls per phase. Phases are marked with phase() context manager or profile_phase() decorator, the innermost
+    phase wins. Records can be written as a summary table and as a Chrome trace (chrome://tracing, Perfetto).
+    """
+
+    SUMMARY_FILE_SUFFIX = "_profile_summary.txt"
+    TRACE_FILE_SUFFIX = "_profile_trace.json"
+    # Keys of per phase summary
+    WALL_SEC = "wall_sec"
+    LLM_SEC = "llm_sec"
+    QUEUE_SEC = "queue_sec"
+    CALLS = "calls"
+    CACHED_CALLS = "cached_calls"
+    PROMPT_TOKENS = "prompt_tokens"
+    COMPLETION_TOKENS = "completion_tokens"
+    # Keys of per model summary, in addition to LLM_SEC, CALLS, CACHED_CALLS & token counts
+    MEAN_LLM_SEC = "mean_llm_sec"
+    COST = "cost"
+    TOTAL = "total"
+    # Model of calls that were not routed to any particular model
+    DEFAULT_MODEL = "default"
+
+    _lock = threading.Lock()
+    # (phase, start, end)
+    _spans: List[Tuple[str, float, float]] = []
+    _calls: List[LLMCallRecord] = []
+    _origin = time.perf_counter()
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._spans = []
+            cls._calls = []
+            cls._origin = time.perf_counter()
+
+    @staticmethod
+    def get_phase() -> str:
+        return _current_phase.get()
+
+    @classmethod
+    @contextmanager
+    def phase(cls, name: str):
+        """
+        LLM calls made within this context are attributed to phase `name`.
+
+        :param name: One of ProfilerPhases
+        """
+        if _current_phase.get() == name:
+            yield
+            return
+        token = _current_phase.set(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _current_phase.reset(token)
+            with cls._lock:
+                cls._spans.append((name, start, time.perf_counter()))
+
+    @classmethod
+    def profile_phase(cls, name: str):
+        """
+        Decorator that runs the decorated function/coroutine function within phase(name).
+
+        :param name: One of ProfilerPhases
+        """
+
+        def decorator(method_obj):
+            if iscoroutinefunction(method_obj):
+
+                @wraps(method_obj)
+                async def awrap(*argv, **kwargs):
+                    with cls.phase(name):
+                        return await method_obj(*argv, **kwargs)
+
+                return awrap
+
+            @wraps(method_obj)
+            def wrap(*argv, **kwargs):
+                with cls.phase(name):
+                    return method_obj(*argv, **kwargs)
+
+            return wrap
+
+        return decorator
+
+    @classmethod
+    @contextmanager
+    def llm_call(cls, model: str = None):
+        """
+        Records an LLM call made within this context, attributed to the current phase. Usage of the call is filled
+        by record_usage().
+
+        :param model: unique_model_id of the model that answers the call
+        """
+        record = LLMCallRecord(_current_phase.get(), time.perf_counter(), model)
+        token = _current_call.set(record)
+        try:
+            yield record
+        finally:
+            _current_call.reset(token)
+            record.end = time.perf_counter()
+            with cls._lock:
+                cls._calls.append(record)
+
+    @staticmethod
+    def record_usage(
+        queue_sec: float = 0.0,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        is_cached: bool = False,
+    ) -> None:
+        """
+        Add usage to the LLM call being recorded in current context. No-op outside of llm_call().
+
+        :param queue_sec: Time in seconds the request waited in rate limiter
+        :param prompt_tokens: Number of tokens in prompt
+        :param completion_tokens: Number of tokens in completion
+        :param is_cached: True if response was served from LLM response cache
+        """
+        record: Optional[LLMCallRecord] = _current_call.get()
+        if record is None:
+            return
+        record.queue_sec += queue_sec
+        record.prompt_tokens += prompt_tokens
+        record.completion_tokens += completion_tokens
+        record.is_cached = record.is_cached or is_cached
+
+    @staticmethod
+    def _union_duration(intervals: List[Tuple[float, float]]) -> float:
+        # Phases run concurrently (e.g. in asyncio tasks) overlap. Wall time counts the overlap once.
+        total, current_start, current_end = 0.0, None, None
+        for start, end in sorted(intervals):
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    total += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            total += current_end - current_start
+        return total
+
+    @classmethod
+    def get_summary(cls) -> Dict[str, Dict[str, float]]:
+        """
+        :return: Dict key=phase, value=Dict of wall time, LLM time (sum over calls), queue time, calls, cached calls,
+                 prompt & completion tokens. Key `total` has the same over all phases.
+        """
+        with cls._lock:
+            spans, calls = list(cls._spans), list(cls._calls)
+
+        summary = {}
+        phases = sorted({span[0] for span in spans} | {call.phase for call in calls})
+        for phase in phases + [cls.TOTAL]:
+            phase_calls = [c for c in calls if phase in (c.phase, cls.TOTAL)]
+            intervals = [(s, e) for p, s, e in spans if phase in (p, cls.TOTAL)]
+            # Calls made outside all phases have no span of their own
+            intervals += [(c.start, c.end) for c in phase_calls if c.phase == ProfilerPhases.OTHER]
+            summary[phase] = {
+                cls.WALL_SEC: cls._union_duration(intervals),
+                cls.LLM_SEC: sum((c.end - c.start for c in phase_calls), 0.0),
+                cls.QUEUE_SEC: sum((c.queue_sec for c in phase_calls), 0.0),
+                cls.CALLS: len(phase_calls),
+                cls.CACHED_CALLS: sum(c.is_cached for c in phase_calls),
+                cls.PROMPT_TOKENS: sum(c.prompt_tokens for c in phase_calls),
+                cls.COMPLETION_TOKENS: sum(c.completion_tokens for c in phase_calls),
+            }
+        return summary
+
+    @classmethod
+    def get_model_summary(
+        cls, prices: Dict[str, Tuple[float, float]] = None
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        :param prices: Dict key=model, value=(cost per 1000 prompt tokens, cost per 1000 completion tokens). Cost
+                       of models not in it is 0.
+        :return: Dict key=model, value=Dict of LLM time (sum & mean over calls), calls, cached calls, prompt &
+                 completion tokens and their cost. Key `total` has the same over all models.
+        """
+        with cls._lock:
+            calls = list(cls._calls)
+        prices = prices or {}
+
+        summary = {}
+        models = sorted({call.model or cls.DEFAULT_MODEL for call in calls})
+        for model in models + [cls.TOTAL]:
+            model_calls = [c for c in calls if model in (c.model or cls.DEFAULT_MODEL, cls.TOTAL)]
+            llm_sec = sum((c.end - c.start for c in model_calls), 0.0)
+            summary[model] = {
+                cls.LLM_SEC: llm_sec,
+                cls.MEAN_LLM_SEC: llm_sec / len(model_calls) if model_calls else 0.0,
+                cls.CALLS: len(model_calls),
+                cls.CACHED_CALLS: sum(c.is_cached for c in model_calls),
+                cls.PROMPT_TOKENS: sum(c.prompt_tokens for c in model_calls),
+                cls.COMPLETION_TOKENS: sum(c.completion_tokens for c in model_calls),
+            }
+        for model in models:
+            prompt_price, completion_price = prices.get(model, (0.0, 0.0))
+            summary[model][cls.COST] = (
+                summary[model][cls.PROMPT_TOKENS] * prompt_price
+                + summary[model][cls.COMPLETION_TOKENS] * completion_price
+            ) / 1000
+        summary[cls.TOTAL][cls.COST] = sum((summary[model][cls.COST] for model in models), 0.0)
+        return summary
+
+    @staticmethod
+    def _format_table(key_name: str, summary: Dict[str, Dict[str, float]], columns: List[str]) -> str:
+        lines = [f"{key_name:<18}" + "".join(f"{column:>19}" for column in columns)]
+        for key, row in summary.items():
+            cells = [
+                f"{row[column]:>19.2f}" if isinstance(row[column], float) else f"{row[column]:>19}"
+                for column in columns
+            ]
+            lines.append(f"{key:<18}" + "".join(cells))
+        return "\n".join(lines)
+
+    @classmethod
+    def format_summary(cls) -> str:
+        """
+        :return: Summary as a table, one row per phase
+        """
+        columns = [
+            cls.WALL_SEC, cls.LLM_SEC, cls.QUEUE_SEC, cls.CALLS, cls.CACHED_CALLS,
+            cls.PROMPT_TOKENS, cls.COMPLETION_TOKENS,
+        ]
+        return cls._format_table("phase", cls.get_summary(), columns)
+
+    @classmethod
+    def format_model_summary(cls, prices: Dict[str, Tuple[float, float]] = None) -> str:
+        """
+        :param prices: Same as that of get_model_summary()
+        :return: Summary as a table, one row per model
+        """
+        columns = [
+            cls.LLM_SEC, cls.MEAN_LLM_SEC, cls.CALLS, cls.CACHED_CALLS, cls.PROMPT_TOKENS,
+            cls.COMPLETION_TOKENS, cls.COST,
+        ]
+        return cls._format_table("model", cls.get_model_summary(prices), columns)
+
+    @staticmethod
+    def _assign_lanes(intervals: List[Tuple[float, float]]) -> List[int]:
+        # Chrome trace requires complete events on a thread to nest. Overlapping intervals go on different lanes.
+        lane_ends, lanes = [], [0] * len(intervals)
+        for i in sorted(range(len(intervals)), key=lambda i: intervals[i]):
+            start, end = intervals[i]
+            for lane, lane_end in enumerate(lane_ends):
+                if lane_end <= start:
+                    lanes[i], lane_ends[lane] = lane, end
+                    break
+            else:
+                lanes[i] = len(lane_ends)
+                lane_ends.append(end)
+        return lanes
+
+    @classmethod
+    def get_trace(cls) -> Dict:
+        """
+        :return: Records in Chrome trace event format. Phases and LLM calls are shown on separate sets of rows.
+        """
+        with cls._lock:
+            spans, calls, origin = list(cls._spans), list(cls._calls), cls._origin
+
+        to_us = lambda sec: round((sec - origin) * 1e6)
+        events, thread_names = [], {}
+        for (phase, start, end), lane in zip(
+            spans, cls._assign_lanes([(s, e) for _, s, e in spans])
+        ):
+            thread_names[lane + 1] = f"phases-{lane}"
+            events.append(
+                {"name": phase, "cat": "phase", "ph": "X", "pid": 1, "tid": lane + 1,
+                 "ts": to_us(start), "dur": to_us(end) - to_us(start)}
+            )
+        for call, lane in zip(calls, cls._assign_lanes([(c.start, c.end) for c in calls])):
+            thread_names[lane + 1001] = f"llm-calls-{lane}"
+            events.append(
+                {"name": f"llm:{call.phase}", "cat": "llm", "ph": "X", "pid": 1, "tid": lane + 1001,
+                 "ts": to_us(call.start), "dur": to_us(call.end) - to_us(call.start),
+                 "args": {"model": call.model or cls.DEFAULT_MODEL, "queue_sec": call.queue_sec, "prompt_tokens": call.prompt_tokens,
+                          "completion_tokens": call.completion_tokens, "is_cached": call.is_cached}}
+            )
+        for tid, name in thread_names.items():
+            events.append(
+                {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    @classmethod
+    def write_report(
+        cls, dir_path: str, name: str, prices: Dict[str, Tuple[float, float]] = None
+    ) -> Tuple[str, str]:
+        """
+        Write summary tables (per phase & per model) & Chrome trace of records collected since last reset().
+
+        :param dir_path: Directory in which files are written
+        :param name: Prefix of file names, e.g. name of the run
+        :param prices: Same as that of get_model_summary()
+        :return: (Path of summary file, path of trace file)
+        """
+        os.makedirs(dir_path, exist_ok=True)
+        summary_path = join(dir_path, name + cls.SUMMARY_FILE_SUFFIX)
+        trace_path = join(dir_path, name + cls.TRACE_FILE_SUFFIX)
+        with open(summary_path, "w") as fileobj:
+            fileobj.write(cls.format_summary() + "\n\n" + cls.format_model_summary(prices) + "\n")
+        with open(trace_path, "w") as fileobj:
+            json.dump(cls.get_trace(), fileobj)
+        return summary_path, trace_path
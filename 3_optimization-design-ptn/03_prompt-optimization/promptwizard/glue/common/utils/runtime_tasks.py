@@ -1,11 +1,9 @@
 from importlib import import_module
-from importlib.metadata import distribution, PackageNotFoundError
-import os
-from importlib.util import module_from_spec, spec_from_file_location
+from importlib.util import find_spec, module_from_spec, spec_from_file_location
 
 from os.path import basename, splitext
-import subprocess
 import sys
+from typing import Dict
 
 from ..constants.log_strings import CommonLogsStr
 from ..exceptions import GlueValidaionException
@@ -14,31 +12,28 @@ from ..utils.logging import get_glue_logger
 logger = get_glue_logger(__name__)
 
 
-def install_lib_if_missing(lib_name, find_links = None) -> bool:
+def check_dependencies(dependencies: Dict[str, str]) -> None:
     """
-    Check if library with name `lib_name` is installed in environment. If not, install it in runtime.
+    Check that modules are installed, without importing them. Libraries are never installed at runtime.
 
-    :param lib_name: Name of library
-    :return: True if library was installed. False if it was not initially installed and was installed now.
+    :param dependencies: Dict key=name of module e.g. llama_index.core, value=pip requirement that provides it
+    :raises GlueValidaionException: Listing every missing module, with pip command to install all of them
     """
-    try:
-        version = None
-        if "==" in lib_name:
-            lib_name, version = lib_name.split("==")
-        distri_obj = distribution(lib_name)
-        # if version and distri_obj.version != version:
-        #     raise GlueValidaionException(f"{lib_name} with version={distri_obj.version} is found. "
-        #                                  f"But version needed is {version}", None)
-        return True
-    except (PackageNotFoundError, GlueValidaionException):
-        logger.info(CommonLogsStr.INSTALL_MISSING_LIB.format(lib_name=lib_name))
-        with open(os.devnull, 'w') as devnull:
-            if find_links:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", lib_name, "-f", find_links], stdout=devnull, stderr=devnull)
-            else:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", lib_name], stdout=devnull, stderr=devnull)
-
-    return False
+    missing = {}
+    for module_name, requirement in dependencies.items():
+        try:
+            found = find_spec(module_name) is not None
+        except ModuleNotFoundError:
+            # Parent package of a dotted module name is missing
+            found = False
+        if not found:
+            missing[module_name] = requirement
+
+    if missing:
+        requirements = " ".join(f'"{requirement}"' for requirement in dict.fromkeys(missing.values()))
+        raise GlueValidaionException(
+            CommonLogsStr.MISSING_LIBS.format(modules=", ".join(missing), requirements=requirements), None
+        )
 
 
 def str_to_class(class_name: str, import_path: str = None, file_path: str = None):
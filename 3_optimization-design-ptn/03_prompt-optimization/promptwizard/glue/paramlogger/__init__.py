@@ -1,17 +1,44 @@
 __path__ = __import__('pkgutil').extend_path(__path__, __name__)
 
+import json
 from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
+from inspect import iscoroutinefunction
 from os import makedirs
 from os.path import basename, join
+from typing import Dict
 from uuid import uuid4
 
+from ..common.exceptions import GlueValidaionException
 from . import file_utils as futil
+from .capture_policy import CapturePolicy
 from .constants import LogLiterals
-from .utils import run_method_get_io_dict
+from .sqlite_store import SqliteLogStore
+from .utils import ArgSerializer, LoggingPlan
 
 
 class ParamLogger:
+    # Writes jsonl io logs of all ParamLogger objects in the process, from a background thread
+    BACKGROUND_WRITER = futil.BackgroundJsonlWriter()
+
+    @classmethod
+    def configure_background_writer(
+        cls,
+        flush_size: int = 100,
+        flush_interval_sec: float = 1.0,
+        fsync_policy: str = futil.FsyncPolicies.NEVER,
+        max_queue_size: int = 10000,
+    ) -> None:
+        """
+        Replace the background writer of jsonl logs, after writing whatever the current one has pending. See
+        BackgroundJsonlWriter for meaning of arguments.
+        """
+        cls.BACKGROUND_WRITER.close()
+        cls.BACKGROUND_WRITER = futil.BackgroundJsonlWriter(
+            flush_size, flush_interval_sec, fsync_policy, max_queue_size
+        )
+
     def __init__(self, base_path: str = ""):
         """
         :param base_path: Path where all log files would be saved
@@ -29,6 +56,70 @@ class ParamLogger:
         # When using ParamLogger decorator over a method in a class, should we avoid logging arguement with name `self`
         self.DEL_SELF_ARG = True
 
+        # When set, io logs are buffered by this writer instead of being appended to file one at a time
+        self.WRITER = None
+
+        # Storage of io logs. With sqlite backend, io logs in BASE_PATH are written to one SqliteLogStore.
+        self.BACKEND = LogLiterals.JSONL_BACKEND
+        self.STORE = None
+
+        # Converts values of arguments of decorated methods to what is logged for them
+        self.SERIALIZER = ArgSerializer()
+
+        # Name of decorated method mapped to its CapturePolicy. DEFAULT_POLICY applies to all other methods.
+        self.CAPTURE_POLICIES = {}
+        self.DEFAULT_POLICY = CapturePolicy()
+
+    def set_capture_policies(self, policies: Dict[str, Dict]) -> None:
+        """
+        Set how io logs of methods decorated by log_io_params() & log_io_params_for_method() are captured, from next
+        call onwards. Policies of previously set methods are discarded.
+
+        :param policies: Name of decorated method mapped to arguments of CapturePolicy, e.g.
+                         {"select_top_prompts": {"sample_rate": 0.1}, "default": {"max_field_bytes": 65536}}.
+                         Policy named `default` applies to methods that aren't named.
+        """
+        policies = dict(policies or {})
+        self.DEFAULT_POLICY = CapturePolicy.from_dict(policies.pop(LogLiterals.DEFAULT_POLICY, None))
+        self.CAPTURE_POLICIES = {
+            method_name: CapturePolicy.from_dict(policy_dict) for method_name, policy_dict in policies.items()
+        }
+
+    def get_capture_policy(self, method_name: str) -> CapturePolicy:
+        return self.CAPTURE_POLICIES.get(method_name, self.DEFAULT_POLICY)
+
+    def set_serializer(self, serializer: ArgSerializer) -> None:
+        """
+        :param serializer: Used for arguments of decorated methods from next call onwards, including methods that
+                           were decorated before this was set
+        """
+        self.SERIALIZER = serializer
+
+    def set_backend(self, backend: str) -> None:
+        """
+        :param backend: `jsonl` to append io logs of decorated methods to jsonl files, or `sqlite` to write them to
+                        an indexed SQLite store (io_logs.sqlite) in BASE_PATH, which can be queried using
+                        get_store(). Chained logs are dumped as jsonl either way.
+        """
+        if backend not in (LogLiterals.JSONL_BACKEND, LogLiterals.SQLITE_BACKEND):
+            raise GlueValidaionException(
+                f"Invalid io log backend `{backend}`. Valid values are "
+                f"{(LogLiterals.JSONL_BACKEND, LogLiterals.SQLITE_BACKEND)}",
+                None,
+            )
+        self.BACKEND = backend
+
+    def get_store(self) -> SqliteLogStore:
+        """
+        :return: SQLite store of logs in BASE_PATH
+        """
+        store_path = join(self.BASE_PATH, LogLiterals.STORE_FILE_NAME)
+        if self.STORE is None or self.STORE.db_path != store_path:
+            if self.STORE is not None:
+                self.STORE.close()
+            self.STORE = SqliteLogStore(store_path)
+        return self.STORE
+
     def reset_eval_glue(self, base_path):
         # Path where all log files would be saved
         self.BASE_PATH = base_path
@@ -40,6 +131,44 @@ class ParamLogger:
         # This dictionary can be used, when we want to log output and input of multiple components as a single jsonl
         self.CHAINED_LOG = []
 
+    @contextmanager
+    def buffered_writes(self, flush_every: int = 100):
+        """
+        Within this context, io logs are written in batches, and all of them are in files/store when context exits.
+        jsonl logs are always batched by BACKGROUND_WRITER. SQLite store always commits in batches too (see
+        append_as_jsonl()), of `flush_every` records within this context.
+
+        :param flush_every: Number of records after which buffered records are committed to SQLite store
+        """
+        previous_writer = self.WRITER
+        if self.BACKEND == LogLiterals.SQLITE_BACKEND:
+            self.WRITER = self.get_store()
+            self.WRITER.flush_every = flush_every
+        else:
+            self.WRITER = self.BACKGROUND_WRITER
+        try:
+            yield self.WRITER
+        finally:
+            self.WRITER.flush()
+            self.WRITER = previous_writer
+
+    def append_as_jsonl(self, file_path: str, args_to_log, block: bool = True) -> None:
+        """
+        With sqlite backend, records are committed in batches of the store's `flush_every`, and whatever is pending
+        is committed when chained log is dumped, when store is read and when the process exits.
+
+        :param block: When background writer has too many lines waiting to be written, wait for it if True, else
+                      drop `args_to_log`. Other writers always write.
+        """
+        if self.WRITER is self.BACKGROUND_WRITER:
+            self.WRITER.write(file_path, args_to_log, block)
+        elif self.WRITER is not None:
+            self.WRITER.write(file_path, args_to_log)
+        elif self.BACKEND == LogLiterals.SQLITE_BACKEND:
+            self.get_store().write(file_path, args_to_log)
+        else:
+            self.BACKGROUND_WRITER.write(file_path, args_to_log, block)
+
     def clear_chained_log(self):
         """
         Deletes all previously saved data. Re-initialize CHAINED_LOG with new meta data.
@@ -53,7 +182,15 @@ class ParamLogger:
         """
 
         file_path = join(self.BASE_PATH, file_name + ".jsonl")
-        futil.save_jsonlist(file_path=file_path, json_list=self.CHAINED_LOG)
+        for json_obj in self.CHAINED_LOG:
+            self.BACKGROUND_WRITER.write_line(
+                file_path, json.dumps(json_obj, default=str, ensure_ascii=False)
+            )
+        # Chained log is the final output of a run, hence it (and io logs of the run) are in files once this
+        # method returns
+        self.BACKGROUND_WRITER.flush()
+        if self.STORE is not None:
+            self.STORE.flush()
         self.clear_chained_log()
 
     def append_dict_to_chained_logs(self, args_to_log):
@@ -67,33 +204,41 @@ class ParamLogger:
         :param method_obj:
         :return: None
         """
-        def wrap(*argv, **kwargs):
-            args_to_log = run_method_get_io_dict(method_obj, self.DEL_SELF_ARG, *argv, **kwargs)
+        def log_args(args_to_log):
             args_to_log[LogLiterals.META][LogLiterals.METHOD_NAME] = method_obj.__name__
             self.CHAINED_LOG.append(args_to_log)
             return args_to_log[LogLiterals.OUTPUTS]
+
+        plan = LoggingPlan(method_obj)
+        if iscoroutinefunction(method_obj):
+            async def async_wrap(*argv, **kwargs):
+                return log_args(await plan.arun(self.DEL_SELF_ARG, self.SERIALIZER, argv, kwargs))
+            return async_wrap
+
+        def wrap(*argv, **kwargs):
+            return log_args(plan.run(self.DEL_SELF_ARG, self.SERIALIZER, argv, kwargs))
         return wrap
 
     def log_io_params(self, method_obj, file_name="io_logs"):
         """
         Execute the method referenced by method_obj. After executing, log the inputs and outputs of that method to
-        log file.
+        log file. Both regular methods and methods defined with `async def` can be decorated.
 
         :param method_obj: Method reference, that can be executed
         :param file_name: Name of file in which we shall be logging the input output params of method
         :return: None
         """
-        def wrap(*argv, **kwargs):
-            args_to_log = run_method_get_io_dict(method_obj, self.DEL_SELF_ARG, *argv, **kwargs)
+        def log_args(args_to_log, policy):
             if not self.SAMPLE_UNQ_ID:
                 self.SAMPLE_UNQ_ID = uuid4()
             args_to_log[LogLiterals.ID] = self.SAMPLE_UNQ_ID
             args_to_log[LogLiterals.META][LogLiterals.METHOD_NAME] = method_obj.__name__
             file_path = join(self.BASE_PATH, file_name + ".jsonl")
-            futil.append_as_jsonl(file_path=file_path, args_to_log=args_to_log)
+            policy.limit_record(args_to_log)
+            self.append_as_jsonl(file_path, args_to_log, not policy.drop_on_backpressure)
             self.SAMPLE_UNQ_ID = None
-            return args_to_log[LogLiterals.OUTPUTS]
-        return wrap
+
+        return self._wrap_with_capture_policy(method_obj, log_args)
 
     def log_io_params_for_method(self, method_obj):
         """
@@ -103,15 +248,47 @@ class ParamLogger:
         :param method_obj: Method reference, that can be executed
         :return: None
         """
-        def wrap(*argv, **kwargs):
-            args_to_log = run_method_get_io_dict(method_obj, self.DEL_SELF_ARG, *argv, **kwargs)
+        def log_args(args_to_log, policy):
             if not self.SAMPLE_UNQ_ID:
                 self.SAMPLE_UNQ_ID = uuid4()
             args_to_log[LogLiterals.ID] = self.SAMPLE_UNQ_ID
             file_path = join(self.BASE_PATH, method_obj.__name__+".jsonl")
-            futil.append_as_jsonl(file_path=file_path, args_to_log=args_to_log)
+            policy.limit_record(args_to_log)
+            self.append_as_jsonl(file_path, args_to_log, not policy.drop_on_backpressure)
             self.SAMPLE_UNQ_ID = None
-            return args_to_log[LogLiterals.OUTPUTS]
+
+        return self._wrap_with_capture_policy(method_obj, log_args)
+
+    def _wrap_with_capture_policy(self, method_obj, log_args):
+        """
+        :param method_obj: Method being decorated
+        :param log_args: Logs record of a call, given the record & CapturePolicy of the method
+        :return: Wrapper of `method_obj` that logs the calls picked by its CapturePolicy & returns full output
+        """
+        plan = LoggingPlan(method_obj)
+        method_name = method_obj.__name__
+
+        if iscoroutinefunction(method_obj):
+            async def async_wrap(*argv, **kwargs):
+                policy = self.get_capture_policy(method_name)
+                if not policy.should_capture():
+                    self.SAMPLE_UNQ_ID = None
+                    return await method_obj(*argv, **kwargs)
+                args_to_log = await plan.arun(self.DEL_SELF_ARG, self.SERIALIZER, argv, kwargs)
+                output = args_to_log[LogLiterals.OUTPUTS]
+                log_args(args_to_log, policy)
+                return output
+            return async_wrap
+
+        def wrap(*argv, **kwargs):
+            policy = self.get_capture_policy(method_name)
+            if not policy.should_capture():
+                self.SAMPLE_UNQ_ID = None
+                return method_obj(*argv, **kwargs)
+            args_to_log = plan.run(self.DEL_SELF_ARG, self.SERIALIZER, argv, kwargs)
+            output = args_to_log[LogLiterals.OUTPUTS]
+            log_args(args_to_log, policy)
+            return output
         return wrap
 
     def run_over_logs(self, method_obj):
@@ -120,14 +297,24 @@ class ParamLogger:
         `id`, `inputs`, `outputs` fields in jsonl file at `file_path` can be accessed via dummy_id, dummy_input,
         dummy_output parameters respectively.
 
+        `file_path` can also be a SQLite store (.sqlite) of logs, in which case records can be filtered by passing
+        `log_name`, `method_name`, `sample_id`, `start_time` or `end_time` (see SqliteLogStore.query()) in
+        `store_filters`. Results are written in batches.
+
         :param method_obj:
         :return: None
         """
-        def wrap(file_path, dummy_id, dummy_input, dummy_output, dummy_meta, **kwargs):
-            eval_file_path = join(self.BASE_PATH, method_obj.__name__ + "_" + basename(file_path))
+        def wrap(file_path, dummy_id, dummy_input, dummy_output, dummy_meta, store_filters=None, **kwargs):
+            if SqliteLogStore.is_store_path(file_path):
+                log_name = (store_filters or {}).get("log_name") or SqliteLogStore.get_log_name(file_path)
+                eval_file_path = join(self.BASE_PATH, method_obj.__name__ + "_" + log_name + ".jsonl")
+                records = SqliteLogStore(file_path).query(**(store_filters or {}))
+            else:
+                eval_file_path = join(self.BASE_PATH, method_obj.__name__ + "_" + basename(file_path))
+                records = futil.read_jsonl_row(file_path)
             args_to_log = defaultdict(dict)
 
-            for json_obj in futil.read_jsonl_row(file_path):
+            for json_obj in records:
                 eval_result = method_obj(None,
                                          json_obj[LogLiterals.ID],
                                          json_obj[LogLiterals.INPUTS],
@@ -137,5 +324,6 @@ class ParamLogger:
                 args_to_log[LogLiterals.ID] = json_obj[LogLiterals.ID]
                 args_to_log[LogLiterals.EVAL_RESULT] = eval_result
                 args_to_log[LogLiterals.META][LogLiterals.TIMESTAMP] = datetime.now()
-                futil.append_as_jsonl(file_path=eval_file_path, args_to_log=args_to_log)
+                self.BACKGROUND_WRITER.write(eval_file_path, args_to_log)
+            self.BACKGROUND_WRITER.flush()
         return wrap
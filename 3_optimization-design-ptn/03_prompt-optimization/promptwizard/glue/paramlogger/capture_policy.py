@@ -0,0 +1,96 @@
+import hashlib
+import itertools
+import json
+import math
+from typing import Dict
+
+from ..common.exceptions import GlueValidaionException
+from .constants import LogLiterals
+
+
+class CapturePolicy:
+    """
+    How io logs of a decorated method are captured:
+
+    - sample_rate: Fraction of calls that are logged. Calls are picked evenly (1st, 11th, 21st... for 0.1), rather
+      than at random, so that sampling doesn't change state of `random` that prompt optimization depends on.
+    - max_field_bytes: Each input & the output is truncated to these many bytes. Size of a str is that of its
+      utf-8 encoding, and size of any other value is that of its json form.
+    - hash_over_bytes: Input or output larger than this is replaced by its sha256 digest, which is enough to tell
+      whether two calls got the same payload (e.g. same dataset_subset)
+    - drop_on_backpressure: When background writer has too many lines waiting to be written, drop the record
+      instead of making the decorated method wait. Has no effect when logs are written by any other writer.
+
+    Outputs are limited only in the record that is logged. Decorated method always returns its full output.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        max_field_bytes: int = None,
+        hash_over_bytes: int = None,
+        drop_on_backpressure: bool = False,
+    ):
+        if not 0 <= sample_rate <= 1:
+            raise GlueValidaionException(f"sample_rate should be between 0 and 1, got {sample_rate}", None)
+        for name, value in (("max_field_bytes", max_field_bytes), ("hash_over_bytes", hash_over_bytes)):
+            if value is not None and value <= 0:
+                raise GlueValidaionException(f"{name} should be a positive number of bytes, got {value}", None)
+        self.sample_rate = sample_rate
+        self.max_field_bytes = max_field_bytes
+        self.hash_over_bytes = hash_over_bytes
+        self.drop_on_backpressure = drop_on_backpressure
+        self._calls = itertools.count()
+
+    @classmethod
+    def from_dict(cls, policy_dict: Dict) -> "CapturePolicy":
+        """
+        :param policy_dict: Policy as set in setup_config.yaml, e.g. {"sample_rate": 0.1, "max_field_bytes": 4096}
+        """
+        try:
+            return cls(**(policy_dict or {}))
+        except TypeError as e:
+            raise GlueValidaionException(f"Invalid io log capture policy {policy_dict}", e)
+
+    def should_capture(self) -> bool:
+        """
+        :return: True if current call of the method should be logged
+        """
+        if self.sample_rate >= 1:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        call_index = next(self._calls)
+        return math.floor(call_index * self.sample_rate) != math.floor((call_index - 1) * self.sample_rate)
+
+    @property
+    def limits_size(self) -> bool:
+        return self.max_field_bytes is not None or self.hash_over_bytes is not None
+
+    def limit_field(self, value):
+        """
+        :param value: Logged value of an input or of the output
+        :return: `value`, or what is logged in its place when it's larger than limits of this policy
+        """
+        if isinstance(value, str):
+            encoded = value.encode("utf-8")
+        else:
+            encoded = json.dumps(value, default=str, ensure_ascii=False).encode("utf-8")
+        size = len(encoded)
+        if self.hash_over_bytes is not None and size > self.hash_over_bytes:
+            return f"<sha256 {hashlib.sha256(encoded).hexdigest()} of {size} bytes>"
+        if self.max_field_bytes is not None and size > self.max_field_bytes:
+            truncated = encoded[: self.max_field_bytes].decode("utf-8", errors="ignore")
+            return f"{truncated}...<truncated, {size} bytes>"
+        return value
+
+    def limit_record(self, args_to_log: Dict) -> None:
+        """
+        Apply size limits of this policy to inputs & output of a record, in place.
+        """
+        if not self.limits_size:
+            return
+        inputs = args_to_log[LogLiterals.INPUTS]
+        for arg_name, arg_val in inputs.items():
+            inputs[arg_name] = self.limit_field(arg_val)
+        args_to_log[LogLiterals.OUTPUTS] = self.limit_field(args_to_log[LogLiterals.OUTPUTS])
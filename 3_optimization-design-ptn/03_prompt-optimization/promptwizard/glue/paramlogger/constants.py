@@ -9,3 +9,9 @@ class LogLiterals:
     EVAL_RESULT = "eval_result"
     METHOD_NAME = "method_name"
     DIR_NAME = "io_logs"
+    # Storage backends of io logs
+    JSONL_BACKEND = "jsonl"
+    SQLITE_BACKEND = "sqlite"
+    STORE_FILE_NAME = "io_logs.sqlite"
+    # Name of capture policy that applies to methods without one of their own
+    DEFAULT_POLICY = "default"
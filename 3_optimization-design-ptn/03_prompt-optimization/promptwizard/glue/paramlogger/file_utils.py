@@ -1,6 +1,10 @@
+import atexit
 import json
+import os
+import threading
+import time
 from os.path import join
-from typing import Dict, List
+from typing import Dict, List, Optional, TextIO
 
 
 def read_jsonl(file_path: str) -> List:
@@ -50,6 +54,256 @@ def append_as_jsonl(file_path: str, args_to_log: Dict):
         fileobj.write(json_str + "\n")
 
 
+class BufferedJsonlWriter:
+    """
+    Appends json objects to jsonl files, buffering lines in memory. Buffered lines are written, with one open()
+    per file, once `flush_every` lines have accumulated or when flush()/close() is called. Use this instead of
+    append_as_jsonl() when logging many small records, as that opens & closes the file for every record.
+    """
+
+    def __init__(self, flush_every: int = 100):
+        """
+        :param flush_every: Number of buffered lines after which they are written to files
+        """
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[str]] = {}
+        self._buffered_count = 0
+
+    def write(self, file_path: str, json_obj: Dict) -> None:
+        """
+        :param file_path: Path of jsonl file to which `json_obj` is appended
+        :param json_obj: Object to be logged
+        """
+        json_str = json.dumps(json_obj, default=str)
+        with self._lock:
+            self._buffers.setdefault(file_path, []).append(json_str + "\n")
+            self._buffered_count += 1
+            if self._buffered_count >= self.flush_every:
+                self._flush()
+
+    def _flush(self) -> None:
+        for file_path, lines in self._buffers.items():
+            if lines:
+                with open(file_path, "a") as fileobj:
+                    fileobj.writelines(lines)
+        self._buffers = {}
+        self._buffered_count = 0
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class FsyncPolicies:
+    """
+    Values allowed for `fsync_policy` of BackgroundJsonlWriter.
+
+    NEVER: Leave it to OS to write file buffers to disk
+    FLUSH: fsync files after every batch that is written
+    CLOSE: fsync files only when writer is closed
+    """
+
+    NEVER = "never"
+    FLUSH = "flush"
+    CLOSE = "close"
+
+    @classmethod
+    def all_values(cls) -> List[str]:
+        return [cls.NEVER, cls.FLUSH, cls.CLOSE]
+
+
+class BackgroundJsonlWriter:
+    """
+    Appends json objects to jsonl files from a background thread, so that callers don't wait on disk. Objects are
+    serialized by the caller and its line is added to a pending batch, which costs the caller a lock & a list
+    append. Writer thread is woken up only when `flush_size` lines are pending, or `flush_interval_sec` after the
+    first pending line, and writes the whole batch through file handles it keeps open. Callers block only when
+    `max_queue_size` lines are waiting to be written. Since a single thread writes, lines of concurrent callers
+    never interleave, and lines appear in files in the order in which write() was called.
+
+    Has the same write()/flush()/close() interface as BufferedJsonlWriter. flush() blocks till every line written
+    before it is in the file. Pending lines are written when interpreter exits.
+    """
+
+    def __init__(
+        self,
+        flush_size: int = 100,
+        flush_interval_sec: float = 1.0,
+        fsync_policy: str = FsyncPolicies.NEVER,
+        max_queue_size: int = 10000,
+    ):
+        """
+        :param flush_size: Number of pending lines at which writer thread writes them as one batch
+        :param flush_interval_sec: Max time a line stays pending, before it's written
+        :param fsync_policy: One of FsyncPolicies
+        :param max_queue_size: Max number of lines waiting to be written. write() blocks when these many are waiting.
+        """
+        if fsync_policy not in FsyncPolicies.all_values():
+            raise ValueError(
+                f"Invalid fsync_policy `{fsync_policy}`. Valid values are {FsyncPolicies.all_values()}"
+            )
+        self.flush_size = flush_size
+        self.flush_interval_sec = flush_interval_sec
+        self.fsync_policy = fsync_policy
+        self.max_queue_size = max(max_queue_size, flush_size)
+
+        self._cond = threading.Condition()
+        self._pending: List = []
+        self._pending_since = None
+        # Lines added by write() & lines in files, since writer was created
+        self._added_count = 0
+        self._written_count = 0
+        self._flush_requested = False
+        self._stop_requested = False
+        self._files: Dict[str, TextIO] = {}
+        self._error: Optional[BaseException] = None
+        self._thread = None
+        self.batches_written = 0
+        # Lines dropped by write() with block=False
+        self.dropped_count = 0
+        atexit.register(self.close)
+
+    def _start(self) -> None:
+        # Thread is started on first write, so that writers which are never used cost nothing. Called with _cond held.
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_requested = False
+            self._thread = threading.Thread(target=self._run, name="BackgroundJsonlWriter", daemon=True)
+            self._thread.start()
+
+    @property
+    def lines_written(self) -> int:
+        return self._written_count
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def write(self, file_path: str, json_obj: Dict, block: bool = True) -> bool:
+        """
+        :param file_path: Path of jsonl file to which `json_obj` is appended
+        :param json_obj: Object to be logged. It's serialized right away, so caller can modify it afterwards.
+        :param block: When `max_queue_size` lines are waiting to be written, wait till there is room if True, else
+                      drop `json_obj`
+        :return: False if `json_obj` was dropped
+        """
+        if not block and self._added_count - self._written_count >= self.max_queue_size:
+            # Checked before serializing, as object is most likely to be dropped
+            with self._cond:
+                if self._added_count - self._written_count >= self.max_queue_size:
+                    self.dropped_count += 1
+                    return False
+        return self.write_line(file_path, json.dumps(json_obj, default=str), block)
+
+    def write_line(self, file_path: str, json_str: str, block: bool = True) -> bool:
+        """
+        :param file_path: Path of jsonl file to which `json_str` is appended
+        :param json_str: Serialized json object, without trailing newline
+        :param block: Same as that of write()
+        :return: False if `json_str` was dropped
+        """
+        self._raise_error()
+        with self._cond:
+            self._start()
+            while self._added_count - self._written_count >= self.max_queue_size:
+                if not block:
+                    self.dropped_count += 1
+                    return False
+                self._cond.wait()
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((file_path, json_str + "\n"))
+            self._added_count += 1
+            if len(self._pending) >= self.flush_size:
+                self._cond.notify_all()
+        return True
+
+    def flush(self) -> None:
+        """
+        Block till all lines written so far are in their files.
+        """
+        with self._cond:
+            target_count = self._added_count
+            if self._written_count < target_count:
+                self._flush_requested = True
+                self._cond.notify_all()
+                while self._written_count < target_count and self._thread.is_alive():
+                    self._cond.wait()
+        self._raise_error()
+
+    def close(self) -> None:
+        """
+        Write pending lines, close files & stop writer thread. Writer is started again if used afterwards.
+        """
+        with self._cond:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            self._stop_requested = True
+            self._cond.notify_all()
+        thread.join()
+        self._raise_error()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not (
+                    len(self._pending) >= self.flush_size or self._flush_requested or self._stop_requested
+                ):
+                    timeout = None
+                    if self._pending:
+                        timeout = self._pending_since + self.flush_interval_sec - time.monotonic()
+                        if timeout <= 0:
+                            break
+                    self._cond.wait(timeout)
+                batch, self._pending = self._pending, []
+                self._flush_requested = False
+                stop = self._stop_requested
+
+            self._write_batch(batch)
+            if stop:
+                self._close_files()
+            with self._cond:
+                self._written_count += len(batch)
+                self._cond.notify_all()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List) -> None:
+        if not batch:
+            return
+        lines_by_file: Dict[str, List[str]] = {}
+        for file_path, line in batch:
+            lines_by_file.setdefault(file_path, []).append(line)
+        try:
+            for file_path, lines in lines_by_file.items():
+                fileobj = self._files.get(file_path)
+                if fileobj is None:
+                    fileobj = self._files[file_path] = open(file_path, "a")
+                fileobj.writelines(lines)
+                fileobj.flush()
+                if self.fsync_policy == FsyncPolicies.FLUSH:
+                    os.fsync(fileobj.fileno())
+            self.batches_written += 1
+        except Exception as e:
+            # Raised to the caller on its next write/flush/close
+            self._error = e
+
+    def _close_files(self) -> None:
+        for fileobj in self._files.values():
+            try:
+                if self.fsync_policy != FsyncPolicies.NEVER:
+                    os.fsync(fileobj.fileno())
+                fileobj.close()
+            except Exception as e:
+                self._error = e
+        self._files = {}
+
+
 def save_jsonlist(file_path: str, json_list: List, mode: str = "a"):
     """
     :param json_list: List of json objects
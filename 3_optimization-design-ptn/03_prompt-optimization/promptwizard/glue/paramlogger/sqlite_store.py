@@ -0,0 +1,237 @@
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from os.path import basename, dirname, splitext
+from typing import Dict, Iterator, List, Tuple
+
+from .constants import LogLiterals
+
+
+class SqliteLogStore:
+    """
+    Append only store of io logs in a SQLite file, indexed on log name, method name, timestamp and sample id, so
+    that records of a given method or sample can be fetched without scanning every record. Each record is kept as
+    the same json string that would have been written as a line of a jsonl log.
+
+    Has the same write()/flush()/close() interface as BufferedJsonlWriter, so it can be used as ParamLogger.WRITER.
+    Records are buffered in memory & committed in batches of `flush_every`. Buffered records are committed before
+    store is queried, and when interpreter exits.
+    """
+
+    FILE_EXTENSION = ".sqlite"
+    BUSY_TIMEOUT_SEC = 30
+    COLUMNS = ("log_name", "method_name", "sample_id", "timestamp", "execution_time_sec", "record")
+
+    def __init__(self, db_path: str, flush_every: int = 100):
+        """
+        :param db_path: Path to SQLite file. Created if it doesn't exist.
+        :param flush_every: Number of buffered records after which they are committed
+        """
+        self.db_path = db_path
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._buffer: List[Tuple] = []
+        atexit.register(self.close)
+
+    @classmethod
+    def is_store_path(cls, file_path: str) -> bool:
+        return file_path.endswith(cls.FILE_EXTENSION)
+
+    @staticmethod
+    def get_log_name(file_path: str) -> str:
+        """
+        :param file_path: Path of jsonl file a record would have been appended to, e.g. <dir>/io_logs.jsonl
+        :return: Name of the log, e.g. io_logs
+        """
+        return splitext(basename(file_path))[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections can't be carried across fork(). Child process opens its own.
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if dirname(self.db_path):
+            os.makedirs(dirname(self.db_path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_SEC, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records (id INTEGER PRIMARY KEY, log_name TEXT, method_name TEXT, "
+            "sample_id TEXT, timestamp TEXT, execution_time_sec REAL, record TEXT NOT NULL)"
+        )
+        for column in ("log_name", "method_name", "sample_id", "timestamp"):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS records_{column} ON records ({column})")
+        conn.commit()
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def to_row(log_name: str, json_obj: Dict, json_str: str = None) -> Tuple:
+        """
+        :param log_name: Name of the log `json_obj` belongs to
+        :param json_obj: Record logged by ParamLogger
+        :param json_str: `json_obj` already serialized, if available
+        :return: Values of COLUMNS
+        """
+        meta = json_obj.get(LogLiterals.META) or {}
+        sample_id = json_obj.get(LogLiterals.ID)
+        timestamp = meta.get(LogLiterals.TIMESTAMP)
+        return (
+            log_name,
+            meta.get(LogLiterals.METHOD_NAME),
+            None if sample_id is None else str(sample_id),
+            None if timestamp is None else str(timestamp),
+            meta.get(LogLiterals.EXEC_SEC),
+            json_str if json_str is not None else json.dumps(json_obj, default=str),
+        )
+
+    def write(self, file_path: str, json_obj: Dict) -> None:
+        """
+        :param file_path: Path of jsonl file the record would have been appended to. Its name is the log name.
+        :param json_obj: Record to be logged
+        """
+        row = self.to_row(self.get_log_name(file_path), json_obj)
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.flush_every:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        conn = self._connect()
+        conn.executemany(
+            f"INSERT INTO records ({', '.join(self.COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?)", self._buffer
+        )
+        conn.commit()
+        self._buffer = []
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """
+        Commit buffered records & close the connection. Store is reopened if used again.
+        """
+        with self._lock:
+            self._flush()
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def query(
+        self,
+        log_name: str = None,
+        method_name: str = None,
+        sample_id: str = None,
+        start_time: str = None,
+        end_time: str = None,
+        limit: int = None,
+    ) -> Iterator[Dict]:
+        """
+        Records matching all the given filters, in the order in which they were logged. Records are decoded one at
+        a time, as they are iterated over.
+
+        :param log_name: Name of log, e.g. io_logs
+        :param method_name: Name of decorated method
+        :param sample_id: Value of `id` of record
+        :param start_time: Only records logged at or after this time, formatted as str(datetime)
+        :param end_time: Only records logged before this time, formatted as str(datetime)
+        :param limit: Max number of records
+        :return: Iterator over records
+        """
+        where_sql, values = self._get_where_clause(log_name, method_name, sample_id, start_time, end_time)
+        sql = f"SELECT record FROM records{where_sql} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        with self._lock:
+            self._flush()
+            self._connect()
+        # Records are streamed over a connection of their own, so that writes can go on while they are read
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT_SEC)
+        try:
+            for (record,) in conn.execute(sql, values):
+                yield json.loads(record)
+        finally:
+            conn.close()
+
+    def count(
+        self,
+        log_name: str = None,
+        method_name: str = None,
+        sample_id: str = None,
+        start_time: str = None,
+        end_time: str = None,
+    ) -> int:
+        """
+        :return: Number of records matching all the given filters. Filters are same as those of query().
+        """
+        where_sql, values = self._get_where_clause(log_name, method_name, sample_id, start_time, end_time)
+        with self._lock:
+            self._flush()
+            return self._connect().execute(f"SELECT COUNT(*) FROM records{where_sql}", values).fetchone()[0]
+
+    @staticmethod
+    def _get_where_clause(log_name, method_name, sample_id, start_time, end_time) -> Tuple[str, List]:
+        conditions, values = [], []
+        for condition, value in (
+            ("log_name = ?", log_name),
+            ("method_name = ?", method_name),
+            ("sample_id = ?", sample_id),
+            ("timestamp >= ?", start_time),
+            ("timestamp < ?", end_time),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                values.append(value)
+        where_sql = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where_sql, values
+
+    def import_jsonl(self, jsonl_path: str, log_name: str = None, batch_size: int = 10000) -> int:
+        """
+        Append records of an existing jsonl log to the store.
+
+        :param jsonl_path: Path to jsonl log written by ParamLogger
+        :param log_name: Name under which records are stored. Defaults to name of the jsonl file.
+        :param batch_size: Number of records committed at a time
+        :return: Number of records imported
+        """
+        log_name = log_name or self.get_log_name(jsonl_path)
+        imported_count = 0
+        batch = []
+        with open(jsonl_path, "r") as fileobj:
+            for line in fileobj:
+                line = line.strip()
+                if not line:
+                    continue
+                batch.append(self.to_row(log_name, json.loads(line), line))
+                if len(batch) >= batch_size:
+                    imported_count += self._insert_batch(batch)
+                    batch = []
+        imported_count += self._insert_batch(batch)
+        return imported_count
+
+    def _insert_batch(self, rows: List[Tuple]) -> int:
+        with self._lock:
+            self._buffer.extend(rows)
+            self._flush()
+        return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert jsonl io logs written by ParamLogger to a SQLite store")
+    parser.add_argument("jsonl_paths", nargs="+")
+    parser.add_argument("--db_path", required=True)
+    args = parser.parse_args()
+
+    store = SqliteLogStore(args.db_path)
+    for jsonl_path in args.jsonl_paths:
+        print(f"Imported {store.import_jsonl(jsonl_path)} records from {jsonl_path}")
+    store.close()
@@ -1,12 +1,193 @@
 from collections import defaultdict
+from collections.abc import Hashable, Sized
 from datetime import datetime
+from functools import lru_cache
 from inspect import getfullargspec
 from time import time
-from typing import Dict, Hashable
+from typing import Dict, List, Tuple
 
 from .constants import LogLiterals
 
 
+class ArgSerializer:
+    """
+    Converts value of an argument of a decorated method to what is logged for it. Values that json can hold as they
+    are (None, bool, int, float & str) are logged as they are. Lists, tuples & dicts are logged as lists & dicts
+    whose items are converted the same way, and other hashable values are logged as their str(). Large values are
+    summarized instead of being dumped in full:
+
+    - Strings in a value are logged up to `max_chars` characters in all. Rest of a string is truncated, and length
+      of the full string is noted at the end.
+    - list, dict, set etc. with more than `max_items` items (e.g. a dataset), or nested deeper than `max_depth`,
+      are logged as `<list of 2500 items>`
+    - Objects that can't be hashed and aren't containers (e.g. PromptOptimizationParams) are logged as `<ClassName>`
+
+    Subclass and override serialize() to log arguments differently, and set it using ParamLogger.set_serializer().
+    """
+
+    JSON_SCALARS = (type(None), bool, int, float)
+
+    def __init__(self, max_chars: int = 10000, max_items: int = 20, max_depth: int = 3):
+        """
+        :param max_chars: Max number of characters logged for a value, counting all strings nested in it
+        :param max_items: Max number of items a container can have, to be logged item by item
+        :param max_depth: Max number of levels of containers nested in a value, that are logged item by item
+        """
+        self.max_chars = max_chars
+        self.max_items = max_items
+        self.max_depth = max_depth
+
+    def serialize(self, value):
+        """
+        :param value: Value of an argument
+        :return: What should be logged for `value`. It should be json serializable, or convertible by str().
+        """
+        # Most arguments are short strings & numbers, which are logged as they are
+        if isinstance(value, self.JSON_SCALARS) or (isinstance(value, str) and len(value) <= self.max_chars):
+            return value
+        return self._serialize(value, 1, [self.max_chars])
+
+    def _truncate(self, text: str, remaining_chars: List[int]) -> str:
+        # remaining_chars[0] is number of characters that can still be logged for the value being serialized
+        if len(text) <= remaining_chars[0]:
+            remaining_chars[0] -= len(text)
+            return text
+        kept_chars = remaining_chars[0]
+        remaining_chars[0] = 0
+        return f"{text[:kept_chars]}...<truncated, {len(text)} chars>"
+
+    def _serialize(self, value, depth: int, remaining_chars: List[int]):
+        if isinstance(value, str):
+            return self._truncate(value, remaining_chars)
+        if isinstance(value, self.JSON_SCALARS):
+            return value
+        if isinstance(value, Sized):
+            if len(value) > self.max_items or depth > self.max_depth:
+                return f"<{type(value).__name__} of {len(value)} items>"
+            if isinstance(value, (list, tuple)):
+                return [self._serialize(item, depth + 1, remaining_chars) for item in value]
+            if isinstance(value, dict):
+                return {
+                    key if isinstance(key, (str,) + self.JSON_SCALARS) else self._truncate(str(key), remaining_chars):
+                        self._serialize(item, depth + 1, remaining_chars)
+                    for key, item in value.items()
+                }
+            return self._truncate(str(value), remaining_chars)
+        if isinstance(value, Hashable):
+            return self._truncate(str(value), remaining_chars)
+        return f"<{type(value).__name__}>"
+
+
+class LoggingPlan:
+    """
+    What has to be logged for inputs of a decorated method, worked out once when method is decorated: names of its
+    positional arguments, which of them is `self`, and which arguments have defaults. Logging a call then only maps
+    values that were passed to these names, with no introspection of the method.
+    """
+
+    def __init__(self, method_obj):
+        """
+        :param method_obj: Method being decorated
+        """
+        arg_spec = getfullargspec(method_obj)
+        self.method_obj = method_obj
+        self.arg_names: Tuple[str, ...] = tuple(arg_spec.args)
+        # Positional arguments that are never logged, when `self` should be skipped
+        self.skip_args_without_self = frozenset(("self",)) & frozenset(self.arg_names)
+
+        # (index, name, default) of arguments that have defaults. Keyword only arguments can't be passed
+        # positionally, hence their index is beyond any number of positional values.
+        default_slots = []
+        if arg_spec.defaults:
+            first_index = len(self.arg_names) - len(arg_spec.defaults)
+            for index, default in enumerate(arg_spec.defaults, first_index):
+                default_slots.append((index, self.arg_names[index], default))
+        for arg_name, default in (arg_spec.kwonlydefaults or {}).items():
+            default_slots.append((float("inf"), arg_name, default))
+        self.default_slots = tuple(default_slots)
+
+        # Defaults serialized by the last serializer used, as defaults don't change between calls
+        self._defaults_serializer = None
+        self._serialized_defaults: Tuple = ()
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def for_method(method_obj) -> "LoggingPlan":
+        """
+        :return: Plan of `method_obj`, built on first call & reused thereafter
+        """
+        return LoggingPlan(method_obj)
+
+    def _get_serialized_defaults(self, serializer: ArgSerializer) -> Tuple:
+        if self._defaults_serializer is not serializer:
+            self._serialized_defaults = tuple(
+                (index, arg_name, serializer.serialize(default)) for index, arg_name, default in self.default_slots
+            )
+            self._defaults_serializer = serializer
+        return self._serialized_defaults
+
+    def get_inputs(self, del_self_arg: bool, serializer: ArgSerializer, argv: Tuple, kwargs: Dict) -> Dict:
+        """
+        :param del_self_arg: True if we shouldn't include `self` variable in inputs
+        :param serializer: Converts value of each argument to what is logged
+        :param argv: Arguments that were passed to method as *argv
+        :param kwargs: Arguments that were passed to method as **kwargs
+        :return: Name of each argument mapped to what is logged for it, including arguments whose defaults were used
+        """
+        inputs = {}
+        skip_args = self.skip_args_without_self if del_self_arg else ()
+        serialize = serializer.serialize
+
+        for arg_name, arg_val in zip(self.arg_names, argv):
+            if arg_name not in skip_args:
+                inputs[arg_name] = serialize(arg_val)
+
+        for arg_name, arg_val in kwargs.items():
+            inputs[arg_name] = serialize(arg_val)
+
+        positional_count = len(argv)
+        for index, arg_name, arg_val in self._get_serialized_defaults(serializer):
+            if index >= positional_count and arg_name not in kwargs:
+                inputs[arg_name] = arg_val
+        return inputs
+
+    def get_io_dict(
+        self, del_self_arg: bool, serializer: ArgSerializer, output, execution_time: float, argv: Tuple, kwargs: Dict
+    ) -> Dict:
+        """
+        :return: Dict that has inputs, outputs and meta data to be logged. See get_inputs() for arguments.
+        """
+        args_to_log = defaultdict(dict)
+        args_to_log[LogLiterals.INPUTS] = self.get_inputs(del_self_arg, serializer, argv, kwargs)
+        args_to_log[LogLiterals.OUTPUTS] = output
+        args_to_log[LogLiterals.META][LogLiterals.EXEC_SEC] = execution_time
+        args_to_log[LogLiterals.META][LogLiterals.TIMESTAMP] = datetime.now()
+        return args_to_log
+
+    def run(self, del_self_arg: bool, serializer: ArgSerializer, argv: Tuple, kwargs: Dict) -> Dict:
+        """
+        Run the method with *argv, **kwargs as arguments.
+
+        :return: Dict that has inputs, outputs and meta data to be logged
+        """
+        start_time = time()
+        output = self.method_obj(*argv, **kwargs)
+        execution_time = time() - start_time
+        return self.get_io_dict(del_self_arg, serializer, output, execution_time, argv, kwargs)
+
+    async def arun(self, del_self_arg: bool, serializer: ArgSerializer, argv: Tuple, kwargs: Dict) -> Dict:
+        """
+        Same as run(), for methods defined with `async def`.
+        """
+        start_time = time()
+        output = await self.method_obj(*argv, **kwargs)
+        execution_time = time() - start_time
+        return self.get_io_dict(del_self_arg, serializer, output, execution_time, argv, kwargs)
+
+
+DEFAULT_SERIALIZER = ArgSerializer()
+
+
 def run_method_get_io_dict(method_obj, del_self_arg: bool, *argv, **kwargs) -> Dict:
     """
     Run method method_obj with *argv as arguments.
@@ -19,39 +200,30 @@ def run_method_get_io_dict(method_obj, del_self_arg: bool, *argv, **kwargs) -> D
 
     :return: Dict that has inputs, outputs and meta data to be logged
     """
-    args_to_log = defaultdict(dict)
+    return LoggingPlan.for_method(method_obj).run(del_self_arg, DEFAULT_SERIALIZER, argv, kwargs)
 
-    start_time = time()
-    output = method_obj(*argv, **kwargs)
-    execution_time = time() - start_time
 
-    # get name of input parameters of method method_obj
-    arg_spec = getfullargspec(method_obj)
-    arg_names = arg_spec.args
-    argv_list = list(argv)
-
-    # Capture all *argv values
-    for arg_name, arg_val in zip(arg_names[:len(argv_list)], argv_list):
-        if isinstance(arg_val, Hashable) and not (del_self_arg and arg_name == "self"):
-            args_to_log[LogLiterals.INPUTS][arg_name] = str(arg_val)
-
-    # Capture all **kwargs values
-    args_to_log[LogLiterals.INPUTS].update(kwargs)
+async def arun_method_get_io_dict(method_obj, del_self_arg: bool, *argv, **kwargs) -> Dict:
+    """
+    Same as run_method_get_io_dict(), for methods defined with `async def`.
+    """
+    return await LoggingPlan.for_method(method_obj).arun(del_self_arg, DEFAULT_SERIALIZER, argv, kwargs)
 
-    if arg_spec.defaults:
-        default_arg_values = list(arg_spec.defaults)
-        # For args that don't have any value, set defaults
-        arg_with_no_values_count = len(arg_names) - (len(argv_list) + len(kwargs))
-        # Number of arguments for which defaults should be used
-        defaults_count = min(arg_with_no_values_count, len(default_arg_values))
 
-        # Arguments for which values are not passed but defaults are specified, use defaults
-        for arg_names, arg_val in zip(arg_names[-defaults_count:], default_arg_values[-defaults_count:]):
-            if isinstance(arg_val, Hashable):
-                args_to_log[LogLiterals.INPUTS][arg_name] = str(arg_val)
+def get_io_dict(method_obj, del_self_arg: bool, output, execution_time: float, *argv, **kwargs) -> Dict:
+    """
+    Create dictionary of all input/ output and other meta data elements of an already executed method, to be
+    eventually logged to file.
 
-    args_to_log[LogLiterals.OUTPUTS] = output
-    args_to_log[LogLiterals.META][LogLiterals.EXEC_SEC] = execution_time
-    args_to_log[LogLiterals.META][LogLiterals.TIMESTAMP] = datetime.now()
+    :param method_obj: method reference
+    :param del_self_arg: True if we shouldn't include `self` variable in output dictionary
+    :param output: Value returned by method_obj
+    :param execution_time: Time taken by method_obj to execute, in seconds
+    :param argv: Arguments that were passed to method as *argv
+    :param kwargs: Arguments that were passed to method as **kwargs
 
-    return args_to_log
+    :return: Dict that has inputs, outputs and meta data to be logged
+    """
+    return LoggingPlan.for_method(method_obj).get_io_dict(
+        del_self_arg, DEFAULT_SERIALIZER, output, execution_time, argv, kwargs
+    )
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import random
+from os.path import join
+from typing import Any, Dict, List
+
+from ..common.utils.file import read_json, save_json_atomic
+from ..common.utils.logging import get_glue_logger
+
+logger = get_glue_logger(__name__)
+
+
+class CheckpointLiterals:
+    """
+    Keys of the dictionary saved as checkpoint
+    """
+
+    FINGERPRINT = "fingerprint"
+    STAGE = "stage"
+    PROGRESS = "progress"
+    RANDOM_STATE = "random_state"
+    STATE = "state"
+
+
+class StageCheckpoint:
+    """
+    Saves the state of a multi-stage optimization run to a json file, after every unit of work (e.g. an iteration)
+    in a stage. File is replaced atomically, so a crash at any point leaves behind the last complete checkpoint.
+
+    A checkpoint records the stage it was taken in, the number of units of work completed in that stage, the state
+    needed to continue (e.g. current instruction, mined examples) and the state of global random number generator.
+    Restoring the random state makes a resumed run draw the same samples as an uninterrupted run.
+
+    Checkpoint is tied to a fingerprint of the inputs of the run. A checkpoint taken for different inputs is
+    ignored when resuming.
+    """
+
+    DIR_NAME = "checkpoints"
+
+    def __init__(self, base_path: str, name: str, stages: List[str], fingerprint: str):
+        """
+        :param base_path: Path of experiment directory. Checkpoint is saved in its `checkpoints` sub-directory.
+        :param name: Name of checkpoint file, without extension
+        :param stages: Names of stages of the run, in the order in which they are run
+        :param fingerprint: Value returned by get_fingerprint() for the inputs of the run
+        """
+        self.file_path = join(base_path, self.DIR_NAME, name + ".json")
+        self.stages = stages
+        self.fingerprint = fingerprint
+        self.checkpoint = None
+
+    @staticmethod
+    def get_fingerprint(*inputs: Any) -> str:
+        """
+        :param inputs: Json serializable inputs, which if changed, should invalidate the checkpoint
+        :return: Hex digest of inputs
+        """
+        payload = json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self) -> bool:
+        """
+        Load the last checkpoint saved by a run with the same fingerprint.
+
+        :return: True if a checkpoint was found
+        """
+        checkpoint = read_json(self.file_path)
+        if checkpoint is None:
+            return False
+        if checkpoint.get(CheckpointLiterals.FINGERPRINT) != self.fingerprint:
+            logger.info(
+                f"Ignoring checkpoint {self.file_path}, as it was saved for a run with different inputs."
+            )
+            return False
+
+        self.checkpoint = checkpoint
+        random_state = checkpoint[CheckpointLiterals.RANDOM_STATE]
+        random.setstate((random_state[0], tuple(random_state[1]), random_state[2]))
+        logger.info(
+            f"Resuming from checkpoint {self.file_path}, stage={checkpoint[CheckpointLiterals.STAGE]}, "
+            f"progress={checkpoint[CheckpointLiterals.PROGRESS]}"
+        )
+        return True
+
+    def get_state(self) -> Dict:
+        """
+        :return: State saved with the loaded checkpoint. Empty dictionary when no checkpoint is loaded.
+        """
+        if self.checkpoint is None:
+            return {}
+        return self.checkpoint[CheckpointLiterals.STATE]
+
+    def is_completed(self, stage: str) -> bool:
+        """
+        :param stage: Name of stage
+        :return: True if the loaded checkpoint was taken in a stage that runs after `stage`
+        """
+        if self.checkpoint is None:
+            return False
+        saved_stage = self.checkpoint[CheckpointLiterals.STAGE]
+        return self.stages.index(saved_stage) > self.stages.index(stage)
+
+    def get_progress(self, stage: str) -> int:
+        """
+        :param stage: Name of stage
+        :return: Number of units of work in `stage` done as per the loaded checkpoint. 0 if checkpoint wasn't
+                 taken in `stage`.
+        """
+        if (
+            self.checkpoint is None
+            or self.checkpoint[CheckpointLiterals.STAGE] != stage
+        ):
+            return 0
+        return self.checkpoint[CheckpointLiterals.PROGRESS]
+
+    def save(self, stage: str, progress: int, state: Dict) -> None:
+        """
+        :param stage: Name of stage in which checkpoint is taken
+        :param progress: Number of units of work completed in `stage`
+        :param state: Json serializable state needed to resume the run
+        """
+        self.checkpoint = {
+            CheckpointLiterals.FINGERPRINT: self.fingerprint,
+            CheckpointLiterals.STAGE: stage,
+            CheckpointLiterals.PROGRESS: progress,
+            CheckpointLiterals.RANDOM_STATE: random.getstate(),
+            CheckpointLiterals.STATE: state,
+        }
+        save_json_atomic(self.file_path, self.checkpoint)
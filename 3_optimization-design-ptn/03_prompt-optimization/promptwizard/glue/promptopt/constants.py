@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from enum import Enum
+from typing import Dict, List, Optional, Union
 
 from ..common.base_classes import UniversalBaseClass
 
@@ -39,3 +40,32 @@ class PromptPool(UniversalBaseClass):
     system_prompt: str
     final_prompt: str
     eval_prompt: str
+
+
+@dataclass
+class SweepConfig(UniversalBaseClass):
+    """
+    Hyperparameter sweep, defined in sweep_config.yaml. Every prompt optimization config in `prompt_config_paths`
+    is run with every combination of values in `grid`.
+
+    An entry of `prompt_config_paths` is either a path, or a dict having `prompt_config_path` and optionally
+    `train_file_name`, `test_file_name` & `dataset_processor_pkl_path` of that config. Values missing in an entry
+    are taken from the top level fields of the same name.
+    """
+    sweep_name: str
+    setup_config_path: str
+    prompt_config_paths: List[Union[str, Dict[str, str]]]
+    train_file_name: Optional[str] = None
+    dataset_processor_pkl_path: Optional[str] = None
+    test_file_name: Optional[str] = None
+    llm_config_path: Optional[str] = None
+    # key=hyperparameter in prompt optimization config, value=list of values to be tried
+    grid: Optional[Dict[str, List]] = None
+    max_workers: int = 2
+    # Defaults to llm_response_cache.sqlite in directory of sweep
+    llm_cache_path: Optional[str] = None
+    llm_cache_max_size_mb: Optional[float] = None
+    use_examples: bool = False
+    run_without_train_examples: bool = False
+    generate_synthetic_examples: bool = False
+    resume: bool = False
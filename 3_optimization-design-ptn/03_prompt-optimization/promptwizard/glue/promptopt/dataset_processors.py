@@ -0,0 +1,51 @@
+import argparse
+import pickle
+from typing import Any
+
+from ..common.utils.file import save_jsonlist
+from .techniques.common_logic import DatasetSpecificProcessing
+
+
+class JsonlDatasetProcessing(DatasetSpecificProcessing):
+    """
+    Processing for datasets whose rows already have `question`, `answer` & `final_answer` keys, like the jsonl files
+    in `dataset/`. Output of LLM is taken as the final answer, as is.
+
+    This class is defined in a module, rather than in a notebook or script, so that its pickle can be loaded by any
+    process, including workers spawned by SweepRunner.
+    """
+
+    def dataset_to_jsonl(self, dataset_jsonl: str, **kwargs: Any) -> None:
+        """
+        :param dataset_jsonl: Path of file in which jsonl data should be saved.
+        :param dataset: Iterable of dicts having `question` & `answer`, and optionally `final_answer`. Answer is
+                        used as final answer when final answer is missing.
+        """
+        examples_set = []
+        for sample in kwargs["dataset"]:
+            examples_set.append(
+                {
+                    DatasetSpecificProcessing.QUESTION_LITERAL: sample["question"],
+                    DatasetSpecificProcessing.ANSWER_WITH_REASON_LITERAL: sample["answer"],
+                    DatasetSpecificProcessing.FINAL_ANSWER_LITERAL: sample.get("final_answer", sample["answer"]),
+                }
+            )
+        save_jsonlist(dataset_jsonl, examples_set, "w")
+
+    def extract_final_answer(self, llm_output: str) -> str:
+        return llm_output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pickle a JsonlDatasetProcessing object, to be passed as `dataset_processor_pkl_path`"
+    )
+    parser.add_argument("--output_path", required=True)
+    args = parser.parse_args()
+
+    # When run with `python -m`, classes of this file belong to __main__. Class is imported by its module path, so
+    # that the pickle refers to a module that other processes can import.
+    from promptwizard.glue.promptopt.dataset_processors import JsonlDatasetProcessing as ImportableProcessing
+
+    with open(args.output_path, "wb") as file:
+        pickle.dump(ImportableProcessing(), file)
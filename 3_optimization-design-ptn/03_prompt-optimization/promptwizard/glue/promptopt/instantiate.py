@@ -1,14 +1,24 @@
-from os.path import dirname, join
+import json
+from os.path import dirname, isfile, join
 import pickle
 import time
-from typing import Any
+from typing import Any, Dict, List
+
+from tqdm import tqdm
 
 from ..common.base_classes import LLMConfig, SetupConfig
 from ..common.constants.log_strings import CommonLogsStr
+from ..common.constants.str_literals import ProfilerPhases
 from ..common.llm.llm_mgr import LLMMgr
+from ..common.llm.model_router import ModelRouter
+from ..common.utils.concurrency import map_with_concurrency, run_coroutine_sync
 from ..common.utils.logging import get_glue_logger, set_logging_config
-from ..common.utils.file import read_jsonl, yaml_to_class, yaml_to_dict, read_jsonl_row
+from ..common.utils.profiler import PhaseProfiler
+from ..common.utils.file import read_jsonl, yaml_to_class, yaml_to_dict, read_jsonl_row, save_jsonlist
+from ..common.utils.jsonl_dataset import JsonlDataset
 from ..paramlogger import ParamLogger
+from ..paramlogger.file_utils import BufferedJsonlWriter
+from ..promptopt.checkpoint import StageCheckpoint
 from ..promptopt.constants import PromptOptimizationLiterals
 from ..promptopt.techniques.common_logic import DatasetSpecificProcessing
 from ..promptopt.utils import get_promptopt_class
@@ -30,6 +40,9 @@ class GluePromptOpt:
         IS_CORRECT = "is_correct"
         PREDICTED_ANS = "predicted_ans"
         LLM_OUTPUT = "llm_output"
+        # Keys of rows in evaluation checkpoint
+        FINGERPRINT = "fingerprint"
+        RESULT = "result"
 
     def __init__(
         self,
@@ -39,6 +52,10 @@ class GluePromptOpt:
         data_processor: DatasetSpecificProcessing,
         dataset_processor_pkl_path: str = None,
         prompt_pool_path: str = None,
+        llm_config_path: str = None,
+        resume: bool = False,
+        mmap_dataset: bool = False,
+        fast_json: bool = False,
     ):
         """
         Collates all the configs present in different yaml files. Initialize logger, de-serialize pickle file that has
@@ -53,6 +70,13 @@ class GluePromptOpt:
         :param dataset_processor_pkl_path: Path to pickle file that has object of class DatasetSpecificProcessing
                                            serialized.
         :param prompt_pool_path: Path to yaml file that has prompts
+        :param llm_config_path: Path to yaml file that has LLM related configs. Rate limits of models are read
+                                from it.
+        :param resume: If True, get_best_prompt() continues from the checkpoint saved by an earlier (interrupted)
+                       run of the same experiment, instead of starting from scratch.
+        :param mmap_dataset: If True, rows of `dataset_jsonl` are kept on disk (memory mapped) and decoded when
+                             accessed, instead of being held in memory.
+        :param fast_json: If True, jsonl files are decoded using orjson, when it's installed.
         """
         if dataset_jsonl != None:
             if data_processor:
@@ -69,10 +93,22 @@ class GluePromptOpt:
         )
         print(f"==== Prompt optimization class ===={prompt_opt_cls}")
 
+        self.resume = resume
+        self.fast_json = fast_json
         self.setup_config = yaml_to_class(setup_config_path, SetupConfig)
+        # Fail before any work is done, if libraries needed to call the LLM are missing
+        LLMMgr.check_dependencies()
+        if llm_config_path:
+            llm_config = yaml_to_class(llm_config_path, LLMConfig)
+            LLMMgr.set_rate_limits(llm_config)
+            LLMMgr.set_models(llm_config)
         self.prompt_opt_param = yaml_to_class(
             prompt_config_path, prompt_opt_hyperparam_cls
         )
+        LLMMgr.set_phase_models(
+            getattr(self.prompt_opt_param, "unique_model_id", None),
+            getattr(self.prompt_opt_param, "phase_models", None),
+        )
         current_dir = dirname(__file__)
         default_yaml_path = join(
             current_dir,
@@ -86,13 +122,22 @@ class GluePromptOpt:
         )
 
         if dataset_jsonl != None:
-            dataset = read_jsonl(dataset_jsonl)
+            # Only first `seen_set_size` rows are used, rest of the file is not read
+            if mmap_dataset:
+                dataset = JsonlDataset(
+                    dataset_jsonl, self.prompt_opt_param.seen_set_size, fast_json
+                )
+            else:
+                dataset = read_jsonl(
+                    dataset_jsonl, self.prompt_opt_param.seen_set_size, fast_json
+                )
         self.prompt_opt_param.answer_format += (
             self.prompt_pool.ans_delimiter_instruction
         )
         base_path = join(
             self.setup_config.dir_info.base_dir, self.setup_config.experiment_name
         )
+        self.base_path = base_path
         set_logging_config(
             join(base_path, self.setup_config.dir_info.log_dir_name),
             self.setup_config.mode,
@@ -137,7 +182,12 @@ class GluePromptOpt:
             self.prompt_pool,
             self.data_processor,
             self.logger,
+            resume=resume,
         )
+        self.iolog.set_backend(self.setup_config.io_log_backend)
+        self.prompt_opt.iolog.set_backend(self.setup_config.io_log_backend)
+        self.iolog.set_capture_policies(self.setup_config.io_log_policies)
+        self.prompt_opt.iolog.set_capture_policies(self.setup_config.io_log_policies)
 
     def get_best_prompt(
         self,
@@ -153,6 +203,7 @@ class GluePromptOpt:
             identity of described in expert_profile.
         """
         start_time = time.time()
+        PhaseProfiler.reset()
 
         self.BEST_PROMPT, self.EXPERT_PROFILE = self.prompt_opt.get_best_prompt(
             self.prompt_opt_param,
@@ -164,17 +215,30 @@ class GluePromptOpt:
         self.logger.info(
             f"Time taken to find best prompt: {(time.time() - start_time)} sec"
         )
+        self.logger.info(f"Rate limiter metrics: {LLMMgr.get_rate_limiter_metrics()}")
+        self.logger.info(f"LLM response cache metrics: {LLMMgr.get_response_cache_metrics()}")
+        self.write_profile("optimization")
         return self.BEST_PROMPT, self.EXPERT_PROFILE
 
-    def evaluate(self, test_dataset_jsonl: str) -> float:
+    def evaluate(
+        self, test_dataset_jsonl: str, max_concurrency: int = None, resume: bool = None
+    ) -> float:
         """
         Evaluate the performance of self.BEST_PROMPT over test dataset. Return the accuracy.
 
+        Up to `max_concurrency` questions are answered concurrently, while results are logged in the order of
+        rows in test dataset. Every completed row is checkpointed, so an interrupted evaluation can be resumed.
+
         :param test_dataset_jsonl: Path to jsonl file that has test dataset
+        :param max_concurrency: Max number of questions being answered at a time. Defaults to `max_concurrency` in
+                                prompt optimization config.
+        :param resume: If True, rows evaluated by an earlier (interrupted) evaluation of the same prompt over the
+                       same dataset are not evaluated again. Defaults to `resume` passed to constructor.
         :return: Percentage accuracy
         """
 
         start_time = time.time()
+        PhaseProfiler.reset()
         self.logger.info(f"Evaluation started {CommonLogsStr.LOG_SEPERATOR}")
         if not self.BEST_PROMPT:
             self.logger.error(
@@ -183,30 +247,157 @@ class GluePromptOpt:
             )
             return
 
+        if max_concurrency is None:
+            max_concurrency = self.prompt_opt_param.max_concurrency
+        if resume is None:
+            resume = self.resume
+
+        checkpoint_path = join(
+            self.iolog.BASE_PATH, f"eval_checkpoint_{self.setup_config.experiment_name}.jsonl"
+        )
+        # Contents of test dataset, not its path, are fingerprinted, as completed rows are skipped by count when
+        # resuming, and would not match the rows of an edited file
+        test_dataset = JsonlDataset(test_dataset_jsonl)
+        try:
+            dataset_digest = test_dataset.get_digest()
+        finally:
+            test_dataset.close()
+        fingerprint = StageCheckpoint.get_fingerprint(
+            self.BEST_PROMPT, self.EXPERT_PROFILE, dataset_digest
+        )
+        completed_rows = self.load_eval_checkpoint(checkpoint_path, fingerprint) if resume else []
+        if completed_rows:
+            self.logger.info(f"Resuming evaluation after {len(completed_rows)} completed rows")
+        else:
+            save_jsonlist(checkpoint_path, [{self.EvalLiterals.FINGERPRINT: fingerprint}], mode="w")
+
         total_correct = 0
         total_count = 0
-        for json_obj in read_jsonl_row(test_dataset_jsonl):
-            answer = self.predict_and_access(
+        for row in completed_rows:
+            total_correct += row[self.EvalLiterals.IS_CORRECT]
+            total_count += 1
+            self.iolog.append_dict_to_chained_logs(row[self.EvalLiterals.RESULT])
+
+        rows = read_jsonl_row(test_dataset_jsonl, self.fast_json)
+        for _ in range(total_count):
+            next(rows, None)
+
+        async def apredict_row(json_obj: Dict):
+            answer = await self.apredict_and_access(
                 json_obj[DatasetSpecificProcessing.QUESTION_LITERAL],
                 json_obj[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL],
             )
+            return json_obj, answer
 
-            total_correct += answer[self.EvalLiterals.IS_CORRECT]
-            total_count += 1
-            result = {
-                "accuracy": f"{total_correct}/{total_count} : {total_correct/total_count}%",
-                "predicted": answer[self.EvalLiterals.PREDICTED_ANS],
-                "actual": json_obj[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL],
-            }
-            self.iolog.append_dict_to_chained_logs(result)
-            self.logger.info(result)
+        async def aevaluate_rows():
+            nonlocal total_correct, total_count
+            # Results are yielded in the order of rows, so that log & checkpoint keep the order of test dataset
+            async for json_obj, answer in map_with_concurrency(max_concurrency, apredict_row, rows):
+                total_correct += answer[self.EvalLiterals.IS_CORRECT]
+                total_count += 1
+                result = {
+                    "accuracy": f"{total_correct}/{total_count} : {total_correct/total_count}%",
+                    "predicted": answer[self.EvalLiterals.PREDICTED_ANS],
+                    "actual": json_obj[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL],
+                }
+                self.iolog.append_dict_to_chained_logs(result)
+                self.logger.info(result)
+                checkpoint_writer.write(
+                    checkpoint_path,
+                    {
+                        self.EvalLiterals.IS_CORRECT: bool(answer[self.EvalLiterals.IS_CORRECT]),
+                        self.EvalLiterals.RESULT: result,
+                    },
+                )
+                progress_bar.update(1)
+                progress_bar.set_postfix(accuracy=f"{total_correct/total_count:.3f}")
+
+        progress_bar = tqdm(
+            total=self.get_rows_count(test_dataset_jsonl), initial=total_count, desc="Evaluating"
+        )
+        checkpoint_writer = BufferedJsonlWriter(flush_every=max_concurrency)
+        try:
+            with self.iolog.buffered_writes(), self.prompt_opt.iolog.buffered_writes(), \
+                    PhaseProfiler.phase(ProfilerPhases.EVAL):
+                run_coroutine_sync(aevaluate_rows())
+        finally:
+            # Rows completed before an interruption stay in checkpoint, to be skipped when resuming
+            checkpoint_writer.close()
+            progress_bar.close()
 
         self.iolog.dump_chained_log_to_file(
             file_name=f"eval_result_{self.setup_config.experiment_name}"
         )
         self.logger.info(f"Time taken for evaluation: {(time.time() - start_time)} sec")
+        self.logger.info(f"Rate limiter metrics: {LLMMgr.get_rate_limiter_metrics()}")
+        self.logger.info(f"LLM response cache metrics: {LLMMgr.get_response_cache_metrics()}")
+        self.write_profile("evaluation")
         return total_correct / total_count
 
+    def write_profile(self, run_name: str) -> None:
+        """
+        Log time, tokens & number of LLM calls spent in each phase, and on each model along with its cost, since
+        last PhaseProfiler.reset(). Write them as summary tables & Chrome trace in `profile` directory of experiment.
+
+        :param run_name: Prefix of names of profile files
+        """
+        prices = ModelRouter.get_prices()
+        summary_path, trace_path = PhaseProfiler.write_report(
+            join(self.base_path, "profile"), run_name, prices
+        )
+        self.logger.info(
+            f"LLM usage per phase:\n{PhaseProfiler.format_summary()}\n"
+            f"LLM usage per model:\n{PhaseProfiler.format_model_summary(prices)}\n"
+            f"Profile written to {summary_path} and {trace_path}"
+        )
+
+    @staticmethod
+    def get_rows_count(dataset_jsonl: str) -> int:
+        """
+        :param dataset_jsonl: Path to jsonl file
+        :return: Number of non-empty lines in file
+        """
+        with open(dataset_jsonl, "r") as fileobj:
+            return sum(1 for line in fileobj if line.strip())
+
+    def load_eval_checkpoint(self, checkpoint_path: str, fingerprint: str) -> List[Dict]:
+        """
+        :param checkpoint_path: Path to jsonl file in which rows completed by evaluate() are saved
+        :param fingerprint: Fingerprint of the prompt and dataset being evaluated
+        :return: Rows completed by an earlier evaluation with same fingerprint. Empty list if there is none.
+        """
+        if not isfile(checkpoint_path):
+            return []
+        # A crash while writing can leave behind a partial last line
+        completed_rows = []
+        with open(checkpoint_path, "r") as fileobj:
+            for line in fileobj:
+                try:
+                    completed_rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        if not completed_rows or completed_rows[0].get(self.EvalLiterals.FINGERPRINT) != fingerprint:
+            self.logger.info(
+                f"Ignoring checkpoint {checkpoint_path}, as it was saved for different prompt or dataset."
+            )
+            return []
+        return completed_rows[1:]
+
+    def get_final_prompt(self, question: str) -> str:
+        return self.prompt_pool.eval_prompt.format(
+            instruction=self.BEST_PROMPT, question=question
+        )
+
+    def access_answer(self, llm_output: str, gt_answer: str) -> Dict:
+        is_correct, predicted_ans = self.data_processor.access_answer(
+            llm_output, gt_answer
+        )
+        return {
+            self.EvalLiterals.IS_CORRECT: is_correct,
+            self.EvalLiterals.PREDICTED_ANS: predicted_ans,
+            self.EvalLiterals.LLM_OUTPUT: llm_output,
+        }
+
     @iolog.log_io_params
     def predict_and_access(self, question: str, gt_answer: str) -> (bool, str, str):
         """
@@ -221,18 +412,17 @@ class GluePromptOpt:
                 llm_output -> Output text generated by LLM for the given question
         :rtype: (bool, str, str)
         """
-        final_prompt = self.prompt_pool.eval_prompt.format(
-            instruction=self.BEST_PROMPT, question=question
-        )
         llm_output = self.prompt_opt.chat_completion(
-            user_prompt=final_prompt, system_prompt=self.EXPERT_PROFILE
+            user_prompt=self.get_final_prompt(question), system_prompt=self.EXPERT_PROFILE
         )
+        return self.access_answer(llm_output, gt_answer)
 
-        is_correct, predicted_ans = self.data_processor.access_answer(
-            llm_output, gt_answer
+    @iolog.log_io_params
+    async def apredict_and_access(self, question: str, gt_answer: str) -> (bool, str, str):
+        """
+        Async version of predict_and_access()
+        """
+        llm_output = await self.prompt_opt.achat_completion(
+            user_prompt=self.get_final_prompt(question), system_prompt=self.EXPERT_PROFILE
         )
-        return {
-            self.EvalLiterals.IS_CORRECT: is_correct,
-            self.EvalLiterals.PREDICTED_ANS: predicted_ans,
-            self.EvalLiterals.LLM_OUTPUT: llm_output,
-        }
+        return self.access_answer(llm_output, gt_answer)
@@ -1,5 +1,5 @@
 import argparse
-from glue.promptopt.instantiate import GluePromptOpt
+from .instantiate import GluePromptOpt
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="Arguments needed by prompt manager")
@@ -13,12 +13,13 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
-    gp = GluePromptOpt(args.llm_config_path,
-                       args.promptopt_config_path,
+    gp = GluePromptOpt(args.prompt_config_path,
                        args.setup_config_path,
                        args.train_file_name,
-                       args.dataset_processor_pkl_path,
-                       args.prompt_pool_path)
+                       None,
+                       dataset_processor_pkl_path=args.dataset_processor_pkl_path,
+                       prompt_pool_path=args.prompt_pool_path,
+                       llm_config_path=args.llm_config_path)
 
     best_prompt, expert_profile = gp.get_best_prompt()
     print(f"Best prompt: {best_prompt} \nExpert profile: {expert_profile}")
@@ -26,4 +27,3 @@ if __name__ == '__main__':
     if args.test_file_name:
         accuracy = gp.evaluate(args.test_file_name)
         print(f"accuracy: {accuracy}")
-
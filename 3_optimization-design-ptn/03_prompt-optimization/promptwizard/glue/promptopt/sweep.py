@@ -0,0 +1,317 @@
+import argparse
+import itertools
+import multiprocessing
+import time
+from functools import partial
+from os.path import basename, isfile, join, splitext
+from typing import Dict, List, Union
+
+from tqdm import tqdm
+
+from ..common.base_classes import LLMConfig
+from ..common.exceptions import GlueValidaionException
+from ..common.llm.llm_mgr import LLMMgr
+from ..common.llm.rate_limiter import RateLimiterRegistry
+from ..common.utils.file import dict_to_yaml, save_jsonlist, yaml_to_class, yaml_to_dict
+from ..common.utils.logging import get_glue_logger
+from ..common.utils.profiler import PhaseProfiler
+from .constants import SweepConfig
+from .instantiate import GluePromptOpt
+
+logger = get_glue_logger(__name__)
+
+
+class SweepLiterals:
+    # Keys of a job
+    RUN_NAME = "run"
+    PROMPT_CONFIG = "prompt_config"
+    OVERRIDES = "overrides"
+    PROMPT_CONFIG_PATH = "prompt_config_path"
+    SETUP_CONFIG_PATH = "setup_config_path"
+    # Datasets of a job. Also keys of a dict entry of `prompt_config_paths` in sweep config.
+    TRAIN_FILE_NAME = "train_file_name"
+    TEST_FILE_NAME = "test_file_name"
+    DATASET_PROCESSOR_PKL_PATH = "dataset_processor_pkl_path"
+    # Keys of a row of results, in addition to RUN_NAME & PROMPT_CONFIG
+    ACCURACY = "accuracy"
+    PROMPT_TOKENS = "prompt_tokens"
+    COMPLETION_TOKENS = "completion_tokens"
+    LLM_CALLS = "llm_calls"
+    COST = "cost"
+    WALL_SEC = "wall_sec"
+    BEST_PROMPT = "best_prompt"
+    ERROR = "error"
+
+    RESULTS_FILE_NAME = "sweep_results"
+    CACHE_FILE_NAME = "llm_response_cache.sqlite"
+
+
+def init_sweep_worker(
+    llm_config: LLMConfig, shared_states: Dict, cache_path: str, cache_max_size_mb: float
+) -> None:
+    """
+    Runs once in every worker process of the sweep, before it picks up any job.
+
+    :param llm_config: Object having all settings & preferences for all LLMs. None if no rate limits are configured.
+    :param shared_states: Rate limiter state shared by all workers
+    :param cache_path: Path to SQLite file of LLM response cache shared by all workers
+    :param cache_max_size_mb: Max total size of cached responses in MB
+    """
+    if llm_config:
+        LLMMgr.set_rate_limits(llm_config, shared_states)
+        LLMMgr.set_models(llm_config)
+    LLMMgr.set_response_cache(cache_path, cache_max_size_mb)
+
+
+def run_sweep_job(sweep_config: SweepConfig, job: Dict) -> Dict:
+    """
+    Find best prompt for one job of the sweep and evaluate it over test dataset. Runs in a worker process.
+
+    :param sweep_config: Config of the sweep
+    :param job: One of the jobs returned by SweepRunner.get_jobs()
+    :return: Row of results table. Failure of a job is reported in its row, instead of stopping the sweep.
+    """
+    start_time = time.time()
+    row = {
+        SweepLiterals.RUN_NAME: job[SweepLiterals.RUN_NAME],
+        SweepLiterals.PROMPT_CONFIG: job[SweepLiterals.PROMPT_CONFIG],
+        **job[SweepLiterals.OVERRIDES],
+        SweepLiterals.ACCURACY: None,
+        SweepLiterals.PROMPT_TOKENS: 0,
+        SweepLiterals.COMPLETION_TOKENS: 0,
+        SweepLiterals.LLM_CALLS: 0,
+        SweepLiterals.COST: 0.0,
+    }
+
+    def add_usage():
+        # Profiler is reset at start of get_best_prompt() & evaluate()
+        usage = PhaseProfiler.get_summary()[PhaseProfiler.TOTAL]
+        row[SweepLiterals.PROMPT_TOKENS] += usage[PhaseProfiler.PROMPT_TOKENS]
+        row[SweepLiterals.COMPLETION_TOKENS] += usage[PhaseProfiler.COMPLETION_TOKENS]
+        row[SweepLiterals.LLM_CALLS] += usage[PhaseProfiler.CALLS]
+        row[SweepLiterals.COST] += LLMMgr.get_model_usage()[PhaseProfiler.TOTAL][PhaseProfiler.COST]
+
+    try:
+        gp = GluePromptOpt(
+            job[SweepLiterals.PROMPT_CONFIG_PATH],
+            job[SweepLiterals.SETUP_CONFIG_PATH],
+            job[SweepLiterals.TRAIN_FILE_NAME],
+            None,
+            dataset_processor_pkl_path=job[SweepLiterals.DATASET_PROCESSOR_PKL_PATH],
+            resume=sweep_config.resume,
+        )
+        best_prompt, _ = gp.get_best_prompt(
+            use_examples=sweep_config.use_examples,
+            run_without_train_examples=sweep_config.run_without_train_examples,
+            generate_synthetic_examples=sweep_config.generate_synthetic_examples,
+        )
+        add_usage()
+        row[SweepLiterals.BEST_PROMPT] = best_prompt
+        if job[SweepLiterals.TEST_FILE_NAME]:
+            row[SweepLiterals.ACCURACY] = gp.evaluate(job[SweepLiterals.TEST_FILE_NAME])
+            add_usage()
+    except Exception as e:
+        row[SweepLiterals.ERROR] = repr(e)
+    row[SweepLiterals.WALL_SEC] = time.time() - start_time
+    return row
+
+
+class SweepRunner:
+    """
+    Runs every prompt optimization config of a sweep with every combination of hyperparameters in its grid, spread
+    over a pool of processes. All processes share one rate budget per model deployment and one on-disk LLM response
+    cache, so that identical requests made by different runs reach the LLM only once. Accuracy, tokens & wall time
+    of all runs are written as one table.
+    """
+
+    def __init__(self, sweep_config_path: str):
+        """
+        :param sweep_config_path: Path to yaml file that defines the sweep
+        """
+        self.sweep_config = yaml_to_class(sweep_config_path, SweepConfig)
+        setup_config_dict = yaml_to_dict(self.sweep_config.setup_config_path)
+        self.sweep_dir = join(
+            setup_config_dict["dir_info"]["base_dir"], self.sweep_config.sweep_name
+        )
+        self.llm_config = None
+        if self.sweep_config.llm_config_path:
+            self.llm_config = yaml_to_class(self.sweep_config.llm_config_path, LLMConfig)
+
+    @staticmethod
+    def get_run_name(prompt_config_path: str, overrides: Dict) -> str:
+        run_name = splitext(basename(prompt_config_path))[0]
+        for param_name, value in overrides.items():
+            run_name += f"__{param_name}={value}"
+        return run_name
+
+    def get_datasets(self, prompt_config_entry: Union[str, Dict[str, str]]) -> Dict[str, str]:
+        """
+        :param prompt_config_entry: An entry of `prompt_config_paths` in sweep config
+        :return: Dict of path of prompt optimization config, train & test file and dataset processor of the entry
+        """
+        if isinstance(prompt_config_entry, str):
+            prompt_config_entry = {SweepLiterals.PROMPT_CONFIG_PATH: prompt_config_entry}
+        if SweepLiterals.PROMPT_CONFIG_PATH not in prompt_config_entry:
+            raise GlueValidaionException(
+                f"Entry {prompt_config_entry} of `prompt_config_paths` in sweep config has no "
+                f"`{SweepLiterals.PROMPT_CONFIG_PATH}`",
+                None,
+            )
+        datasets = {
+            SweepLiterals.PROMPT_CONFIG_PATH: prompt_config_entry[SweepLiterals.PROMPT_CONFIG_PATH],
+            SweepLiterals.TRAIN_FILE_NAME: self.sweep_config.train_file_name,
+            SweepLiterals.TEST_FILE_NAME: self.sweep_config.test_file_name,
+            SweepLiterals.DATASET_PROCESSOR_PKL_PATH: self.sweep_config.dataset_processor_pkl_path,
+        }
+        datasets.update(prompt_config_entry)
+        # Fail before any worker is spawned, rather than in every job
+        for key in (SweepLiterals.TRAIN_FILE_NAME, SweepLiterals.DATASET_PROCESSOR_PKL_PATH):
+            if not datasets[key] or not isfile(datasets[key]):
+                raise GlueValidaionException(
+                    f"`{key}` of {datasets[SweepLiterals.PROMPT_CONFIG_PATH]} in sweep config is not an existing "
+                    f"file: {datasets[key]}",
+                    None,
+                )
+        test_file_name = datasets[SweepLiterals.TEST_FILE_NAME]
+        if test_file_name and not isfile(test_file_name):
+            raise GlueValidaionException(
+                f"`{SweepLiterals.TEST_FILE_NAME}` of {datasets[SweepLiterals.PROMPT_CONFIG_PATH]} in sweep config "
+                f"is not an existing file: {test_file_name}",
+                None,
+            )
+        return datasets
+
+    def get_jobs(self) -> List[Dict]:
+        """
+        Write prompt optimization & setup config of every run in its own directory under directory of the sweep.
+
+        :return: List of jobs, one per (prompt optimization config, combination of values in grid)
+        """
+        grid = self.sweep_config.grid or {}
+        param_names = sorted(grid)
+        setup_config_dict = yaml_to_dict(self.sweep_config.setup_config_path)
+        jobs = []
+        for prompt_config_entry in self.sweep_config.prompt_config_paths:
+            datasets = self.get_datasets(prompt_config_entry)
+            prompt_config_path = datasets[SweepLiterals.PROMPT_CONFIG_PATH]
+            prompt_config_dict = yaml_to_dict(prompt_config_path)
+            missing_params = [name for name in param_names if name not in prompt_config_dict]
+            if missing_params:
+                raise GlueValidaionException(
+                    f"Hyperparameters {missing_params} in grid of sweep are not in {prompt_config_path}",
+                    None,
+                )
+            for values in itertools.product(*[grid[name] for name in param_names]):
+                overrides = dict(zip(param_names, values))
+                run_name = self.get_run_name(prompt_config_path, overrides)
+                run_dir = join(self.sweep_dir, run_name)
+                job = {
+                    SweepLiterals.RUN_NAME: run_name,
+                    SweepLiterals.PROMPT_CONFIG: prompt_config_path,
+                    SweepLiterals.OVERRIDES: overrides,
+                    SweepLiterals.PROMPT_CONFIG_PATH: join(run_dir, "promptopt_config.yaml"),
+                    SweepLiterals.SETUP_CONFIG_PATH: join(run_dir, "setup_config.yaml"),
+                    SweepLiterals.TRAIN_FILE_NAME: datasets[SweepLiterals.TRAIN_FILE_NAME],
+                    SweepLiterals.TEST_FILE_NAME: datasets[SweepLiterals.TEST_FILE_NAME],
+                    SweepLiterals.DATASET_PROCESSOR_PKL_PATH: datasets[SweepLiterals.DATASET_PROCESSOR_PKL_PATH],
+                }
+                dict_to_yaml(
+                    job[SweepLiterals.PROMPT_CONFIG_PATH], {**prompt_config_dict, **overrides}
+                )
+                # Logs & checkpoints of each run go to its own directory
+                dict_to_yaml(
+                    job[SweepLiterals.SETUP_CONFIG_PATH],
+                    {
+                        **setup_config_dict,
+                        "dir_info": {**setup_config_dict["dir_info"], "base_dir": self.sweep_dir},
+                        "experiment_name": run_name,
+                    },
+                )
+                jobs.append(job)
+        return jobs
+
+    def run(self) -> List[Dict]:
+        """
+        Run all jobs of the sweep, then write results as sweep_results.jsonl & sweep_results.txt in directory of
+        the sweep.
+
+        :return: Rows of results table, in the order of jobs
+        """
+        jobs = self.get_jobs()
+        # Checked once here, rather than in every worker after it has been spawned
+        LLMMgr.check_dependencies()
+        cache_path = self.sweep_config.llm_cache_path or join(
+            self.sweep_dir, SweepLiterals.CACHE_FILE_NAME
+        )
+        # Workers are spawned, not forked, as forked children would inherit the parent's threads & SQLite
+        # connections. Each worker runs a single job, so that class level state of one run doesn't leak into next.
+        mp_context = multiprocessing.get_context("spawn")
+        shared_states = {}
+        if self.llm_config:
+            shared_states = RateLimiterRegistry.create_shared_states(self.llm_config, mp_context)
+
+        logger.info(f"Running {len(jobs)} jobs of sweep {self.sweep_config.sweep_name}")
+        rows_by_run = {}
+        with mp_context.Pool(
+            processes=min(self.sweep_config.max_workers, len(jobs)),
+            initializer=init_sweep_worker,
+            initargs=(
+                self.llm_config,
+                shared_states,
+                cache_path,
+                self.sweep_config.llm_cache_max_size_mb,
+            ),
+            maxtasksperchild=1,
+        ) as pool:
+            results = pool.imap_unordered(partial(run_sweep_job, self.sweep_config), jobs)
+            for row in tqdm(results, total=len(jobs), desc="Sweep runs"):
+                rows_by_run[row[SweepLiterals.RUN_NAME]] = row
+                logger.info(f"Completed run {row[SweepLiterals.RUN_NAME]}: {row}")
+        rows = [rows_by_run[job[SweepLiterals.RUN_NAME]] for job in jobs]
+
+        save_jsonlist(join(self.sweep_dir, SweepLiterals.RESULTS_FILE_NAME + ".jsonl"), rows, mode="w")
+        table = self.format_results(rows)
+        with open(join(self.sweep_dir, SweepLiterals.RESULTS_FILE_NAME + ".txt"), "w") as fileobj:
+            fileobj.write(table + "\n")
+        logger.info(f"Results of sweep {self.sweep_config.sweep_name}:\n{table}")
+        return rows
+
+    def format_results(self, rows: List[Dict]) -> str:
+        """
+        :param rows: Rows returned by run_sweep_job()
+        :return: Results as a table, one row per run
+        """
+        columns = [SweepLiterals.PROMPT_CONFIG] + sorted(self.sweep_config.grid or {}) + [
+            SweepLiterals.ACCURACY,
+            SweepLiterals.PROMPT_TOKENS,
+            SweepLiterals.COMPLETION_TOKENS,
+            SweepLiterals.LLM_CALLS,
+            SweepLiterals.COST,
+            SweepLiterals.WALL_SEC,
+            SweepLiterals.ERROR,
+        ]
+
+        def format_cell(value):
+            if value is None:
+                return "-"
+            return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+        cells = [[format_cell(row.get(column)) for column in columns] for row in rows]
+        widths = [
+            max([len(column)] + [len(row_cells[i]) for row_cells in cells])
+            for i, column in enumerate(columns)
+        ]
+        lines = ["  ".join(column.ljust(width) for column, width in zip(columns, widths))]
+        for row_cells in cells:
+            lines.append("  ".join(cell.ljust(width) for cell, width in zip(row_cells, widths)))
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a hyperparameter sweep of prompt optimization")
+    parser.add_argument("--sweep_config_path", required=True)
+    args = parser.parse_args()
+
+    sweep_runner = SweepRunner(args.sweep_config_path)
+    rows = sweep_runner.run()
+    print(sweep_runner.format_results(rows))
@@ -33,6 +33,8 @@ class DatasetSpecificProcessing(ABC):
     ANSWER_START = "<ANS_START>"
     ANSWER_END = "<ANS_END>"
     ANSWER_DELIMITER_PATTERN = r"(?s)(?<=" + ANSWER_START + ")(.*?)(?=" + ANSWER_END + ")"
+    # Answer to n-th question of a mini-batch, between <ANS_START_n> and <ANS_END_n>. Matches (n, answer).
+    NUMBERED_ANSWER_DELIMITER_PATTERN = r"(?s)<ANS_START_(\d+)>(.*?)<ANS_END_\1>"
     INVALID_ANS = "[invalid]"
     FINAL_PROMPT = None
     
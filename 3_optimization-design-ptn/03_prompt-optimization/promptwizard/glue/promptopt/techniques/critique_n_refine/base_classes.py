@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 from ....common.base_classes import UniversalBaseClass
 from ...constants import PromptOptimizationParams, PromptPool
@@ -16,6 +16,7 @@ class CritiqueNRefinePromptPool(PromptPool):
     meta_positive_critique_template: str
     critique_refine_template: str
     solve_template: str
+    batch_solve_template: str
     examples_critique_template: str
     examples_optimization_template: str
     meta_sample_template: str
@@ -24,6 +25,7 @@ class CritiqueNRefinePromptPool(PromptPool):
     generate_reason_template: str
     reason_optimization_template: str
     examples_critique_template_zero_shot: str
+    examples_shard_template: str
 
 
 @dataclass
@@ -67,3 +69,35 @@ class CritiqueNRefineParams(PromptOptimizationParams, UniversalBaseClass):
     generate_intent_keywords: bool
     # number of synthetic training examples to be generated
     num_train_examples: int
+    # Max number of LLM calls to be made concurrently. 1 means candidates are scored one after another.
+    max_concurrency: int = 1
+    # Strategy for spending evaluation mini-batches among candidate prompts. One among fixed, successive_halving
+    # and ucb. See SelectionStrategies.
+    selection_strategy: str = "fixed"
+    # Total number of mini-batches per candidate prompt, that `ucb` selection strategy can spend.
+    eval_budget_per_candidate: int = 2
+    # Candidate prompts whose word bigrams overlap with an earlier candidate by at least this much (Jaccard
+    # similarity) are dropped before scoring. 1.0 drops only exact duplicates.
+    dedupe_similarity_threshold: float = 0.8
+    # Number of times refinement is requested again (with a reminder of the expected format), when LLM's output
+    # has no refined prompt between <START> and <END>. Prompt is skipped if output is malformed even then.
+    refine_format_retries: int = 1
+    # Phase of optimization (mutation, scoring, critique, refine, mine_examples, reasoning, expert_identity, eval)
+    # mapped to unique_model_id of the model its LLM calls are routed to, e.g. {"scoring": "gpt-4o-mini"}. Phases
+    # not in it use the deployment set in environment. See ModelRouter.
+    phase_models: Optional[dict] = None
+    # Budget of the whole run. When any of these is spent, current stage ends, later stages that call the LLM are
+    # skipped and final prompt is assembled from best state so far. None means no limit. See BudgetController.
+    max_tokens: Optional[int] = None
+    max_calls: Optional[int] = None
+    max_wall_sec: Optional[float] = None
+    # A stage ends early when its best score hasn't improved by more than `convergence_min_delta` for this many
+    # rounds, or as soon as best score reaches `target_score`. None means stages run all their rounds.
+    convergence_patience: Optional[int] = None
+    convergence_min_delta: float = 0.0
+    target_score: Optional[float] = None
+    # Synthetic training examples are generated in shards of at most this many examples, run concurrently. Rounds
+    # of shards are run for examples still missing (after dropping invalid & duplicate ones), up to
+    # `synthetic_max_rounds` rounds.
+    synthetic_shard_size: int = 25
+    synthetic_max_rounds: int = 3
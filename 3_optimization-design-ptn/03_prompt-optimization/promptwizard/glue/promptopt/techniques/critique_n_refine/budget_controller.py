@@ -0,0 +1,209 @@
+import time
+from typing import Dict, List, Optional
+
+from ....common.exceptions import GlueValidaionException
+from ....common.utils.profiler import PhaseProfiler
+
+
+class StopReasons:
+    """
+    Conditions on which BudgetController ends a stage of get_best_prompt() early.
+
+    MAX_TOKENS, MAX_CALLS, MAX_WALL_SEC: Budget of the run is spent. Current stage ends, and so do all later stages
+                                         that call the LLM. Final prompt is assembled from best state so far.
+    CONVERGED: Best score hasn't improved for `convergence_patience` rounds (or, in stages that don't score
+               prompts, rounds haven't changed instruction or examples). Only current stage ends.
+    TARGET_SCORE: Best score has reached `target_score`. Only current stage ends.
+    """
+
+    MAX_TOKENS = "max_tokens"
+    MAX_CALLS = "max_calls"
+    MAX_WALL_SEC = "max_wall_sec"
+    CONVERGED = "converged"
+    TARGET_SCORE = "target_score"
+
+
+class BudgetLiterals:
+    # Keys of usage & of stop events returned by BudgetController
+    CALLS = "calls"
+    TOKENS = "tokens"
+    WALL_SEC = "wall_sec"
+    STAGE = "stage"
+    ROUND = "round"
+    REASON = "reason"
+    USAGE = "usage"
+
+
+class BudgetController:
+    """
+    Decides when get_best_prompt() should stop spending LLM calls: when the run exceeds its budget of tokens, calls
+    or wall time, or when a stage has converged. Usage is read from PhaseProfiler, counting only calls that weren't
+    answered from response cache. Budget is checked between rounds, so a run overshoots it by at most one round.
+
+    Every stop is recorded as an event, with the stage, round & condition that fired.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = None,
+        max_calls: int = None,
+        max_wall_sec: float = None,
+        convergence_patience: int = None,
+        convergence_min_delta: float = 0.0,
+        target_score: float = None,
+    ):
+        """
+        :param max_tokens: Max prompt + completion tokens the run can spend. None means no limit.
+        :param max_calls: Max LLM calls the run can make. None means no limit.
+        :param max_wall_sec: Max wall time of the run in seconds. None means no limit.
+        :param convergence_patience: Number of rounds without improvement after which a stage ends. None means
+                                     stages always run all their rounds.
+        :param convergence_min_delta: Increase in best score that counts as an improvement is more than this
+        :param target_score: Stage ends as soon as best score reaches this. None means no target.
+        """
+        for name, value in (
+            ("max_tokens", max_tokens),
+            ("max_calls", max_calls),
+            ("max_wall_sec", max_wall_sec),
+            ("convergence_patience", convergence_patience),
+        ):
+            if value is not None and value <= 0:
+                raise GlueValidaionException(f"Value provided for `{name}` should be positive, got {value}", None)
+        self.max_tokens = max_tokens
+        self.max_calls = max_calls
+        self.max_wall_sec = max_wall_sec
+        self.convergence_patience = convergence_patience
+        self.convergence_min_delta = convergence_min_delta
+        self.target_score = target_score
+
+        self.events: List[Dict] = []
+        self.budget_stop_reason: Optional[str] = None
+        self._start_time = time.perf_counter()
+        self._start_usage = (0, 0)
+        self._stage = None
+        self._round = 0
+        self._best_score = None
+        self._rounds_without_improvement = 0
+
+    @classmethod
+    def from_params(cls, params) -> "BudgetController":
+        """
+        :param params: Object of CritiqueNRefineParams
+        """
+        return cls(
+            max_tokens=params.max_tokens,
+            max_calls=params.max_calls,
+            max_wall_sec=params.max_wall_sec,
+            convergence_patience=params.convergence_patience,
+            convergence_min_delta=params.convergence_min_delta,
+            target_score=params.target_score,
+        )
+
+    @staticmethod
+    def _get_profiler_usage():
+        total = PhaseProfiler.get_summary()[PhaseProfiler.TOTAL]
+        return (
+            total[PhaseProfiler.CALLS] - total[PhaseProfiler.CACHED_CALLS],
+            total[PhaseProfiler.PROMPT_TOKENS] + total[PhaseProfiler.COMPLETION_TOKENS],
+        )
+
+    def start(self) -> None:
+        """
+        Start counting usage of the run from now.
+        """
+        self._start_time = time.perf_counter()
+        self._start_usage = self._get_profiler_usage()
+        self.events = []
+        self.budget_stop_reason = None
+
+    def get_usage(self) -> Dict[str, float]:
+        """
+        :return: Dict of calls, tokens & wall time spent since start()
+        """
+        calls, tokens = self._get_profiler_usage()
+        return {
+            BudgetLiterals.CALLS: calls - self._start_usage[0],
+            BudgetLiterals.TOKENS: tokens - self._start_usage[1],
+            BudgetLiterals.WALL_SEC: time.perf_counter() - self._start_time,
+        }
+
+    def _record_event(self, reason: str) -> None:
+        self.events.append(
+            {
+                BudgetLiterals.STAGE: self._stage,
+                BudgetLiterals.ROUND: self._round,
+                BudgetLiterals.REASON: reason,
+                BudgetLiterals.USAGE: self.get_usage(),
+            }
+        )
+
+    @property
+    def is_budget_exhausted(self) -> bool:
+        return self.budget_stop_reason is not None
+
+    def start_stage(self, stage: str) -> None:
+        """
+        Start tracking convergence of a new stage.
+
+        :param stage: One of CritiqueNRefine.CheckpointLiterals.STAGES
+        """
+        self._stage = stage
+        self._round = 0
+        self._best_score = None
+        self._rounds_without_improvement = 0
+
+    def check_budget(self) -> bool:
+        """
+        :return: True if budget of the run is spent, and no more LLM calls should be made
+        """
+        if self.budget_stop_reason is not None:
+            return True
+        if not (self.max_tokens or self.max_calls or self.max_wall_sec):
+            return False
+        usage = self.get_usage()
+        for reason, limit, used in (
+            (StopReasons.MAX_TOKENS, self.max_tokens, usage[BudgetLiterals.TOKENS]),
+            (StopReasons.MAX_CALLS, self.max_calls, usage[BudgetLiterals.CALLS]),
+            (StopReasons.MAX_WALL_SEC, self.max_wall_sec, usage[BudgetLiterals.WALL_SEC]),
+        ):
+            if limit and used >= limit:
+                self.budget_stop_reason = reason
+                self._record_event(reason)
+                return True
+        return False
+
+    def record_score(self, score: float) -> bool:
+        """
+        Record best score after a round of current stage.
+
+        :return: True if stage should end, as it has converged or reached target score
+        """
+        self._round += 1
+        if self.target_score is not None and score >= self.target_score:
+            self._record_event(StopReasons.TARGET_SCORE)
+            return True
+        if self._best_score is None or score > self._best_score + self.convergence_min_delta:
+            self._best_score = score
+            self._rounds_without_improvement = 0
+            return False
+        self._best_score = max(self._best_score, score)
+        return self._has_converged()
+
+    def record_progress(self, made_progress: bool) -> bool:
+        """
+        Record whether a round of a stage that doesn't score prompts changed anything.
+
+        :return: True if stage should end, as it has converged
+        """
+        self._round += 1
+        if made_progress:
+            self._rounds_without_improvement = 0
+            return False
+        return self._has_converged()
+
+    def _has_converged(self) -> bool:
+        self._rounds_without_improvement += 1
+        if self.convergence_patience and self._rounds_without_improvement >= self.convergence_patience:
+            self._record_event(StopReasons.CONVERGED)
+            return True
+        return False
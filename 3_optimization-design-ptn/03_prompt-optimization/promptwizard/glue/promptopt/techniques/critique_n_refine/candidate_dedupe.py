@@ -0,0 +1,67 @@
+import re
+from typing import FrozenSet, List, Tuple
+
+# Word n-grams compared for near-duplicate detection
+SHINGLE_SIZE = 2
+
+
+def normalize_text(text: str) -> str:
+    """
+    :param text: Candidate prompt
+    :return: Lower cased text, without punctuation and with runs of whitespace collapsed to single space
+    """
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def get_shingles(normalized_text: str, shingle_size: int = SHINGLE_SIZE) -> FrozenSet[str]:
+    """
+    :param normalized_text: Text returned by normalize_text()
+    :param shingle_size: Number of consecutive words in a shingle
+    :return: Set of word n-grams in text. Text shorter than `shingle_size` words is a single shingle.
+    """
+    words = normalized_text.split()
+    if len(words) <= shingle_size:
+        return frozenset([normalized_text])
+    return frozenset(
+        " ".join(words[i : i + shingle_size])
+        for i in range(len(words) - shingle_size + 1)
+    )
+
+
+def jaccard_similarity(shingles_1: FrozenSet[str], shingles_2: FrozenSet[str]) -> float:
+    if not shingles_1 and not shingles_2:
+        return 1.0
+    return len(shingles_1 & shingles_2) / len(shingles_1 | shingles_2)
+
+
+def dedupe_candidates(
+    candidates: List[str], similarity_threshold: float = 0.8
+) -> Tuple[List[str], int]:
+    """
+    Remove candidate prompts that are same as an earlier candidate after normalize_text(), or whose word n-grams
+    overlap with those of an earlier candidate by at least `similarity_threshold` (Jaccard similarity). Every
+    candidate costs a full scoring pass in get_prompt_score(), while near-duplicates score nearly the same.
+
+    :param candidates: Candidate prompts, in order of preference
+    :param similarity_threshold: Candidates at least this similar to a kept candidate are removed. 1.0 removes
+                                 only exact duplicates.
+    :return: (Candidates kept in their original order, number of candidates removed)
+    """
+    kept = []
+    seen_texts = set()
+    kept_shingles = []
+    for candidate in candidates:
+        normalized = normalize_text(candidate)
+        if normalized in seen_texts:
+            continue
+        shingles = get_shingles(normalized)
+        if any(
+            jaccard_similarity(shingles, other) >= similarity_threshold
+            for other in kept_shingles
+        ):
+            continue
+        seen_texts.add(normalized)
+        kept_shingles.append(shingles)
+        kept.append(candidate)
+    return kept, len(candidates) - len(kept)
@@ -0,0 +1,176 @@
+import math
+import random
+from typing import Awaitable, Callable, List, Tuple
+
+from ....common.exceptions import GlueValidaionException
+from ....common.utils.concurrency import gather_with_concurrency
+
+
+class SelectionStrategies:
+    """
+    Values allowed for `selection_strategy` in CritiqueNRefineParams.
+
+    FIXED: Every candidate is evaluated on mini-batches until it gets one wrong, gets `min_correct_count` right or
+           `max_eval_batches` are exhausted.
+    SUCCESSIVE_HALVING: All candidates are evaluated on one mini-batch, the better half is evaluated on one more
+                        mini-batch and so on, until `top_n` candidates remain.
+    UCB: Mini-batches are spent one at a time on candidates with highest upper confidence bound, until
+         `eval_budget_per_candidate` mini-batches per candidate are used.
+    """
+
+    FIXED = "fixed"
+    SUCCESSIVE_HALVING = "successive_halving"
+    UCB = "ucb"
+
+    @classmethod
+    def all_values(cls) -> List[str]:
+        return [cls.FIXED, cls.SUCCESSIVE_HALVING, cls.UCB]
+
+    @classmethod
+    def validate(cls, strategy: str) -> None:
+        if strategy not in cls.all_values():
+            raise GlueValidaionException(
+                f"Value provided for `selection_strategy` is `{strategy}`. It should be one among "
+                f"{cls.all_values()}",
+                None,
+            )
+
+
+def wilson_interval(successes: int, trials: int, z: float = 1.96) -> Tuple[float, float]:
+    """
+    Wilson score interval for a binomial proportion. Unlike normal approximation, it stays within [0, 1] and is
+    meaningful for the handful of trials a candidate prompt gets.
+
+    :param successes: Number of mini-batches answered correctly
+    :param trials: Number of mini-batches evaluated
+    :param z: Quantile of standard normal distribution. 1.96 for 95% confidence.
+    :return: (lower bound, upper bound)
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p_hat = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p_hat + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p_hat * (1 - p_hat) / trials + z * z / (4 * trials * trials))
+    margin /= denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+class CandidateArm:
+    """
+    Evaluation state of one candidate prompt, when mini-batches are allocated adaptively. Each evaluation of a
+    mini-batch ("pull") either succeeds, when all questions in it are answered correctly, or fails.
+    """
+
+    def __init__(self, instruction: str, rng: random.Random):
+        """
+        :param instruction: Candidate prompt
+        :param rng: Random number generator used for sampling mini-batches for this candidate
+        """
+        self.instruction = instruction
+        self.rng = rng
+        self.pulls = 0
+        self.successes = 0
+        # Last mini-batch evaluated, or the last one that had wrongly answered questions.
+        self.dataset_subset = []
+        self.has_failed = False
+
+    @property
+    def mean(self) -> float:
+        return self.successes / self.pulls if self.pulls else 0.0
+
+    def record(self, dataset_subset: List, wrong_examples: List) -> None:
+        """
+        :param dataset_subset: Mini-batch that was evaluated
+        :param wrong_examples: Examples in mini-batch that were answered wrongly
+        """
+        self.pulls += 1
+        if wrong_examples:
+            self.dataset_subset = dataset_subset
+            self.has_failed = True
+        else:
+            self.successes += 1
+            # Keep the mini-batch that was got wrong, as it is more useful for critique
+            if not self.has_failed:
+                self.dataset_subset = dataset_subset
+
+    def get_prompt_score(self) -> List:
+        """
+        :return: [Prompt string, score, set of examples over which we evaluated, confidence interval of score]
+        """
+        return [
+            self.instruction,
+            self.mean,
+            self.dataset_subset,
+            wilson_interval(self.successes, self.pulls),
+        ]
+
+
+async def successive_halving(
+    arms: List[CandidateArm],
+    pull: Callable[[CandidateArm], Awaitable],
+    top_n: int,
+    max_pulls: int,
+    max_concurrency: int,
+) -> int:
+    """
+    Evaluate every surviving candidate on one more mini-batch per round, then drop the worse half of survivors.
+    Stop when `top_n` candidates survive or survivors have been evaluated on `max_pulls` mini-batches.
+
+    :param arms: Candidates
+    :param pull: Coroutine function that evaluates given candidate on a new mini-batch
+    :param top_n: Number of candidates that should survive
+    :param max_pulls: Max number of mini-batches a candidate can be evaluated on
+    :param max_concurrency: Max number of mini-batches evaluated concurrently
+    :return: Number of mini-batches evaluated
+    """
+    total_pulls = 0
+    survivors = list(arms)
+    for _ in range(max_pulls):
+        await gather_with_concurrency(max_concurrency, [pull(arm) for arm in survivors])
+        total_pulls += len(survivors)
+        if len(survivors) <= top_n:
+            break
+        # Ties are broken in favour of candidates that came first, so that result is deterministic
+        survivors = sorted(
+            survivors,
+            key=lambda arm: (arm.mean, wilson_interval(arm.successes, arm.pulls)[0]),
+            reverse=True,
+        )[: max(top_n, math.ceil(len(survivors) / 2))]
+    return total_pulls
+
+
+async def upper_confidence_bound(
+    arms: List[CandidateArm],
+    pull: Callable[[CandidateArm], Awaitable],
+    budget: int,
+    max_pulls: int,
+    max_concurrency: int,
+) -> int:
+    """
+    Evaluate every candidate on one mini-batch, then keep evaluating candidates with highest upper bound of Wilson
+    interval, till `budget` mini-batches are used. Up to `max_concurrency` distinct candidates are evaluated in
+    each step. Wilson bound shrinks much faster than UCB1's sqrt(2 ln(t) / n) term, which for the few mini-batches
+    we can afford per candidate, degenerates to round robin.
+
+    :param arms: Candidates
+    :param pull: Coroutine function that evaluates given candidate on a new mini-batch
+    :param budget: Total number of mini-batches to be evaluated, across all candidates
+    :param max_pulls: Max number of mini-batches a candidate can be evaluated on
+    :param max_concurrency: Max number of mini-batches evaluated concurrently
+    :return: Number of mini-batches evaluated
+    """
+    await gather_with_concurrency(max_concurrency, [pull(arm) for arm in arms])
+    total_pulls = len(arms)
+    while total_pulls < budget:
+        candidates = [arm for arm in arms if arm.pulls < max_pulls]
+        if not candidates:
+            break
+        candidates = sorted(
+            candidates,
+            key=lambda arm: wilson_interval(arm.successes, arm.pulls)[1],
+            reverse=True,
+        )[: min(max_concurrency, budget - total_pulls)]
+        await gather_with_concurrency(max_concurrency, [pull(arm) for arm in candidates])
+        total_pulls += len(candidates)
+    return total_pulls
@@ -1,18 +1,40 @@
+import asyncio
 import random
 import re
+import time
 from os.path import join
 from tqdm import tqdm
-from typing import Any, Dict, List
-import json
+from typing import Any, Dict, List, Optional
 
 from ....paramlogger import ParamLogger
 from ....paramlogger.constants import LogLiterals
 from ....common.base_classes import SetupConfig, UniversalBaseClass
 from ....common.llm.llm_mgr import LLMMgr
+from ....common.llm.rate_limiter import RateLimiterRegistry
+from ....common.utils.concurrency import (
+    gather_with_concurrency,
+    map_with_concurrency,
+    run_coroutine_sync,
+)
+from ....common.utils.profiler import PhaseProfiler
 from ....common.constants.log_strings import CommonLogsStr
+from ....common.constants.str_literals import ProfilerPhases
+from ...checkpoint import StageCheckpoint
 from ...constants import PromptOptimizationParams, SupportedPromptOpt
 from ...techniques.common_logic import DatasetSpecificProcessing, PromptOptimizer
 from ...techniques.critique_n_refine.base_classes import CritiqueNRefinePromptPool
+from ...techniques.critique_n_refine.budget_controller import BudgetController
+from ...techniques.critique_n_refine.candidate_dedupe import dedupe_candidates
+from ...techniques.critique_n_refine.candidate_selection import (
+    CandidateArm,
+    SelectionStrategies,
+    successive_halving,
+    upper_confidence_bound,
+    wilson_interval,
+)
+from ...techniques.critique_n_refine.evaluation_memo import EvaluationMemo
+from ...techniques.critique_n_refine.reasoning_cache import ReasoningCache, ReasoningStats
+from ...techniques.critique_n_refine.synthetic_examples import SyntheticExampleStore, split_into_shards
 
 
 def extract_between(start, end, text):
@@ -45,6 +67,10 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
     """
 
     TECHNIQUE_NAME = SupportedPromptOpt.CRITIQUE_N_REFINE.value
+    # Appended to refinement request, when it's retried as LLM's output wasn't in the expected format
+    REFINE_FORMAT_REMINDER = "\n\nWrap the refined prompt between <START> and <END> tags."
+    # Number of latest synthetic questions listed in each shard's prompt, as questions not to be repeated
+    SYNTHETIC_COVERED_QUESTIONS_COUNT = 10
 
     class GetPromptScoreIndex:
         """
@@ -55,6 +81,35 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         PROMPT_STR = 0
         SCORE = 1
         DATASET = 2
+        CONFIDENCE_INTERVAL = 3
+
+    class BatchSolveLiterals:
+        """
+        Keys of metrics of batched solve calls, see get_batch_solve_metrics()
+        """
+
+        QUESTIONS = "questions"
+        UNALIGNED = "unaligned"
+        FAILURE_RATE = "alignment_failure_rate"
+
+    class CheckpointLiterals:
+        """
+        Stages of get_best_prompt() in the order in which they run, and keys of the state saved in checkpoints.
+        """
+
+        MUTATE_REFINE = "mutate_refine"
+        MINE_EXAMPLES = "mine_examples"
+        REFINE_TASK_EG = "refine_task_eg"
+        GENERATE_REASONING = "generate_reasoning"
+        DONE = "done"
+        STAGES = [MUTATE_REFINE, MINE_EXAMPLES, REFINE_TASK_EG, GENERATE_REASONING, DONE]
+
+        BASE_INSTRUCTION = "base_instruction"
+        PROMPT_SCORE_LIST = "prompt_score_list"
+        EXAMPLES = "examples"
+        CHAINED_LOG = "chained_log"
+        FINAL_BEST_PROMPT = "final_best_prompt"
+        EXPERT_IDENTITY = "expert_identity"
 
     # This has to defined outside of constructor, so that it can be used as decorator.
     iolog = ParamLogger()
@@ -67,34 +122,74 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         prompt_pool: CritiqueNRefinePromptPool,
         data_processor: DatasetSpecificProcessing,
         logger,
+        resume: bool = False,
     ):
+        """
+        :param resume: When True, get_best_prompt() continues from the last checkpoint saved under `base_path`
+                       by an earlier run with same task, instruction and dataset.
+        """
         self.dataset = dataset
         self.setup_config = setup_config
         self.data_processor = data_processor
         self.logger = logger
         self.prompt_pool = prompt_pool
-        base_path = join(base_path, LogLiterals.DIR_NAME)
-        self.iolog.reset_eval_glue(base_path)
-
-    @iolog.log_io_params
-    def chat_completion(self, user_prompt: str, system_prompt: str = None):
+        self.base_path = base_path
+        self.resume = resume
+        self.evaluation_memo = EvaluationMemo()
+        # Number of duplicate candidate prompts, that were not scored
+        self.removed_candidates_count = 0
+        self.reasoning_cache = ReasoningCache()
+        # (event loop, limit, semaphore) returned by get_solve_semaphore()
+        self._solve_semaphore = None
+        self.batch_solve_counts = {
+            self.BatchSolveLiterals.QUESTIONS: 0,
+            self.BatchSolveLiterals.UNALIGNED: 0,
+        }
+        self.iolog.reset_eval_glue(join(base_path, LogLiterals.DIR_NAME))
+
+    def get_messages(self, user_prompt: str, system_prompt: str = None) -> List:
         """
-        Make a chat completion request to the OpenAI API.
+        Create list of messages in OpenAI chat format, for the given user & system prompt.
 
         :param user_prompt: Text spoken by user in a conversation.
         :param system_prompt: Text spoken by system in a conversation.
-        :return: Output of LLM
+        :return: List of messages
         """
         if not system_prompt:
             system_prompt = self.prompt_pool.system_prompt
 
-        messages = [
+        return [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt},
         ]
-        response = LLMMgr.chat_completion(messages)
+
+    @iolog.log_io_params
+    def chat_completion(self, user_prompt: str, system_prompt: str = None):
+        """
+        Make a chat completion request to the OpenAI API.
+
+        :param user_prompt: Text spoken by user in a conversation.
+        :param system_prompt: Text spoken by system in a conversation.
+        :return: Output of LLM
+        """
+        response = LLMMgr.chat_completion(self.get_messages(user_prompt, system_prompt))
+        return response
+
+    @iolog.log_io_params
+    async def achat_completion(self, user_prompt: str, system_prompt: str = None):
+        """
+        Asynchronous version of chat_completion().
+
+        :param user_prompt: Text spoken by user in a conversation.
+        :param system_prompt: Text spoken by system in a conversation.
+        :return: Output of LLM
+        """
+        response = await LLMMgr.achat_completion(
+            self.get_messages(user_prompt, system_prompt)
+        )
         return response
 
+    @PhaseProfiler.profile_phase(ProfilerPhases.MUTATION)
     @iolog.log_io_params
     def gen_different_styles(
         self,
@@ -102,6 +197,8 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         task_description: str,
         mutation_rounds: int = 2,
         thinking_styles_count: int = 10,
+        max_concurrency: int = 1,
+        similarity_threshold: float = 1.0,
     ) -> List:
         """
         Generate different variations of base_instruction by mixing thinking styles.
@@ -111,21 +208,95 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         :param mutation_rounds: Number of rounds of mutation to be performed when generating different styles.
         :param thinking_styles_count: Number of different thinking styles descriptions to be taken from the pool of
                                       thinking styles and given to LLM as reference (in context).
+        :param max_concurrency: Max number of mutation rounds run concurrently. Rounds are independent of each
+                                other, as each of them uses the same base instruction and thinking styles.
+        :param similarity_threshold: Generated prompts that are at least this similar to an earlier prompt are
+                                     dropped. See dedupe_candidates().
 
         :return: List of prompts generated in `mutation_rounds` rounds of mutation.
         """
+        if max_concurrency > 1:
+            return run_coroutine_sync(
+                self.agen_different_styles(
+                    base_instruction,
+                    task_description,
+                    mutation_rounds,
+                    thinking_styles_count,
+                    max_concurrency,
+                    similarity_threshold,
+                )
+            )
+
+        mutated_sample_prompt = self.get_mutated_sample_prompt(
+            base_instruction, task_description, thinking_styles_count
+        )
+        generated_mutated_prompts = [
+            self.chat_completion(mutated_sample_prompt) for _ in range(mutation_rounds)
+        ]
+        return self.collect_mutated_prompts(
+            base_instruction,
+            task_description,
+            mutated_sample_prompt,
+            generated_mutated_prompts,
+            similarity_threshold,
+        )
+
+    @PhaseProfiler.profile_phase(ProfilerPhases.MUTATION)
+    async def agen_different_styles(
+        self,
+        base_instruction: str,
+        task_description: str,
+        mutation_rounds: int = 2,
+        thinking_styles_count: int = 10,
+        max_concurrency: int = 1,
+        similarity_threshold: float = 1.0,
+    ) -> List:
+        """
+        Asynchronous version of gen_different_styles(). Mutation rounds are run concurrently, with at max
+        `max_concurrency` LLM calls in flight. Prompts are returned in the order of rounds.
+        """
+        mutated_sample_prompt = self.get_mutated_sample_prompt(
+            base_instruction, task_description, thinking_styles_count
+        )
+        generated_mutated_prompts = await gather_with_concurrency(
+            max_concurrency,
+            [self.achat_completion(mutated_sample_prompt) for _ in range(mutation_rounds)],
+        )
+        return self.collect_mutated_prompts(
+            base_instruction,
+            task_description,
+            mutated_sample_prompt,
+            generated_mutated_prompts,
+            similarity_threshold,
+        )
+
+    def get_mutated_sample_prompt(
+        self, base_instruction: str, task_description: str, thinking_styles_count: int
+    ) -> str:
+        return self.prompt_pool.meta_sample_template.format(
+            task_description=task_description,
+            meta_prompts="\n".join(
+                self.prompt_pool.thinking_styles[:thinking_styles_count]
+            ),
+            num_variations=thinking_styles_count,
+            prompt_instruction=base_instruction,
+        )
+
+    def collect_mutated_prompts(
+        self,
+        base_instruction: str,
+        task_description: str,
+        mutated_sample_prompt: str,
+        generated_mutated_prompts: List[str],
+        similarity_threshold: float,
+    ) -> List:
+        """
+        :param generated_mutated_prompts: Output of LLM, for each round of mutation
+        :return: Base instruction followed by the distinct prompts extracted from `generated_mutated_prompts`
+        """
         candidate_prompts = [task_description + "\n" + base_instruction]
 
-        for mutation_round in range(mutation_rounds):
-            mutated_sample_prompt = self.prompt_pool.meta_sample_template.format(
-                task_description=task_description,
-                meta_prompts="\n".join(
-                    self.prompt_pool.thinking_styles[:thinking_styles_count]
-                ),
-                num_variations=thinking_styles_count,
-                prompt_instruction=base_instruction,
-            )
-            generated_mutated_prompt = self.chat_completion(mutated_sample_prompt)
+        for mutation_round, generated_mutated_prompt in enumerate(generated_mutated_prompts):
             # Find all matches of the pattern in the text
             matches = re.findall(
                 DatasetSpecificProcessing.TEXT_DELIMITER_PATTERN_MUTATION,
@@ -138,12 +309,23 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
                 f"mutated_prompt_generation={generated_mutated_prompt}"
             )
 
+        candidate_prompts, removed_count = dedupe_candidates(
+            candidate_prompts, similarity_threshold
+        )
+        self.removed_candidates_count += removed_count
+        self.logger.info(
+            f"Removed {removed_count} duplicate candidate prompts, {len(candidate_prompts)} remaining"
+        )
         return candidate_prompts
 
     @iolog.log_io_params
     def critique_and_refine(
-        self, prompt: str, critique_example_set: List, further_enhance: bool = False
-    ) -> str:
+        self,
+        prompt: str,
+        critique_example_set: List,
+        further_enhance: bool = False,
+        format_retries: int = 0,
+    ) -> Optional[str]:
         """
         For the given prompt and examples, generate critique using LLM. Then using the generated critique, refine the prompt using LLM.
 
@@ -153,7 +335,79 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
                                 i.e. we try to further optimize already good prompt.
                                 False, if the initial prompt gave number of correct answers less than expected
                                 threshold. i.e. we try to improve poorly performing prompt.
-        :return: refined prompt
+        :param format_retries: Number of times refinement is requested again, when output of LLM has no refined
+                               prompt in expected format
+        :return: refined prompt. None if output of LLM wasn't in expected format even after retries.
+        """
+        meta_critique_prompt, example_string = self.get_critique_prompt(
+            prompt, critique_example_set, further_enhance
+        )
+        with PhaseProfiler.phase(ProfilerPhases.CRITIQUE):
+            critique_text = self.chat_completion(
+                meta_critique_prompt, self.prompt_pool.expert_profile
+            )
+        critique_refine_prompt = self.get_critique_refine_prompt(
+            prompt, example_string, critique_text
+        )
+
+        for attempt in range(format_retries + 1):
+            with PhaseProfiler.phase(ProfilerPhases.REFINE):
+                refined_prompts = self.chat_completion(
+                    self.get_refine_request(critique_refine_prompt, attempt),
+                    self.prompt_pool.expert_profile,
+                )
+            final_refined_prompt = self.extract_refined_prompt(refined_prompts)
+            if final_refined_prompt is not None:
+                break
+
+        self.log_critique_and_refine(
+            meta_critique_prompt, critique_text, critique_refine_prompt, final_refined_prompt
+        )
+        return final_refined_prompt
+
+    @iolog.log_io_params
+    async def acritique_and_refine(
+        self,
+        prompt: str,
+        critique_example_set: List,
+        further_enhance: bool = False,
+        format_retries: int = 0,
+    ) -> Optional[str]:
+        """
+        Asynchronous version of critique_and_refine(). Critique & refinement of a prompt are still made one after
+        another, as refinement needs the critique, but chains of many prompts can be awaited concurrently.
+        """
+        meta_critique_prompt, example_string = self.get_critique_prompt(
+            prompt, critique_example_set, further_enhance
+        )
+        with PhaseProfiler.phase(ProfilerPhases.CRITIQUE):
+            critique_text = await self.achat_completion(
+                meta_critique_prompt, self.prompt_pool.expert_profile
+            )
+        critique_refine_prompt = self.get_critique_refine_prompt(
+            prompt, example_string, critique_text
+        )
+
+        for attempt in range(format_retries + 1):
+            with PhaseProfiler.phase(ProfilerPhases.REFINE):
+                refined_prompts = await self.achat_completion(
+                    self.get_refine_request(critique_refine_prompt, attempt),
+                    self.prompt_pool.expert_profile,
+                )
+            final_refined_prompt = self.extract_refined_prompt(refined_prompts)
+            if final_refined_prompt is not None:
+                break
+
+        self.log_critique_and_refine(
+            meta_critique_prompt, critique_text, critique_refine_prompt, final_refined_prompt
+        )
+        return final_refined_prompt
+
+    def get_critique_prompt(
+        self, prompt: str, critique_example_set: List, further_enhance: bool
+    ) -> (str, str):
+        """
+        :return: (Prompt to get critique of `prompt` from LLM, examples collated as string)
         """
         example_string = self.data_processor.collate_to_str(
             critique_example_set, self.prompt_pool.quest_reason_ans
@@ -169,26 +423,41 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         meta_critique_prompt = meta_critique_prompt.format(
             instruction=prompt, examples=example_string
         )
+        return meta_critique_prompt, example_string
 
-        critique_text = self.chat_completion(
-            meta_critique_prompt, self.prompt_pool.expert_profile
-        )
-        critique_refine_prompt = self.prompt_pool.critique_refine_template.format(
+    def get_critique_refine_prompt(
+        self, prompt: str, example_string: str, critique_text: str
+    ) -> str:
+        return self.prompt_pool.critique_refine_template.format(
             instruction=prompt,
             examples=example_string,
             critique=critique_text,
             steps_per_sample=1,
         )
 
-        refined_prompts = self.chat_completion(
-            critique_refine_prompt, self.prompt_pool.expert_profile
-        )
+    def get_refine_request(self, critique_refine_prompt: str, attempt: int) -> str:
+        """
+        :param attempt: 0 for first request. Retries remind LLM of the expected format, which also makes them
+                        different requests, so that they are not answered with the same output from cache.
+        """
+        if attempt == 0:
+            return critique_refine_prompt
+        return critique_refine_prompt + self.REFINE_FORMAT_REMINDER
 
+    @staticmethod
+    def extract_refined_prompt(refined_prompts: str) -> Optional[str]:
+        """
+        :param refined_prompts: Output of LLM for the refinement request
+        :return: First refined prompt found between <START> and <END> tags, tolerating </START> or </END> in place
+                 of <END>. None if no such prompt is found.
+        """
         ### Ref: https://github.com/microsoft/PromptWizard/issues/34
         # refined_prompts = re.findall(DatasetSpecificProcessing.TEXT_DELIMITER_PATTERN, refined_prompts)
 
         MAGENTA = "\033[35m"
         RESET = "\033[0m"
+        if not isinstance(refined_prompts, str):
+            return None
         temp_refined_prompts = refined_prompts
         refined_prompts = re.findall(
             DatasetSpecificProcessing.TEXT_DELIMITER_PATTERN, refined_prompts
@@ -207,22 +476,29 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
             if refined_prompts:
                 print(f"{MAGENTA}THERE WERE </END> in there !!!!!{RESET}")
 
-        if refined_prompts:
-            final_refined_prompts = refined_prompts[0]
-        else:
-            raise ValueError(
-                "The LLM ouput is not in the expected format. Please rerun the code..."
-            )
+        return refined_prompts[0] if refined_prompts else None
 
+    def log_critique_and_refine(
+        self,
+        meta_critique_prompt: str,
+        critique_text: str,
+        critique_refine_prompt: str,
+        final_refined_prompt: Optional[str],
+    ) -> None:
+        if final_refined_prompt is None:
+            self.logger.warning(
+                f"Refined prompt received from LLM is not in the expected format, even after retries. "
+                f"Prompt is skipped.\nPrompt to get Refinement after critique, from LLM:\n {critique_refine_prompt}"
+            )
+            return
         self.logger.info(
             f"Prompt to get critique:\n {meta_critique_prompt}"
             f"critique received from LLM:\n {critique_text}"
             f"Prompt to get Refinement after critique, from LLM:\n {critique_refine_prompt}"
-            f"Refined prompts received from LLM:\n {final_refined_prompts}"
+            f"Refined prompts received from LLM:\n {final_refined_prompt}"
         )
 
-        return final_refined_prompts
-
+    @PhaseProfiler.profile_phase(ProfilerPhases.SCORING)
     @iolog.log_io_params
     def get_prompt_score(
         self, instructions: List[str], params: PromptOptimizationParams
@@ -231,85 +507,471 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         For each of the prompts in input, make LLM answer a set questions from dataset.
         Check if the answers are correct. Assign score to each prompt based on the number of batches of questions
         answered correctly. Once you get a prompt that gets all the questions right, you can stop the process.
+        When `params.max_concurrency` > 1, prompts are scored concurrently. How mini-batches are allocated among
+        prompts is decided by `params.selection_strategy`.
 
         :params instructions: Prompts using which we'll try to solve the task
         :params params: Object of PromptOptimizationParams class, that has hyperparameters related to prompt
         optimization technique in context.
         :return: A tuple with (Prompt string,
                                score corresponding to that prompt,
-                               set of examples over which we evaluated)
+                               set of examples over which we evaluated,
+                               95% confidence interval of score)
+        """
+        SelectionStrategies.validate(params.selection_strategy)
+        if (
+            params.max_concurrency > 1
+            or params.selection_strategy != SelectionStrategies.FIXED
+        ):
+            return run_coroutine_sync(self.aget_prompt_score(instructions, params))
+
+        prompt_score_list = [
+            self.score_instruction(instruction, rng, params)
+            for instruction, rng in zip(
+                instructions, self.get_candidate_rngs(len(instructions))
+            )
+        ]
+
+        self.logger.info(f"prompt_score_list {prompt_score_list}")
+        return prompt_score_list
+
+    @PhaseProfiler.profile_phase(ProfilerPhases.SCORING)
+    async def aget_prompt_score(
+        self, instructions: List[str], params: PromptOptimizationParams
+    ) -> List:
         """
-        prompt_score_list = []
+        Asynchronous version of get_prompt_score(). All prompts are scored concurrently, with at max
+        `params.max_concurrency` LLM calls in flight. For the same random seed, scores are same as that of
+        get_prompt_score() with `params.max_concurrency` = 1.
 
-        for instruction in instructions:
-            correct_count, count = 0, 0
-            critique_example_set = []
-            dataset_subset = random.sample(self.dataset, params.questions_batch_size)
-            questions_pool = [
-                example[DatasetSpecificProcessing.QUESTION_LITERAL]
-                for example in dataset_subset
-            ]
-            while (
-                not critique_example_set
-                and correct_count < params.min_correct_count
-                and count < params.max_eval_batches
-            ):
-                count += 1
-                solve_prompt = self.prompt_pool.solve_template.format(
-                    questions_batch_size=params.questions_batch_size,
-                    answer_format=params.answer_format,
-                    instruction=instruction,
-                    questions="\n".join(questions_pool),
+        :params instructions: Prompts using which we'll try to solve the task
+        :params params: Object of PromptOptimizationParams class, that has hyperparameters related to prompt
+        optimization technique in context.
+        :return: A tuple with (Prompt string,
+                               score corresponding to that prompt,
+                               set of examples over which we evaluated,
+                               95% confidence interval of score)
+        """
+        if params.selection_strategy != SelectionStrategies.FIXED:
+            return await self.aselect_candidates(instructions, params)
+
+        prompt_score_list = await gather_with_concurrency(
+            params.max_concurrency,
+            [
+                self.ascore_instruction(instruction, rng, params)
+                for instruction, rng in zip(
+                    instructions, self.get_candidate_rngs(len(instructions))
                 )
+            ],
+        )
 
-                generated_text = self.chat_completion(solve_prompt)
-                critique_example_set = self.evaluate(generated_text, dataset_subset)
-                if not critique_example_set:
-                    # If all the questions were answered correctly, then we need to get a new set of questions to answer
-                    dataset_subset = random.sample(
-                        self.dataset, params.questions_batch_size
-                    )
-                    questions_pool = [
-                        example[DatasetSpecificProcessing.QUESTION_LITERAL]
-                        for example in dataset_subset
-                    ]
-                    correct_count += 1
-                #
-                print("critique_example_set, correct_count")
-                print(critique_example_set, correct_count)
-            print("Loop completed")
-            prompt_score_list.append(
-                [instruction, correct_count / count, dataset_subset]
+        self.logger.info(f"prompt_score_list {prompt_score_list}")
+        return prompt_score_list
+
+    async def aselect_candidates(
+        self, instructions: List[str], params: PromptOptimizationParams
+    ) -> List:
+        """
+        Score prompts by spending mini-batches adaptively, as per `params.selection_strategy`. Mini-batches are
+        spent mostly on promising prompts, instead of giving every prompt the same budget.
+
+        :params instructions: Prompts using which we'll try to solve the task
+        :params params: Object of PromptOptimizationParams class
+        :return: Same as that of aget_prompt_score()
+        """
+        arms = [
+            CandidateArm(instruction, rng)
+            for instruction, rng in zip(
+                instructions, self.get_candidate_rngs(len(instructions))
             )
+        ]
 
-        self.logger.info(f"prompt_score_list {prompt_score_list}")
+        async def pull(arm: CandidateArm):
+            await self.aevaluate_mini_batch(arm, params)
+
+        if params.selection_strategy == SelectionStrategies.SUCCESSIVE_HALVING:
+            solve_calls = await successive_halving(
+                arms, pull, params.top_n, params.max_eval_batches, params.max_concurrency
+            )
+        else:
+            solve_calls = await upper_confidence_bound(
+                arms,
+                pull,
+                params.eval_budget_per_candidate * len(arms),
+                params.max_eval_batches,
+                params.max_concurrency,
+            )
+
+        prompt_score_list = [arm.get_prompt_score() for arm in arms]
+        self.logger.info(
+            f"selection_strategy={params.selection_strategy} solve_calls={solve_calls} "
+            f"prompt_score_list {prompt_score_list}"
+        )
         return prompt_score_list
 
+    async def aevaluate_mini_batch(
+        self, arm: CandidateArm, params: PromptOptimizationParams
+    ) -> None:
+        """
+        Make LLM answer a new mini-batch of questions using the prompt of `arm`, and record the outcome in `arm`.
+
+        :param arm: Object of CandidateArm
+        :param params: Object of PromptOptimizationParams class
+        """
+        dataset_subset = arm.rng.sample(self.dataset, params.questions_batch_size)
+        arm.record(
+            dataset_subset,
+            await self.asolve_and_evaluate(arm.instruction, dataset_subset, params),
+        )
+
+    def get_candidate_rngs(self, candidates_count: int) -> List[random.Random]:
+        """
+        Each candidate prompt draws its mini-batches of questions from its own random number generator. These are
+        seeded from global random state in the order of candidates, so that scores don't depend on the order in
+        which candidates get evaluated.
+
+        :param candidates_count: Number of candidate prompts
+        :return: List of random number generators, one per candidate
+        """
+        return [random.Random(random.getrandbits(64)) for _ in range(candidates_count)]
+
+    def score_instruction(
+        self, instruction: str, rng: random.Random, params: PromptOptimizationParams
+    ) -> List:
+        """
+        Make LLM answer mini-batches of questions using `instruction`, until it gets a mini-batch wrong,
+        gets `params.min_correct_count` mini-batches right or `params.max_eval_batches` are exhausted.
+
+        :param instruction: Prompt using which we'll try to solve the task
+        :param rng: Random number generator used for sampling questions
+        :param params: Object of PromptOptimizationParams class
+        :return: [Prompt string, score corresponding to that prompt, set of examples over which we evaluated,
+                  confidence interval of score]
+        """
+        correct_count, count = 0, 0
+        critique_example_set = []
+        dataset_subset = rng.sample(self.dataset, params.questions_batch_size)
+        while (
+            not critique_example_set
+            and correct_count < params.min_correct_count
+            and count < params.max_eval_batches
+        ):
+            count += 1
+            critique_example_set = self.solve_and_evaluate(
+                instruction, dataset_subset, params
+            )
+            if not critique_example_set:
+                # If all the questions were answered correctly, then we need to get a new set of questions to answer
+                dataset_subset = rng.sample(self.dataset, params.questions_batch_size)
+                correct_count += 1
+        return [
+            instruction,
+            correct_count / count,
+            dataset_subset,
+            wilson_interval(correct_count, count),
+        ]
+
+    async def ascore_instruction(
+        self, instruction: str, rng: random.Random, params: PromptOptimizationParams
+    ) -> List:
+        """
+        Asynchronous version of score_instruction().
+        """
+        correct_count, count = 0, 0
+        critique_example_set = []
+        dataset_subset = rng.sample(self.dataset, params.questions_batch_size)
+        while (
+            not critique_example_set
+            and correct_count < params.min_correct_count
+            and count < params.max_eval_batches
+        ):
+            count += 1
+            critique_example_set = await self.asolve_and_evaluate(
+                instruction, dataset_subset, params
+            )
+            if not critique_example_set:
+                dataset_subset = rng.sample(self.dataset, params.questions_batch_size)
+                correct_count += 1
+        return [
+            instruction,
+            correct_count / count,
+            dataset_subset,
+            wilson_interval(correct_count, count),
+        ]
+
+    def solve_and_evaluate(
+        self, instruction: str, dataset_subset: List, params: PromptOptimizationParams
+    ) -> List:
+        """
+        Make LLM answer the questions in `dataset_subset` using `instruction`, and return the ones answered wrongly.
+        Questions already judged for `instruction` are taken from evaluation memo and are not asked again. If all
+        of them were judged before, no LLM call is made. Rest of the questions are asked in a single LLM call, and
+        only those whose answer could not be found in its output are asked again, one per call.
+
+        :param instruction: Prompt using which we'll try to solve the task
+        :param dataset_subset: List of examples with question and ground truth.
+        :param params: Object of PromptOptimizationParams class
+        :return: List of examples that were wrongly answered.
+        """
+        judgements = self.get_memoized_judgements(instruction, dataset_subset)
+        pending = [ex for ex, judged in zip(dataset_subset, judgements) if judged is None]
+        if pending:
+            generated_text = self.chat_completion(
+                self.get_solve_prompt(instruction, pending, params)
+            )
+            llm_outputs = self.align_answers(generated_text, len(pending))
+            for i, llm_output in enumerate(llm_outputs):
+                if llm_output is None:
+                    llm_outputs[i] = self.chat_completion(
+                        self.get_solve_prompt(instruction, [pending[i]], params)
+                    )
+            self.memoize_judgements(instruction, dataset_subset, judgements, llm_outputs)
+        return [ex for ex, judged in zip(dataset_subset, judgements) if judged is False]
+
+    def get_solve_semaphore(self, limit: int) -> asyncio.Semaphore:
+        """
+        Semaphore shared by all solve calls of this object, so that candidates scored concurrently, along with the
+        questions each of them retries one by one, have at max `limit` LLM calls in flight. It's only held for the
+        duration of a single LLM call, hence callers holding a slot of their own (e.g. gather_with_concurrency()
+        over candidates) can't deadlock on it.
+
+        :param limit: Max number of solve calls in flight, usually `params.max_concurrency`
+        """
+        loop = asyncio.get_running_loop()
+        if self._solve_semaphore is None or self._solve_semaphore[:2] != (loop, limit):
+            self._solve_semaphore = (loop, limit, asyncio.Semaphore(max(1, limit)))
+        return self._solve_semaphore[2]
+
+    async def asolve_and_evaluate(
+        self, instruction: str, dataset_subset: List, params: PromptOptimizationParams
+    ) -> List:
+        """
+        Asynchronous version of solve_and_evaluate(). Questions whose answer could not be found in the output of
+        batched call, are asked concurrently.
+        """
+        judgements = self.get_memoized_judgements(instruction, dataset_subset)
+        pending = [ex for ex, judged in zip(dataset_subset, judgements) if judged is None]
+        if pending:
+            semaphore = self.get_solve_semaphore(params.max_concurrency)
+
+            async def asolve(examples: List) -> str:
+                async with semaphore:
+                    return await self.achat_completion(
+                        self.get_solve_prompt(instruction, examples, params)
+                    )
+
+            generated_text = await asolve(pending)
+            llm_outputs = self.align_answers(generated_text, len(pending))
+            unaligned_indices = [i for i, output in enumerate(llm_outputs) if output is None]
+            retried_outputs = await asyncio.gather(
+                *(asolve([pending[i]]) for i in unaligned_indices)
+            )
+            for i, llm_output in zip(unaligned_indices, retried_outputs):
+                llm_outputs[i] = llm_output
+            self.memoize_judgements(instruction, dataset_subset, judgements, llm_outputs)
+        return [ex for ex, judged in zip(dataset_subset, judgements) if judged is False]
+
+    def get_memoized_judgements(
+        self, instruction: str, dataset_subset: List
+    ) -> List[Optional[bool]]:
+        """
+        :param instruction: Prompt using which questions are solved
+        :param dataset_subset: List of examples with question and ground truth.
+        :return: For each example, True/False if it was answered correctly/wrongly earlier, None if not judged yet.
+        """
+        judgements = []
+        for example in dataset_subset:
+            entry = self.evaluation_memo.get(
+                instruction, example[DatasetSpecificProcessing.QUESTION_LITERAL]
+            )
+            judgements.append(None if entry is None else entry.is_correct)
+        return judgements
+
+    def memoize_judgements(
+        self,
+        instruction: str,
+        dataset_subset: List,
+        judgements: List[Optional[bool]],
+        llm_outputs: List[str],
+    ) -> None:
+        """
+        Judge answers in `llm_outputs` for examples whose judgement is None. Fill them in `judgements` and
+        save them in evaluation memo.
+
+        :param instruction: Prompt using which questions were solved
+        :param dataset_subset: List of examples with question and ground truth.
+        :param judgements: Output of get_memoized_judgements() for `dataset_subset`. Updated in place.
+        :param llm_outputs: Answer of LLM, for each of the examples whose judgement is None
+        """
+        pending_indices = [i for i, judged in enumerate(judgements) if judged is None]
+        for i, llm_output in zip(pending_indices, llm_outputs):
+            is_correct = self.judge_answers(llm_output, [dataset_subset[i]])[0]
+            judgements[i] = is_correct
+            if is_correct is not None:
+                self.evaluation_memo.put(
+                    instruction,
+                    dataset_subset[i][DatasetSpecificProcessing.QUESTION_LITERAL],
+                    is_correct,
+                    llm_output,
+                )
+
+    def get_solve_prompt(
+        self, instruction: str, dataset_subset: List, params: PromptOptimizationParams
+    ) -> str:
+        """
+        Create prompt that asks LLM to solve questions in `dataset_subset` following `instruction`. When there are
+        more than one questions, they are numbered and LLM is asked to wrap answer to n-th question between
+        <ANS_START_n> and <ANS_END_n> tags, so that answers can be aligned to questions.
+
+        :param instruction: Prompt using which we'll try to solve the task
+        :param dataset_subset: List of examples with question and ground truth.
+        :param params: Object of PromptOptimizationParams class
+        :return: Prompt string
+        """
+        questions_pool = [
+            example[DatasetSpecificProcessing.QUESTION_LITERAL]
+            for example in dataset_subset
+        ]
+        if len(questions_pool) == 1:
+            return self.prompt_pool.solve_template.format(
+                questions_batch_size=1,
+                answer_format=params.answer_format,
+                instruction=instruction,
+                questions=questions_pool[0],
+            )
+        return self.prompt_pool.batch_solve_template.format(
+            questions_batch_size=len(questions_pool),
+            answer_format=params.answer_format,
+            instruction=instruction,
+            questions="\n".join(
+                f"[Question {index}]: {question}"
+                for index, question in enumerate(questions_pool, start=1)
+            ),
+        )
+
+    def align_answers(self, generated_text: str, questions_count: int) -> List[Optional[str]]:
+        """
+        Split output of LLM for a mini-batch of questions into answers to individual questions. Answer to n-th
+        question is looked for between <ANS_START_n> and <ANS_END_n> tags. If LLM didn't number the tags, answers
+        between <ANS_START> and <ANS_END> tags are aligned in order, provided there is one per question.
+
+        :param generated_text: Output of LLM, that has answers for a mini-batch of questions
+        :param questions_count: Number of questions in mini-batch
+        :return: For each question, its answer wrapped between <ANS_START> and <ANS_END> tags. None if its answer
+                 could not be found. When `questions_count` is 1, `generated_text` itself is the answer.
+        """
+        if questions_count == 1:
+            return [generated_text]
+
+        numbered_answers = {}
+        for index, answer in re.findall(
+            DatasetSpecificProcessing.NUMBERED_ANSWER_DELIMITER_PATTERN, generated_text
+        ):
+            # If LLM repeats an answer, e.g. while summarizing, the last one is final
+            numbered_answers[int(index)] = answer
+        if numbered_answers:
+            answers = [numbered_answers.get(index) for index in range(1, questions_count + 1)]
+        else:
+            answers = re.findall(
+                DatasetSpecificProcessing.ANSWER_DELIMITER_PATTERN, generated_text
+            )
+            if len(answers) != questions_count:
+                answers = [None] * questions_count
+
+        unaligned_count = answers.count(None)
+        self.batch_solve_counts[self.BatchSolveLiterals.QUESTIONS] += questions_count
+        self.batch_solve_counts[self.BatchSolveLiterals.UNALIGNED] += unaligned_count
+        if unaligned_count:
+            self.logger.info(
+                f"Answers to {unaligned_count} of {questions_count} questions could not be found in LLM output"
+            )
+        return [
+            None
+            if answer is None
+            else DatasetSpecificProcessing.ANSWER_START + answer + DatasetSpecificProcessing.ANSWER_END
+            for answer in answers
+        ]
+
+    def get_batch_solve_metrics(self) -> Dict:
+        """
+        :return: Number of questions asked in batched solve calls, number of them whose answers could not be
+                 aligned and had to be asked again, and the ratio of the two.
+        """
+        questions = self.batch_solve_counts[self.BatchSolveLiterals.QUESTIONS]
+        unaligned = self.batch_solve_counts[self.BatchSolveLiterals.UNALIGNED]
+        return {
+            self.BatchSolveLiterals.QUESTIONS: questions,
+            self.BatchSolveLiterals.UNALIGNED: unaligned,
+            self.BatchSolveLiterals.FAILURE_RATE: unaligned / questions if questions else 0.0,
+        }
+
     @iolog.log_io_params
     def refine_prompts(
         self, prompt_score_list: List, params: PromptOptimizationParams
     ) -> List:
         """
         Further refine the prompts differently based on whether they got the subset of questions right or wrong.
+        When `params.max_concurrency` > 1, critique & refinement of all prompts are run concurrently.
 
         :param prompt_score_list: List of (prompt string, score for that prompt string,
         set of examples given in context)
         :param params: Object of class having hyperparameters for Prompt Optimization.
-        :return: List of prompts, which were refined over input prompts.
-        """
-        refined_prompts = []
-        for prompt, score, critique_example_set in prompt_score_list:
-            if score >= params.min_correct_count / params.max_eval_batches:
-                # if it's good enough prompt, how to mutate on that
-                refined_prompts.append(
-                    self.critique_and_refine(prompt, critique_example_set, True)
-                )
-            else:
-                # if it's not good enough prompt, how to mutate on that
-                refined_prompts.append(
-                    self.critique_and_refine(prompt, critique_example_set)
+        :return: List of prompts, which were refined over input prompts. Prompts whose refinement by LLM wasn't in
+                 the expected format are skipped.
+        """
+        if params.max_concurrency > 1:
+            return run_coroutine_sync(self.arefine_prompts(prompt_score_list, params))
+
+        refined_prompts = [
+            self.critique_and_refine(
+                prompt,
+                critique_example_set,
+                self.is_good_enough(score, params),
+                params.refine_format_retries,
+            )
+            for prompt, score, critique_example_set, *_ in prompt_score_list
+        ]
+        return self.collect_refined_prompts(refined_prompts)
+
+    async def arefine_prompts(
+        self, prompt_score_list: List, params: PromptOptimizationParams
+    ) -> List:
+        """
+        Asynchronous version of refine_prompts(). Critique -> refine chains of all prompts are run concurrently,
+        with at max `params.max_concurrency` LLM calls in flight. Refined prompts are returned in the order of
+        `prompt_score_list`.
+        """
+        refined_prompts = await gather_with_concurrency(
+            params.max_concurrency,
+            [
+                self.acritique_and_refine(
+                    prompt,
+                    critique_example_set,
+                    self.is_good_enough(score, params),
+                    params.refine_format_retries,
                 )
+                for prompt, score, critique_example_set, *_ in prompt_score_list
+            ],
+        )
+        return self.collect_refined_prompts(refined_prompts)
 
+    @staticmethod
+    def is_good_enough(score: float, params: PromptOptimizationParams) -> bool:
+        """
+        :return: True if prompt with `score` should be further enhanced, False if it should be improved upon
+        """
+        return score >= params.min_correct_count / params.max_eval_batches
+
+    def collect_refined_prompts(self, refined_prompts: List[Optional[str]]) -> List:
+        skipped_count = sum(refined_prompt is None for refined_prompt in refined_prompts)
+        if skipped_count:
+            self.logger.warning(
+                f"Skipped {skipped_count} of {len(refined_prompts)} prompts, as their refinement by LLM wasn't "
+                f"in the expected format"
+            )
+        refined_prompts = [
+            refined_prompt for refined_prompt in refined_prompts if refined_prompt is not None
+        ]
         self.logger.info(f"refined_prompts {refined_prompts}")
         return refined_prompts
 
@@ -324,56 +986,65 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         :param dataset_subset: List of examples with question and ground truth.
         :return: List of examples that were wrongly classified.
         """
-        # Find all matches of the pattern in the text
-        answer_matches = re.findall(
-            DatasetSpecificProcessing.ANSWER_DELIMITER_PATTERN, generated_text
-        )
-
-        # answer_matches = [self.chat_completion(FINAL_ANSWER_EXTRACTION_PROMPT.format(text=generated_text), "You are an AI assistant. Please follow the users requests.")]
-        answer_matches = [generated_text]
-        #
-        answers_len, dataset_len = len(answer_matches), len(dataset_subset)
-        if answers_len != dataset_len:
-            self.logger.info(
-                f"Answers extracted from LLM output={answers_len}, Questions asked to LLM {dataset_len}"
+        return [
+            example
+            for example, is_correct in zip(
+                dataset_subset, self.judge_answers(generated_text, dataset_subset)
             )
-            if answers_len > dataset_len:
-                # Select last `dataset_len` number of extractions as final.
-                answer_matches = answer_matches[-dataset_len:]
+            if is_correct is False
+        ]
 
-        wrong_examples = []
-        for i in range(min(answers_len, dataset_len)):
-            print("dataset_subset", dataset_subset)
-            actual_answer = dataset_subset[i][
-                DatasetSpecificProcessing.FINAL_ANSWER_LITERAL
-            ]
-            question = dataset_subset[i][DatasetSpecificProcessing.QUESTION_LITERAL]
+    def judge_answers(
+        self, generated_text: str, dataset_subset: List
+    ) -> List[Optional[bool]]:
+        """
+        Compare predicted answers with actual answers from the dataset.
+
+        :param generated_text: Output of LLM, that has answers for a mini-batch of questions
+                               (which were send in single go)
+        :param dataset_subset: List of examples with question and ground truth.
+        :return: For each example, True if answered correctly, False if answered wrongly and None if no answer
+                 could be found for it in `generated_text`.
+        """
+        judgements = []
+        for example, answer in zip(
+            dataset_subset, self.align_answers(generated_text, len(dataset_subset))
+        ):
+            if answer is None:
+                judgements.append(None)
+                continue
             is_correct, _ = self.data_processor.access_answer(
-                answer_matches[i], actual_answer
+                answer, example[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL]
             )
-            if not is_correct:
-                wrong_examples.append(dataset_subset[i])
-        #
-        return wrong_examples
+            judgements.append(bool(is_correct))
+        return judgements
 
     @iolog.log_io_params
-    def select_top_prompts(self, prompt_score_list: List, top_n: int) -> List:
+    def select_top_prompts(
+        self, prompt_score_list: List, top_n: int, rank_by_lower_bound: bool = False
+    ) -> List:
         """
         Sort prompts in prompt_score_list, based on its performance. And return max, top `top_n` prompts.
 
         :param prompt_score_list: List of (prompt string, score for that prompt string,
-        set of examples given in context)
+        set of examples given in context, confidence interval of score)
         :param top_n: Max number of prompts from the top of the list, that we need to return
+        :param rank_by_lower_bound: Rank prompts by lower bound of confidence interval of score, before score.
+                                    Needed when prompts were evaluated on different number of mini-batches, as a
+                                    score of 1/1 is less certain than a score of 3/4.
         :return: List of top `top_n` prompts.
         """
-        sorted_prompts = sorted(
-            prompt_score_list,
-            key=lambda x: [
+
+        def rank(x):
+            key = [
                 x[self.GetPromptScoreIndex.SCORE],
                 len(x[self.GetPromptScoreIndex.PROMPT_STR]),
-            ],
-            reverse=True,
-        )
+            ]
+            if rank_by_lower_bound:
+                key.insert(0, x[self.GetPromptScoreIndex.CONFIDENCE_INTERVAL][0])
+            return key
+
+        sorted_prompts = sorted(prompt_score_list, key=rank, reverse=True)
         sorted_top_n_prompts = sorted_prompts[:top_n]
         self.logger.debug(f"Sorted top n prompts:  {sorted_top_n_prompts}")
         return sorted_top_n_prompts
@@ -444,14 +1115,192 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         :return: Reasoning that went through for getting answer `answer` for question `question`
         """
 
-        prompt_template = self.prompt_pool.generate_reason_template.format(
+        prompt_template = self.get_reasoning_prompt(
+            task_description, instruction, question, answer
+        )
+        return self.chat_completion(user_prompt=prompt_template)
+
+    async def agenerate_reasoning(
+        self, task_description: str, instruction: str, question: str, answer: str
+    ) -> str:
+        """
+        Asynchronous version of generate_reasoning().
+        """
+        prompt_template = self.get_reasoning_prompt(
+            task_description, instruction, question, answer
+        )
+        return await self.achat_completion(user_prompt=prompt_template)
+
+    def get_reasoning_prompt(
+        self, task_description: str, instruction: str, question: str, answer: str
+    ) -> str:
+        return self.prompt_pool.generate_reason_template.format(
             task_description=task_description,
             instruction=instruction,
             question=question,
             answer=answer,
         )
-        return self.chat_completion(user_prompt=prompt_template)
 
+    def get_reasoning(self, example: Dict, params: PromptOptimizationParams) -> str:
+        """
+        Reasoning for the answer of `example`, taken from reasoning cache if it was generated earlier.
+
+        :param example: Example with question and ground truth
+        :param params: Object of PromptOptimizationParams class
+        :return: Reasoning for getting the answer of example
+        """
+        inputs = self.get_reasoning_inputs(example, params)
+        reason = self.reasoning_cache.get(ReasoningCache.get_key(*inputs))
+        if reason is not None:
+            self.record_reasoning_stats(inputs, reason, 0.0, True, params)
+            return reason
+
+        start_time = time.perf_counter()
+        reason = self.generate_reasoning(*inputs)
+        self.record_reasoning_stats(
+            inputs, reason, time.perf_counter() - start_time, False, params
+        )
+        return reason
+
+    async def aget_reasoning(self, example: Dict, params: PromptOptimizationParams) -> str:
+        """
+        Asynchronous version of get_reasoning().
+        """
+        inputs = self.get_reasoning_inputs(example, params)
+        reason = self.reasoning_cache.get(ReasoningCache.get_key(*inputs))
+        if reason is not None:
+            self.record_reasoning_stats(inputs, reason, 0.0, True, params)
+            return reason
+
+        start_time = time.perf_counter()
+        reason = await self.agenerate_reasoning(*inputs)
+        self.record_reasoning_stats(
+            inputs, reason, time.perf_counter() - start_time, False, params
+        )
+        return reason
+
+    def get_reasoning_inputs(self, example: Dict, params: PromptOptimizationParams) -> List[str]:
+        """
+        :return: [task description, instruction, question, answer] for which reasoning is to be generated
+        """
+        return [
+            params.task_description,
+            params.base_instruction,
+            example[DatasetSpecificProcessing.QUESTION_LITERAL],
+            example[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL],
+        ]
+
+    def record_reasoning_stats(
+        self,
+        inputs: List[str],
+        reason: str,
+        latency_sec: float,
+        is_cached: bool,
+        params: PromptOptimizationParams,
+    ) -> None:
+        """
+        Save newly generated reasoning in reasoning cache, and record the latency & tokens it took to generate it.
+        """
+        prompt_tokens, completion_tokens = 0, 0
+        if not is_cached:
+            self.reasoning_cache.put(ReasoningCache.get_key(*inputs), reason)
+            prompt_tokens = RateLimiterRegistry.count_tokens(
+                self.get_reasoning_prompt(*inputs), params.unique_model_id
+            )
+            completion_tokens = RateLimiterRegistry.count_tokens(
+                str(reason), params.unique_model_id
+            )
+        stats = ReasoningStats(
+            inputs[2], latency_sec, prompt_tokens, completion_tokens, is_cached
+        )
+        self.reasoning_cache.record(stats)
+        self.logger.info(f"Reasoning generated: {stats}")
+
+    @PhaseProfiler.profile_phase(ProfilerPhases.REASONING)
+    def generate_reasonings(
+        self,
+        examples: List,
+        start_index: int,
+        checkpoint: StageCheckpoint,
+        params: PromptOptimizationParams,
+    ) -> None:
+        """
+        Add reasoning to answers of `examples`, starting at `start_index`. A checkpoint is saved after every example.
+        When `params.max_concurrency` > 1, reasoning for examples is generated concurrently, see
+        agenerate_reasonings().
+
+        :param examples: Examples with question and ground truth. Updated in place.
+        :param start_index: Index of the first example in `examples`, that doesn't have reasoning yet
+        :param checkpoint: Object of StageCheckpoint
+        :param params: Object of PromptOptimizationParams class
+        """
+        if params.max_concurrency > 1:
+            run_coroutine_sync(
+                self.agenerate_reasonings(examples, start_index, checkpoint, params)
+            )
+        else:
+            for index in tqdm(
+                range(start_index, len(examples)),
+                initial=start_index,
+                total=len(examples),
+            ):
+                reason = self.get_reasoning(examples[index], params)
+                self.add_reasoning(examples, index, reason, checkpoint, params)
+        self.logger.info(f"Reasoning generation: {self.reasoning_cache.get_metrics()}")
+
+    @PhaseProfiler.profile_phase(ProfilerPhases.REASONING)
+    async def agenerate_reasonings(
+        self,
+        examples: List,
+        start_index: int,
+        checkpoint: StageCheckpoint,
+        params: PromptOptimizationParams,
+    ) -> None:
+        """
+        Asynchronous version of generate_reasonings(). Up to `params.max_concurrency` reasonings are generated at a
+        time. They are added to examples in order, so that a checkpoint always covers a prefix of `examples`.
+        """
+        progress_bar = tqdm(initial=start_index, total=len(examples))
+        index = start_index
+        try:
+            async for reason in map_with_concurrency(
+                params.max_concurrency,
+                lambda example: self.aget_reasoning(example, params),
+                examples[start_index:],
+            ):
+                self.add_reasoning(examples, index, reason, checkpoint, params)
+                index += 1
+                progress_bar.update(1)
+        finally:
+            progress_bar.close()
+
+    def add_reasoning(
+        self,
+        examples: List,
+        index: int,
+        reason: str,
+        checkpoint: StageCheckpoint,
+        params: PromptOptimizationParams,
+    ) -> None:
+        """
+        Prefix the answer of `index`-th example with `reason`, and save a checkpoint.
+        """
+        example = examples[index]
+        example[DatasetSpecificProcessing.ANSWER_WITH_REASON_LITERAL] = (
+            f"{reason} "
+            + f"{DatasetSpecificProcessing.ANSWER_START}"
+            + f"{example[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL]}"
+            + f"{DatasetSpecificProcessing.ANSWER_END}"
+        )
+        self.save_checkpoint(
+            checkpoint,
+            self.CheckpointLiterals.GENERATE_REASONING,
+            index + 1,
+            params.base_instruction,
+            **{self.CheckpointLiterals.EXAMPLES: examples},
+        )
+
+    @PhaseProfiler.profile_phase(ProfilerPhases.EXPERT_IDENTITY)
     @iolog.log_io_params
     def generate_expert_identity(self, task_description: str) -> str:
         """
@@ -500,9 +1349,10 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
             num_examples=params.few_shot_count,
         )
 
-        critique = self.chat_completion(
-            few_shot_critique_prompt, self.prompt_pool.expert_profile
-        )
+        with PhaseProfiler.phase(ProfilerPhases.CRITIQUE):
+            critique = self.chat_completion(
+                few_shot_critique_prompt, self.prompt_pool.expert_profile
+            )
 
         gt_eg = random.sample(self.dataset, 1)
         gt_eg_string = self.data_processor.collate_to_str(
@@ -516,33 +1366,40 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
             task_description=params.task_description,
             num_examples=params.few_shot_count,
         )
-        synthetic_examples = self.chat_completion(
-            few_shot_opt_prompt, self.prompt_pool.expert_profile
-        )
+        with PhaseProfiler.phase(ProfilerPhases.REFINE):
+            synthetic_examples = self.chat_completion(
+                few_shot_opt_prompt, self.prompt_pool.expert_profile
+            )
         synthetic_examples = self.extract_examples_frm_response(synthetic_examples)
 
         return synthetic_examples
 
     def generate_best_examples_zero_shot(
-        self, params: PromptOptimizationParams
+        self, params: PromptOptimizationParams, num_examples: int = None, shard_hint: str = ""
     ) -> List:
         """
         Generate best example to be give as few-shots for the given task.
 
         :param params: Object having hyperparameters for this prompt optimization technique.
+        :param num_examples: Number of examples to be requested. Defaults to `params.num_train_examples`.
+        :param shard_hint: Appended to critique prompt, to make a shard's examples differ from those of other shards
         :return: List of synthetic examples
         """
+        if num_examples is None:
+            num_examples = params.num_train_examples
         few_shot_critique_prompt = (
             self.prompt_pool.examples_critique_template_zero_shot.format(
                 prompt=params.base_instruction,
                 task_description=params.task_description,
-                num_examples=params.num_train_examples,
+                num_examples=num_examples,
             )
+            + shard_hint
         )
 
-        critique = self.chat_completion(
-            few_shot_critique_prompt, self.prompt_pool.expert_profile
-        )
+        with PhaseProfiler.phase(ProfilerPhases.CRITIQUE):
+            critique = self.chat_completion(
+                few_shot_critique_prompt, self.prompt_pool.expert_profile
+            )
 
         few_shot_opt_prompt = self.prompt_pool.examples_optimization_template.format(
             prompt=params.base_instruction,
@@ -550,14 +1407,142 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
             gt_example="",
             critique=critique,
             task_description=params.task_description,
-            num_examples=params.num_train_examples,
+            num_examples=num_examples,
         )
-        synthetic_examples = self.chat_completion(
-            few_shot_opt_prompt, self.prompt_pool.expert_profile
+        with PhaseProfiler.phase(ProfilerPhases.REFINE):
+            synthetic_examples = self.chat_completion(
+                few_shot_opt_prompt, self.prompt_pool.expert_profile
+            )
+        synthetic_examples = self.extract_examples_frm_response(synthetic_examples)
+        return synthetic_examples
+
+    async def agenerate_best_examples_zero_shot(
+        self, params: PromptOptimizationParams, num_examples: int = None, shard_hint: str = ""
+    ) -> List:
+        """
+        Asynchronous version of generate_best_examples_zero_shot().
+        """
+        if num_examples is None:
+            num_examples = params.num_train_examples
+        few_shot_critique_prompt = (
+            self.prompt_pool.examples_critique_template_zero_shot.format(
+                prompt=params.base_instruction,
+                task_description=params.task_description,
+                num_examples=num_examples,
+            )
+            + shard_hint
         )
+
+        with PhaseProfiler.phase(ProfilerPhases.CRITIQUE):
+            critique = await self.achat_completion(
+                few_shot_critique_prompt, self.prompt_pool.expert_profile
+            )
+
+        few_shot_opt_prompt = self.prompt_pool.examples_optimization_template.format(
+            prompt=params.base_instruction,
+            examples="",
+            gt_example="",
+            critique=critique,
+            task_description=params.task_description,
+            num_examples=num_examples,
+        )
+        with PhaseProfiler.phase(ProfilerPhases.REFINE):
+            synthetic_examples = await self.achat_completion(
+                few_shot_opt_prompt, self.prompt_pool.expert_profile
+            )
         synthetic_examples = self.extract_examples_frm_response(synthetic_examples)
         return synthetic_examples
 
+    def generate_synthetic_examples(
+        self, params: PromptOptimizationParams, budget: BudgetController = None
+    ) -> SyntheticExampleStore:
+        """
+        Generate `params.num_train_examples` synthetic training examples. Target count is split into shards of at
+        most `params.synthetic_shard_size` examples, each generated by its own critique & generation call, and up to
+        `params.max_concurrency` shards are generated at a time. Examples of every shard are validated, deduplicated
+        by question and appended to a file under experiment directory as soon as the shard completes (see
+        SyntheticExampleStore).
+
+        Shards often return fewer examples than requested, or duplicates of earlier ones. Then another round of
+        shards is run for the missing count, up to `params.synthetic_max_rounds` rounds. When object was created with
+        `resume=True`, examples saved by an earlier run are kept, and only the missing count is generated.
+
+        :param params: Object of PromptOptimizationParams class
+        :param budget: Object of BudgetController. No new round is started once its budget is spent.
+        :return: Object of SyntheticExampleStore, with all examples generated
+        """
+        store = SyntheticExampleStore(self.base_path)
+        store.load(self.resume)
+        for round_num in range(1, params.synthetic_max_rounds + 1):
+            if len(store) >= params.num_train_examples:
+                break
+            if budget is not None and budget.check_budget():
+                break
+            shard_sizes = split_into_shards(
+                params.num_train_examples - len(store), params.synthetic_shard_size
+            )
+            self.logger.info(
+                f"Synthetic examples round {round_num}: {len(store)}/{params.num_train_examples} generated, "
+                f"requesting {len(shard_sizes)} shards"
+            )
+            added_count = run_coroutine_sync(
+                self.agenerate_synthetic_shards(shard_sizes, store, params)
+            )
+            if added_count == 0:
+                break
+        self.logger.info(
+            f"Synthetic examples: {len(store)}/{params.num_train_examples} generated, {store.rejected_count} "
+            f"invalid or duplicate dropped. Saved at {store.file_path}"
+        )
+        return store
+
+    async def agenerate_synthetic_shards(
+        self,
+        shard_sizes: List[int],
+        store: SyntheticExampleStore,
+        params: PromptOptimizationParams,
+    ) -> int:
+        """
+        Generate shards of synthetic examples, up to `params.max_concurrency` at a time, and add each to `store` as
+        it completes. Shards still in flight are cancelled once `store` has `params.num_train_examples` examples.
+
+        Every call is deterministic, so shards are told apart by their number and by the questions `store` already
+        has (see `examples_shard_template`). Otherwise shards of the same size would all return the same examples.
+
+        :param shard_sizes: Number of examples to be requested in each shard
+        :return: Number of examples added to `store`
+        """
+        covered_questions = [
+            example[DatasetSpecificProcessing.QUESTION_LITERAL]
+            for example in store.examples[-self.SYNTHETIC_COVERED_QUESTIONS_COUNT :]
+        ]
+        shard_hints = [
+            self.prompt_pool.examples_shard_template.format(
+                shard_num=shard_num,
+                covered_questions="\n".join(covered_questions) or "None",
+            )
+            for shard_num in range(1, len(shard_sizes) + 1)
+        ]
+
+        added_count = 0
+        progress_bar = tqdm(initial=len(store), total=params.num_train_examples)
+        shards = map_with_concurrency(
+            params.max_concurrency,
+            lambda shard: self.agenerate_best_examples_zero_shot(params, *shard),
+            zip(shard_sizes, shard_hints),
+        )
+        try:
+            async for synthetic_examples in shards:
+                count = store.add(synthetic_examples, params.num_train_examples)
+                added_count += count
+                progress_bar.update(count)
+                if len(store) >= params.num_train_examples:
+                    break
+        finally:
+            await shards.aclose()
+            progress_bar.close()
+        return added_count
+
     @iolog.append_to_chained_log
     def get_best_instr_by_critique(
         self, examples: List, params: PromptOptimizationParams
@@ -584,16 +1569,18 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         meta_critique_prompt = self.prompt_pool.meta_critique_template.format(
             instruction=params.base_instruction, examples=example_string
         )
-        critique_text = self.chat_completion(
-            meta_critique_prompt, self.prompt_pool.expert_profile
-        )
+        with PhaseProfiler.phase(ProfilerPhases.CRITIQUE):
+            critique_text = self.chat_completion(
+                meta_critique_prompt, self.prompt_pool.expert_profile
+            )
         critique_refine_prompt = self.prompt_pool.critique_refine_template.format(
             instruction=params.base_instruction,
             examples=example_string,
             critique=critique_text,
             steps_per_sample=1,
         )
-        refined_prompts = self.chat_completion(critique_refine_prompt)
+        with PhaseProfiler.phase(ProfilerPhases.REFINE):
+            refined_prompts = self.chat_completion(critique_refine_prompt)
 
         if self.data_processor != None:
             refined_instructions = re.findall(
@@ -606,6 +1593,132 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
 
         return refined_instructions[0] if refined_instructions else None
 
+    def get_checkpoint(self, params: PromptOptimizationParams) -> StageCheckpoint:
+        """
+        Create checkpoint for get_best_prompt(), tied to all hyperparameters & dataset in use. If `self.resume` is
+        set, load the checkpoint saved by earlier run.
+
+        :param params: Object of class PromptOptimizationParams. Should be called before get_best_prompt() changes
+                       `params.base_instruction`.
+        :return: Object of StageCheckpoint
+        """
+        checkpoint = StageCheckpoint(
+            self.base_path,
+            self.TECHNIQUE_NAME,
+            self.CheckpointLiterals.STAGES,
+            StageCheckpoint.get_fingerprint(vars(params), self.dataset),
+        )
+        if self.resume:
+            checkpoint.load()
+        return checkpoint
+
+    def save_checkpoint(
+        self,
+        checkpoint: StageCheckpoint,
+        stage: str,
+        progress: int,
+        base_instruction: str,
+        **state,
+    ) -> None:
+        """
+        Save the state of get_best_prompt() along with current instruction and chained logs collected so far.
+
+        :param checkpoint: Object of StageCheckpoint
+        :param stage: One of the stages in CheckpointLiterals.STAGES
+        :param progress: Number of units of work (iterations, examples) completed in `stage`
+        :param base_instruction: Best instruction found so far
+        :param state: Other state to be saved e.g. examples
+        """
+        state[self.CheckpointLiterals.BASE_INSTRUCTION] = base_instruction
+        state[self.CheckpointLiterals.CHAINED_LOG] = self.iolog.CHAINED_LOG
+        checkpoint.save(stage, progress, state)
+
+    @PhaseProfiler.profile_phase(ProfilerPhases.MINE_EXAMPLES)
+    def mine_examples(
+        self,
+        examples: List,
+        start_index: int,
+        checkpoint: StageCheckpoint,
+        params: PromptOptimizationParams,
+    ) -> List:
+        """
+        Scan `self.dataset` in order, starting at `start_index`, for examples that `params.base_instruction` answers
+        wrongly, till there are `params.few_shot_count` of them. A checkpoint is saved after every example scanned.
+        When `params.max_concurrency` > 1, examples are solved speculatively ahead of the scan, see
+        amine_examples().
+
+        :param examples: Examples mined so far. Extended in place.
+        :param start_index: Index of the first example in `self.dataset` to be scanned
+        :param checkpoint: Object of StageCheckpoint
+        :param params: Object of PromptOptimizationParams class
+        :return: Mined examples
+        """
+        if params.max_concurrency > 1:
+            return run_coroutine_sync(
+                self.amine_examples(examples, start_index, checkpoint, params)
+            )
+
+        for index in range(start_index, len(self.dataset)):
+            if len(examples) >= params.few_shot_count:
+                break
+            # Questions already answered by this instruction while scoring it, come from evaluation memo
+            examples.extend(
+                self.solve_and_evaluate(
+                    params.base_instruction, [self.dataset[index]], params
+                )
+            )
+            self.save_checkpoint(
+                checkpoint,
+                self.CheckpointLiterals.MINE_EXAMPLES,
+                index + 1,
+                params.base_instruction,
+                **{self.CheckpointLiterals.EXAMPLES: examples},
+            )
+        return examples
+
+    @PhaseProfiler.profile_phase(ProfilerPhases.MINE_EXAMPLES)
+    async def amine_examples(
+        self,
+        examples: List,
+        start_index: int,
+        checkpoint: StageCheckpoint,
+        params: PromptOptimizationParams,
+    ) -> List:
+        """
+        Asynchronous version of mine_examples(). Up to `params.max_concurrency` examples ahead of the scan are solved
+        concurrently, but their outcomes are consumed in dataset order, so the examples mined are the same as those
+        of a serial scan. Once enough examples are mined, solves still in flight are cancelled.
+        """
+        if len(examples) >= params.few_shot_count:
+            return examples
+
+        results = map_with_concurrency(
+            params.max_concurrency,
+            lambda example: self.asolve_and_evaluate(
+                params.base_instruction, [example], params
+            ),
+            (self.dataset[index] for index in range(start_index, len(self.dataset))),
+        )
+        index = start_index
+        try:
+            async for wrong_examples in results:
+                examples.extend(wrong_examples)
+                index += 1
+                self.save_checkpoint(
+                    checkpoint,
+                    self.CheckpointLiterals.MINE_EXAMPLES,
+                    index,
+                    params.base_instruction,
+                    **{self.CheckpointLiterals.EXAMPLES: examples},
+                )
+                if len(examples) >= params.few_shot_count:
+                    break
+        finally:
+            # Cancels solves that were started ahead of the scan
+            await results.aclose()
+        self.logger.info(f"Mined {len(examples)} examples from first {index} examples in dataset")
+        return examples
+
     def get_best_prompt(
         self,
         params: PromptOptimizationParams,
@@ -616,19 +1729,46 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
         """
         Perform `params.max_iterations` iterations for optimizing your prompt. And return the best prompt found so far.
 
+        A checkpoint is saved after every iteration/example of each stage. When object was created with
+        `resume=True`, completed work is skipped and run continues from the last checkpoint.
+
+        Iterative stages end early when they converge, and the whole run ends early when its budget of tokens, calls
+        or wall time is spent (see BudgetController). Final prompt is still assembled from best state so far.
+
         :params: Object of class PromptOptimizationParams, that has all hyper-parameters needed for prompt optimization.
         :return: Best prompt for the given task and dataset.
         """
-
+        cp_literals = self.CheckpointLiterals
         current_base_instruction = params.base_instruction
+        budget = BudgetController.from_params(params)
+        budget.start()
 
         if not generate_synthetic_examples:
+            checkpoint = self.get_checkpoint(params)
+            saved_state = checkpoint.get_state()
+            if saved_state:
+                current_base_instruction = saved_state[cp_literals.BASE_INSTRUCTION]
+                self.iolog.CHAINED_LOG = saved_state[cp_literals.CHAINED_LOG]
+            if checkpoint.get_progress(cp_literals.DONE):
+                return (
+                    saved_state[cp_literals.FINAL_BEST_PROMPT],
+                    saved_state[cp_literals.EXPERT_IDENTITY],
+                )
+
             print("\nMutating Task Description....")
+            completed_rounds = params.mutate_refine_iterations
+            if not checkpoint.is_completed(cp_literals.MUTATE_REFINE):
+                completed_rounds = checkpoint.get_progress(cp_literals.MUTATE_REFINE)
             # Mutate and refine task description
+            budget.start_stage(cp_literals.MUTATE_REFINE)
             for round_num in tqdm(
-                range(1, params.mutate_refine_iterations + 1),
+                range(completed_rounds + 1, params.mutate_refine_iterations + 1),
                 desc="Iterations completed: ",
+                initial=completed_rounds,
+                total=params.mutate_refine_iterations,
             ):
+                if budget.check_budget():
+                    break
                 self.logger.info(
                     f"{CommonLogsStr.LOG_SEPERATOR} + Starting iteration: {round_num} \n "
                     f"current_base_instruction: {current_base_instruction}"
@@ -638,6 +1778,8 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
                     params.task_description,
                     params.mutation_rounds + 1,
                     params.style_variation,
+                    params.max_concurrency,
+                    params.dedupe_similarity_threshold,
                 )
 
                 if run_without_train_examples:
@@ -675,9 +1817,12 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
                         )
                         prompt_index += 1
                     return "", ""
+                rank_by_lower_bound = (
+                    params.selection_strategy != SelectionStrategies.FIXED
+                )
                 prompt_score_list = self.get_prompt_score(candidate_prompts, params)
                 prompt_score_list = self.select_top_prompts(
-                    prompt_score_list, params.top_n
+                    prompt_score_list, params.top_n, rank_by_lower_bound
                 )
 
                 if params.refine_instruction:
@@ -686,44 +1831,72 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
                         refined_prompts, params
                     )
                     prompt_score_list = self.select_top_prompts(
-                        refined_prompt_score_list + prompt_score_list, params.top_n
+                        refined_prompt_score_list + prompt_score_list,
+                        params.top_n,
+                        rank_by_lower_bound,
                     )
 
                 current_base_instruction = prompt_score_list[0][
                     self.GetPromptScoreIndex.PROMPT_STR
                 ]
+                correct_count, judged_count = self.evaluation_memo.get_running_accuracy(
+                    current_base_instruction
+                )
                 self.iolog.append_dict_to_chained_logs(
                     {
                         "round_num": round_num,
                         "best_prompt": current_base_instruction,
                         "score": prompt_score_list[0][self.GetPromptScoreIndex.SCORE],
+                        "confidence_interval": prompt_score_list[0][
+                            self.GetPromptScoreIndex.CONFIDENCE_INTERVAL
+                        ],
+                        "running_accuracy": f"{correct_count}/{judged_count}",
                     }
                 )
-
-            examples = []
-
-            params.base_instruction = current_base_instruction
-            for example in self.dataset:
-                solve_prompt = self.prompt_pool.solve_template.format(
-                    questions_batch_size=1,
-                    instruction=params.base_instruction,
-                    answer_format=params.answer_format,
-                    questions=example[DatasetSpecificProcessing.QUESTION_LITERAL],
+                self.save_checkpoint(
+                    checkpoint,
+                    cp_literals.MUTATE_REFINE,
+                    round_num,
+                    current_base_instruction,
+                    **{cp_literals.PROMPT_SCORE_LIST: prompt_score_list},
                 )
-                generated_text = self.chat_completion(solve_prompt)
-
-                examples.extend(self.evaluate(generated_text, [example]))
-                if len(examples) >= params.few_shot_count:
+                if budget.record_score(prompt_score_list[0][self.GetPromptScoreIndex.SCORE]):
                     break
 
-            if len(examples) < params.few_shot_count:
-                examples = random.sample(
-                    self.dataset, params.few_shot_count - len(examples)
+            examples = saved_state.get(cp_literals.EXAMPLES, [])
+
+            params.base_instruction = current_base_instruction
+            if not checkpoint.is_completed(cp_literals.MINE_EXAMPLES):
+                if not budget.check_budget():
+                    mined_count = checkpoint.get_progress(cp_literals.MINE_EXAMPLES)
+                    examples = self.mine_examples(examples, mined_count, checkpoint, params)
+
+                if len(examples) < params.few_shot_count:
+                    examples = random.sample(
+                        self.dataset, params.few_shot_count - len(examples)
+                    )
+                self.save_checkpoint(
+                    checkpoint,
+                    cp_literals.REFINE_TASK_EG,
+                    0,
+                    params.base_instruction,
+                    **{cp_literals.EXAMPLES: examples},
                 )
 
             # Refine task description and examples iteratively
             print("\nRefining Task description and Examples iteratively....")
-            for i in tqdm(range(params.refine_task_eg_iterations)):
+            completed_iterations = params.refine_task_eg_iterations
+            if not checkpoint.is_completed(cp_literals.REFINE_TASK_EG):
+                completed_iterations = checkpoint.get_progress(cp_literals.REFINE_TASK_EG)
+            budget.start_stage(cp_literals.REFINE_TASK_EG)
+            for i in tqdm(
+                range(completed_iterations, params.refine_task_eg_iterations),
+                initial=completed_iterations,
+                total=params.refine_task_eg_iterations,
+            ):
+                if budget.check_budget():
+                    break
+                instruction_before, examples_before = params.base_instruction, examples
                 refine_task_desc = random.choice([True, False])
                 if refine_task_desc:
                     refined_instruction = self.get_best_instr_by_critique(
@@ -734,33 +1907,33 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
                 # comment this to turn off synthetic examples
                 elif use_examples:
                     examples = self.generate_best_examples(examples, params)
+                self.save_checkpoint(
+                    checkpoint,
+                    cp_literals.REFINE_TASK_EG,
+                    i + 1,
+                    params.base_instruction,
+                    **{cp_literals.EXAMPLES: examples},
+                )
+                made_progress = (
+                    params.base_instruction != instruction_before
+                    or examples != examples_before
+                )
+                if budget.record_progress(made_progress):
+                    break
         else:
             print("Generating Sythetic Examples....")
-            train_examples = self.generate_best_examples_zero_shot(params)
-            with open("train_synthetic.jsonl", "w") as file:
-                for record in train_examples:
-                    json.dump(record, file)
-                    file.write("\n")
-
-            print("Synthetic examples saved at train.jsonl....")
+            store = self.generate_synthetic_examples(params, budget)
+            print(f"Synthetic examples saved at {store.file_path}....")
             return "", ""
 
-        if params.generate_reasoning:
+        if params.generate_reasoning and not budget.check_budget():
             print("\nGenerating CoT Reasoning for In-Context Examples....")
-            for example in tqdm(examples):
-                reason = self.generate_reasoning(
-                    params.task_description,
-                    params.base_instruction,
-                    example[DatasetSpecificProcessing.QUESTION_LITERAL],
-                    example[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL],
-                )
-
-                example[DatasetSpecificProcessing.ANSWER_WITH_REASON_LITERAL] = (
-                    f"{reason} "
-                    + f"{DatasetSpecificProcessing.ANSWER_START}"
-                    + f"{example[DatasetSpecificProcessing.FINAL_ANSWER_LITERAL]}"
-                    + f"{DatasetSpecificProcessing.ANSWER_END}"
+            completed_examples = len(examples)
+            if not checkpoint.is_completed(cp_literals.GENERATE_REASONING):
+                completed_examples = checkpoint.get_progress(
+                    cp_literals.GENERATE_REASONING
                 )
+            self.generate_reasonings(examples, completed_examples, checkpoint, params)
         if self.data_processor != None:
             example_string = self.data_processor.collate_to_str(
                 examples, self.prompt_pool.quest_reason_ans
@@ -793,12 +1966,12 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
             )
 
         expert_identity = self.prompt_pool.system_prompt
-        if params.generate_expert_identity:
+        if params.generate_expert_identity and not budget.check_budget():
             print("\nGenerating Expert Identity....")
             expert_identity = self.generate_expert_identity(params.task_description)
             self.logger.info(f"Expert Identity: {expert_identity}")
 
-        if params.generate_intent_keywords:
+        if params.generate_intent_keywords and not budget.check_budget():
             print("\nGenerating Intent Keywords....")
             intent_keywords = self.generate_intent_keywords(
                 params.task_description, params.base_instruction
@@ -806,6 +1979,24 @@ class CritiqueNRefine(PromptOptimizer, UniversalBaseClass):
 
             final_best_prompt += "Keywords: " + intent_keywords
 
+        self.save_checkpoint(
+            checkpoint,
+            cp_literals.DONE,
+            1,
+            params.base_instruction,
+            **{
+                cp_literals.EXAMPLES: examples,
+                cp_literals.FINAL_BEST_PROMPT: final_best_prompt,
+                cp_literals.EXPERT_IDENTITY: expert_identity,
+            },
+        )
+        self.logger.info(f"Evaluation memo: {self.evaluation_memo.get_metrics()}")
+        self.logger.info(f"Duplicate candidate prompts removed: {self.removed_candidates_count}")
+        self.logger.info(f"Batched solve: {self.get_batch_solve_metrics()}")
+        for stop_event in budget.events:
+            self.logger.info(f"Stopped early: {stop_event}")
+            self.iolog.append_dict_to_chained_logs({"stopped_early": stop_event})
+        self.logger.info(f"Budget used: {budget.get_usage()}")
         self.iolog.dump_chained_log_to_file("best_prompt")
         self.logger.info(f"Final best prompt: {final_best_prompt}")
 
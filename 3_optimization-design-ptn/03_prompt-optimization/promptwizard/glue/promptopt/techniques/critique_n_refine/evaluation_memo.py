@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+
+
+class MemoEntry(NamedTuple):
+    is_correct: bool
+    llm_output: str
+
+
+class EvaluationMemo:
+    """
+    Remembers whether LLM answered a question correctly, when asked using a given instruction. Solve prompts are
+    deterministic for given (instruction, question), hence the judgement can be reused whenever the same prompt is
+    scored again on the same question, instead of paying for another LLM call.
+
+    Number of questions judged and answered correctly are kept per instruction as running counts, which keep
+    growing as the instruction gets evaluated over iterations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], MemoEntry] = {}
+        # key=instruction hash, value=[correct count, judged count]
+        self._counts: Dict[str, list] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, instruction: str, question: str) -> Optional[MemoEntry]:
+        """
+        :param instruction: Instruction used in solve prompt
+        :param question: Question asked in solve prompt
+        :return: Earlier judgement, None if question wasn't judged for this instruction
+        """
+        key = (self.get_hash(instruction), self.get_hash(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, instruction: str, question: str, is_correct: bool, llm_output: str) -> None:
+        """
+        :param instruction: Instruction used in solve prompt
+        :param question: Question asked in solve prompt
+        :param is_correct: True if LLM answered the question correctly
+        :param llm_output: Raw output of LLM
+        """
+        instruction_hash = self.get_hash(instruction)
+        key = (instruction_hash, self.get_hash(question))
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = MemoEntry(bool(is_correct), llm_output)
+            counts = self._counts.setdefault(instruction_hash, [0, 0])
+            counts[0] += int(bool(is_correct))
+            counts[1] += 1
+
+    def get_running_accuracy(self, instruction: str) -> Tuple[int, int]:
+        """
+        :param instruction: Instruction used in solve prompts
+        :return: (Number of questions answered correctly, number of questions judged) so far, using `instruction`
+        """
+        with self._lock:
+            correct_count, judged_count = self._counts.get(
+                self.get_hash(instruction), (0, 0)
+            )
+            return correct_count, judged_count
+
+    def get_metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "instructions": len(self._counts),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
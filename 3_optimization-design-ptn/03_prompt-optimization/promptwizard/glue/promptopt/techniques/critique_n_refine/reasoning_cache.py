@@ -0,0 +1,68 @@
+import hashlib
+import json
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+
+class ReasoningStats(NamedTuple):
+    """
+    Cost of generating reasoning for one example. Token counts are computed with the tokenizer of the model, and
+    are 0 when reasoning was taken from cache.
+    """
+
+    question: str
+    latency_sec: float
+    prompt_tokens: int
+    completion_tokens: int
+    is_cached: bool
+
+
+class ReasoningCache:
+    """
+    Remembers the reasoning generated for (task description, instruction, question, answer), so that it isn't
+    generated again for an example that is seen again, e.g. when the same example is mined in a later run of
+    get_best_prompt() on the same object. Also collects ReasoningStats of every example.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reasons: Dict[str, str] = {}
+        self.stats: List[ReasoningStats] = []
+
+    @staticmethod
+    def get_key(task_description: str, instruction: str, question: str, answer: str) -> str:
+        payload = json.dumps(
+            [task_description, instruction, question, answer], ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        :param key: Value returned by get_key()
+        :return: Reasoning generated earlier, None if there is none
+        """
+        with self._lock:
+            return self._reasons.get(key)
+
+    def put(self, key: str, reason: str) -> None:
+        with self._lock:
+            self._reasons[key] = reason
+
+    def record(self, stats: ReasoningStats) -> None:
+        with self._lock:
+            self.stats.append(stats)
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        :return: Totals over all examples for which reasoning was asked for
+        """
+        with self._lock:
+            generated = [s for s in self.stats if not s.is_cached]
+            return {
+                "examples": len(self.stats),
+                "cached": len(self.stats) - len(generated),
+                "latency_sec": sum(s.latency_sec for s in generated),
+                "max_latency_sec": max((s.latency_sec for s in generated), default=0.0),
+                "prompt_tokens": sum(s.prompt_tokens for s in generated),
+                "completion_tokens": sum(s.completion_tokens for s in generated),
+            }
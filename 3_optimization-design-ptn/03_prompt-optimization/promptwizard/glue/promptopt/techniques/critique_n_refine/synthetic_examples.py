@@ -0,0 +1,110 @@
+import os
+from os.path import dirname, exists, join
+from typing import Dict, List
+
+from ....common.utils.file import read_jsonl_row, save_jsonlist
+from ....common.utils.logging import get_glue_logger
+from ...techniques.common_logic import DatasetSpecificProcessing
+from ...techniques.critique_n_refine.candidate_dedupe import normalize_text
+
+logger = get_glue_logger(__name__)
+
+
+def split_into_shards(count: int, shard_size: int) -> List[int]:
+    """
+    :param count: Number of examples to be generated
+    :param shard_size: Max number of examples requested from LLM in one call
+    :return: Number of examples to be requested in each shard. Sizes differ by at most 1.
+    """
+    if count <= 0:
+        return []
+    shards_count = -(-count // max(1, shard_size))
+    size, remainder = divmod(count, shards_count)
+    return [size + 1] * remainder + [size] * (shards_count - remainder)
+
+
+class SyntheticExampleStore:
+    """
+    Synthetic training examples generated so far, kept in a jsonl file under the experiment directory. Examples are
+    appended to the file as soon as a shard of them is generated, so a run that's interrupted keeps what it has
+    generated, and a resumed run only generates the examples still missing.
+
+    An example is kept only if it has a question & a final answer, and its question isn't a duplicate (after
+    normalize_text()) of a question already in the store.
+    """
+
+    DIR_NAME = "synthetic"
+    FILE_NAME = "train_synthetic.jsonl"
+
+    def __init__(self, base_path: str):
+        """
+        :param base_path: Path of experiment directory. Examples are saved in its `synthetic` sub-directory.
+        """
+        self.file_path = join(base_path, self.DIR_NAME, self.FILE_NAME)
+        self.examples: List[Dict] = []
+        self._seen_questions = set()
+        # Number of generated examples that were dropped, as invalid or duplicate
+        self.rejected_count = 0
+
+    def load(self, resume: bool) -> int:
+        """
+        Start the store afresh, or with the examples saved by an earlier run.
+
+        :param resume: When True, valid examples in the file saved by an earlier run are kept. File is rewritten
+                       with only those, which drops a row left incomplete by an interruption.
+        :return: Number of examples in the store
+        """
+        os.makedirs(dirname(self.file_path), exist_ok=True)
+        self.examples = []
+        self._seen_questions = set()
+        self.rejected_count = 0
+        if resume and exists(self.file_path):
+            for example in read_jsonl_row(self.file_path):
+                self._add(example)
+            logger.info(f"Resuming with {len(self.examples)} synthetic examples from {self.file_path}")
+        save_jsonlist(self.file_path, self.examples, mode="w")
+        return len(self.examples)
+
+    @staticmethod
+    def is_valid(example: Dict) -> bool:
+        """
+        :return: True if example has non empty question & final answer
+        """
+        if not isinstance(example, dict):
+            return False
+        question = example.get(DatasetSpecificProcessing.QUESTION_LITERAL)
+        answer = example.get(DatasetSpecificProcessing.FINAL_ANSWER_LITERAL)
+        return bool(isinstance(question, str) and question.strip() and str(answer or "").strip())
+
+    def _add(self, example: Dict) -> bool:
+        if not self.is_valid(example):
+            return False
+        question = normalize_text(example[DatasetSpecificProcessing.QUESTION_LITERAL])
+        if question in self._seen_questions:
+            return False
+        self._seen_questions.add(question)
+        self.examples.append(example)
+        return True
+
+    def add(self, examples: List[Dict], max_count: int) -> int:
+        """
+        Add valid examples with new questions, until store has `max_count` examples, and append them to file.
+
+        :param examples: Examples generated by a shard
+        :param max_count: Number of examples the store should have at most
+        :return: Number of examples added
+        """
+        added = []
+        for example in examples:
+            if len(self.examples) >= max_count:
+                break
+            if self._add(example):
+                added.append(example)
+            else:
+                self.rejected_count += 1
+        if added:
+            save_jsonlist(self.file_path, added)
+        return len(added)
+
+    def __len__(self) -> int:
+        return len(self.examples)
@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from promptwizard.glue.common.llm.rate_limiter import LLMRateLimiter, RateLimiterMetrics
+
+
+class TestCancelledWaiters(unittest.TestCase):
+    """
+    Requests cancelled while waiting in LLMRateLimiter's queue (e.g. by map_with_concurrency().aclose()) should
+    free their queue slot and give back the quota they reserved.
+    """
+
+    def get_limiter(self) -> LLMRateLimiter:
+        # One request per 10 sec, bucket holds a single request
+        return LLMRateLimiter(req_per_min=6, max_queue_size=3)
+
+    def test_cancelled_aacquire_frees_queue_slot(self):
+        limiter = self.get_limiter()
+
+        async def cancel_waiters():
+            await limiter.aacquire(10)
+            waiters = [asyncio.ensure_future(limiter.aacquire(10)) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            self.assertEqual(limiter.get_metrics()[RateLimiterMetrics.QUEUE_DEPTH], 3)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+
+            # Queue isn't full, and the next request waits for one interval, not for those of cancelled requests
+            next_waiter = asyncio.ensure_future(limiter.aacquire(10))
+            await asyncio.sleep(0.05)
+            self.assertEqual(limiter.get_metrics()[RateLimiterMetrics.QUEUE_DEPTH], 1)
+            next_waiter.cancel()
+            await asyncio.gather(next_waiter, return_exceptions=True)
+
+        asyncio.run(cancel_waiters())
+        metrics = limiter.get_metrics()
+        self.assertEqual(metrics[RateLimiterMetrics.QUEUE_DEPTH], 0)
+        self.assertEqual(metrics[RateLimiterMetrics.REQUESTS], 1)
+        self.assertEqual(metrics[RateLimiterMetrics.REJECTED], 0)
+        self.assertGreater(limiter._req_balance, -1)
+
+    def test_interrupted_acquire_frees_queue_slot(self):
+        limiter = self.get_limiter()
+        limiter.acquire(10)
+        with mock.patch("time.sleep", side_effect=KeyboardInterrupt) as sleep:
+            with self.assertRaises(KeyboardInterrupt):
+                limiter.acquire(10)
+        sleep.assert_called_once()
+        self.assertEqual(limiter.get_metrics()[RateLimiterMetrics.QUEUE_DEPTH], 0)
+        self.assertEqual(limiter.get_metrics()[RateLimiterMetrics.REQUESTS], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()